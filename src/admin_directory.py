@@ -0,0 +1,92 @@
+"""Кэш списка админов.
+
+Коллекция админов меняется редко, а читается на каждый /admin и на каждое
+уведомление админам. Справочник загружается при старте, обновляется в
+фоне раз в ADMIN_CACHE_TTL/2 секунд и может быть сброшен явно.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import FrozenSet, List, Optional
+
+from .appwrite_client import AsyncAppwriteRepo, get_async_repo
+from .config import Settings
+
+
+class AdminDirectory:
+    def __init__(self, repo: AsyncAppwriteRepo, ttl: float):
+        self.repo = repo
+        self.ttl = ttl
+
+        self._ids: FrozenSet[str] = frozenset()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        """Перечитать коллекцию; при ошибке остаётся прежний список."""
+        async with self._lock:
+            try:
+                docs = await self.repo.list_admins()
+            except Exception as e:
+                logging.warning("[Admins] не удалось обновить список админов: %s", e)
+                return
+            self._ids = frozenset(
+                str(d.get("tg_user_id", "")).strip() for d in docs if d.get("tg_user_id")
+            )
+            self._loaded_at = time.monotonic()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    async def _ensure(self) -> None:
+        if self._stale():
+            await self.refresh()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def is_admin(self, tg_user_id: str) -> bool:
+        await self._ensure()
+        return str(tg_user_id) in self._ids
+
+    async def chat_ids(self) -> List[int]:
+        await self._ensure()
+        ids: List[int] = []
+        for v in self._ids:
+            try:
+                ids.append(int(v))
+            except ValueError:
+                pass
+        return ids
+
+    # ---------------------- фоновое обновление ---------------------- #
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.ttl / 2))
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="admin-directory")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_directory: Optional[AdminDirectory] = None
+
+def get_admin_directory() -> AdminDirectory:
+    global _directory
+    if _directory is None:
+        _directory = AdminDirectory(get_async_repo(), ttl=Settings.ADMIN_CACHE_TTL)
+    return _directory
@@ -1,24 +1,38 @@
 from __future__ import annotations
 
-import os
+import asyncio
 import logging
-from typing import Optional, List
+import time
+from datetime import datetime, timezone
+from html import escape
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional
 
-from aiogram import Router, F, Bot
+from aiogram import Router, Bot
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-from .appwrite_client import get_repo
-
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-except Exception:
-    gspread = None
-    Credentials = None
+from appwrite.exception import AppwriteException
+
+from .config import Settings
+from .appwrite_client import get_async_repo, is_transient
+from .cards import admin_card_pages
+from .dispatch import callbacks
+from .callbacks import (
+    ADMIN, PREFIX as CALLBACK_PREFIX, Action, CallbackExpired,
+    A_ASK, A_BACK, A_BDO, A_BPAGE, A_BSEL, A_BULK, A_DECIDE, A_FIND, A_GROUP,
+    A_MENU, A_NOOP, A_NOTE, A_PAGE, A_PART, A_SEARCH, A_SHOW, A_TOGGLE, A_VIEW,
+)
+from .keyboards import admin_find_kb, admin_list_kb
+from .admin_directory import get_admin_directory
+from .http_pool import describe
+from .notifier import get_notifier
+from .status_counter import get_status_counter
+from .replica import get_replica
+from .search_index import normalize_group, tokenize
+
+from .sheets_writer import get_sheets_writer
 
 router = Router()
 
@@ -30,6 +44,10 @@ class AdminState(StatesGroup):
     waiting_group = State()     # поиск по группе
     waiting_note = State()      # «просто комментарий»
     waiting_question = State()  # задать вопрос студенту (для ответа)
+    waiting_bulk_comment = State()  # комментарий к массовому решению
+
+# как часто обновлять сообщение о ходе массового решения (сек)
+PROGRESS_EDIT_INTERVAL = 1.0
 
 # ----------------------------------------------------------------------------- #
 # Helpers
@@ -57,125 +75,63 @@ def _student_decision_kb():
     kb.adjust(2, 1)
     return kb.as_markup()
 
-def _safe_count(status: str) -> str:
+def _notify_student(bot: Bot, doc: dict, text: str, **kwargs) -> None:
+    """Уведомление студенту-владельцу заявки (в фоне, через общий диспетчер)."""
     try:
-        repo = get_repo()
-        res = repo.list_submissions(status=status, page=1, page_size=1)
-        return str(res.get("total", "?"))
-    except Exception:
-        return "?"
+        chat_id = int(str(doc.get("tg_user_id", "")).strip())
+    except ValueError:
+        return
+    get_notifier().notify(bot, [chat_id], text, **kwargs)
 
-def _get_admin_chat_ids() -> List[int]:
-    """Возвращает список tg_user_id всех админов (из коллекции админов)."""
-    repo = get_repo()
-    try:
-        docs = repo.db.list_documents(
-            database_id=repo.db_id,
-            collection_id=repo.admins_col,
-        ).get("documents", [])
-        ids: List[int] = []
-        for d in docs:
-            try:
-                ids.append(int(str(d.get("tg_user_id", "")).strip()))
-            except Exception:
-                pass
-        return ids
-    except Exception:
-        return []
+def _decision_text(decision: str, comment: str) -> str:
+    return (
+        f"📌 Решение по вашей заявке: <b>{'принята' if decision=='approved' else 'отклонена'}</b>\n"
+        f"💬 Комментарий: {escape(comment, quote=False) or '—'}"
+    )
 
 # -------------------------- Google Sheets helpers ---------------------------- #
-def _get_sheet():
-    if gspread is None or Credentials is None:
-        raise RuntimeError("gspread/google-auth не установлены в окружении")
-
-    sheet_id = os.getenv("GOOGLE_SHEET_ID")
-    tab_name = os.getenv("GOOGLE_SHEET_TAB", "Лист1")
-    sa_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON_PATH", "./service_account.json")
-
-    if not sheet_id:
-        raise RuntimeError("GOOGLE_SHEET_ID не задан")
-    if not os.path.exists(sa_path):
-        raise RuntimeError(f"service_account.json не найден по пути: {sa_path}")
-
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds = Credentials.from_service_account_file(sa_path, scopes=scopes)
-    client = gspread.authorize(creds)
-    sh = client.open_by_key(sheet_id)
-    try:
-        ws = sh.worksheet(tab_name)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=tab_name, rows="2000", cols="40")
-    return ws
-
-def _header_indexes(ws) -> dict[str, int]:
-    headers = ws.row_values(1)
-    return {(h or "").strip().lower(): i + 1 for i, h in enumerate(headers)}
+def _sheet_values(new_status: Optional[str], comment: Optional[str]) -> Dict[str, Any]:
+    values = {}
+    if new_status is not None:
+        values["статус"] = new_status
+    if comment is not None:
+        values["комментарий"] = comment
+    values["updated at"] = datetime.now(timezone.utc).isoformat()
+    return values
 
 def update_sheet_status_and_comment(appwrite_id: str, new_status: Optional[str], comment: Optional[str]):
-    """Обновляет статус/комментарий/Updated At в Sheets.
+    """Ставит в очередь обновление статуса/комментария/Updated At в Sheets.
        Если new_status is None — меняем только комментарий и Updated At.
     """
-    try:
-        ws = _get_sheet()
-        matches = ws.findall(appwrite_id)
-        if not matches:
-            logging.warning("[Sheets] Не нашёл строку с ID=%s — ничего не обновляю.", appwrite_id)
-            return
-
-        row = matches[0].row
-        idx = _header_indexes(ws)
-
-        status_col     = idx.get("статус")
-        comment_col    = idx.get("комментарий")
-        updated_at_col = idx.get("updated at")
-
-        batch = []
-        if new_status is not None and status_col:
-            batch.append({
-                "range": gspread.utils.rowcol_to_a1(row, status_col),
-                "values": [[new_status]],
-            })
-        if comment is not None and comment_col:
-            batch.append({
-                "range": gspread.utils.rowcol_to_a1(row, comment_col),
-                "values": [[comment]],
-            })
-        if updated_at_col:
-            from datetime import datetime, timezone
-            batch.append({
-                "range": gspread.utils.rowcol_to_a1(row, updated_at_col),
-                "values": [[datetime.now(timezone.utc).isoformat()]],
-            })
-
-        if batch:
-            ws.batch_update(batch, value_input_option="RAW")
-    except Exception as e:
-        logging.exception("Не удалось обновить Google Sheets: %s", e)
+    get_sheets_writer().enqueue_update(appwrite_id, _sheet_values(new_status, comment))
 
 # ----------------------------------------------------------------------------- #
 # Клавиатуры карточки
 # ----------------------------------------------------------------------------- #
-def admin_actions_kb(doc_id: str, back_status: str, allow_reply: bool):
-    """Кнопки под заявкой: Принять / Отклонить / Комментарий / Запрос ответа / Вопрос / Назад"""
+def admin_actions_kb(doc_id: str, back_status: str, allow_reply: bool, part: int = 0, parts: int = 1):
+    """Кнопки под заявкой: Принять / Отклонить / Комментарий / Запрос ответа / Вопрос / Назад
+       (+ листание частей длинной карточки)"""
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Принять", callback_data=f"admin:decide:{doc_id}:approved:{back_status}:1")
-    kb.button(text="❌ Отклонить", callback_data=f"admin:decide:{doc_id}:rejected:{back_status}:1")
-    kb.button(text="💬 Комментарий", callback_data=f"admin:note:{doc_id}:{back_status}")
+    kb.button(text="✅ Принять", callback_data=A_DECIDE.pack(doc_id=doc_id, decision="approved", back_status=back_status))
+    kb.button(text="❌ Отклонить", callback_data=A_DECIDE.pack(doc_id=doc_id, decision="rejected", back_status=back_status))
+    kb.button(text="💬 Комментарий", callback_data=A_NOTE.pack(doc_id=doc_id, back_status=back_status))
     kb.adjust(2, 1)
 
     # toggle allow
     if allow_reply:
-        kb.button(text="🗨️ Запретить ответ", callback_data=f"admin:toggle_reply:{doc_id}:{back_status}:off")
+        kb.button(text="🗨️ Запретить ответ", callback_data=A_TOGGLE.pack(doc_id=doc_id, back_status=back_status, allow=False))
     else:
-        kb.button(text="🗨️ Разрешить ответ", callback_data=f"admin:toggle_reply:{doc_id}:{back_status}:on")
-    kb.button(text="✏️ Задать вопрос", callback_data=f"admin:ask:{doc_id}:{back_status}")
+        kb.button(text="🗨️ Разрешить ответ", callback_data=A_TOGGLE.pack(doc_id=doc_id, back_status=back_status, allow=True))
+    kb.button(text="✏️ Задать вопрос", callback_data=A_ASK.pack(doc_id=doc_id, back_status=back_status))
     kb.adjust(2)
 
-    kb.button(text="⬅️ Назад к списку", callback_data=f"admin:back:{back_status}")
+    if part > 0:
+        kb.button(text="◀️ Предыдущая часть", callback_data=A_PART.pack(doc_id=doc_id, status=back_status, part=part - 1))
+    if part < parts - 1:
+        kb.button(text="Следующая часть ▶️", callback_data=A_PART.pack(doc_id=doc_id, status=back_status, part=part + 1))
+
+    kb.button(text="⬅️ Назад к списку", callback_data=A_BACK.pack(status=back_status))
     kb.adjust(1)
     return kb.as_markup()
 
@@ -184,14 +140,16 @@ def admin_actions_kb(doc_id: str, back_status: str, allow_reply: bool):
 # ----------------------------------------------------------------------------- #
 async def _send_status_menu(msg_or_cb):
     from aiogram.utils.keyboard import InlineKeyboardBuilder
-    c_pending  = _safe_count("pending")
-    c_approved = _safe_count("approved")
-    c_rejected = _safe_count("rejected")
+    replica = get_replica()
+    counts = replica.counts() if replica.ready else await get_status_counter().counts()
+    c_pending, c_approved, c_rejected = (
+        "?" if counts.get(s) is None else counts[s] for s in ("pending", "approved", "rejected")
+    )
 
     kb = InlineKeyboardBuilder()
-    kb.button(text=f"⏳ В ожидании ({c_pending})",  callback_data="admin:show:pending")
-    kb.button(text=f"✅ Принятые ({c_approved})",  callback_data="admin:show:approved")
-    kb.button(text=f"❌ Отклонённые ({c_rejected})", callback_data="admin:show:rejected")
+    kb.button(text=f"⏳ В ожидании ({c_pending})",  callback_data=A_SHOW.pack(status="pending"))
+    kb.button(text=f"✅ Принятые ({c_approved})",  callback_data=A_SHOW.pack(status="approved"))
+    kb.button(text=f"❌ Отклонённые ({c_rejected})", callback_data=A_SHOW.pack(status="rejected"))
     kb.adjust(1)
 
     text = "<b>Панель администратора</b>\nВыберите статус для просмотра заявок:"
@@ -200,152 +158,493 @@ async def _send_status_menu(msg_or_cb):
     else:
         await msg_or_cb.message.edit_text(text, parse_mode="HTML", reply_markup=kb.as_markup())
 
-async def _send_list_by_status(msg_or_cb, status: str, group: Optional[str] = None):
-    repo = get_repo()
-    res = repo.list_submissions(status=status, page=1, page_size=30, group=group)
-    items = res.get("documents", [])
+async def _fetch_list_page(
+    status: str,
+    group: Optional[str] = None,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    before: bool = False,
+):
+    """Страница списка: (заявки, всего, номер страницы, есть ли пред./след.)."""
+    size = Settings.ADMIN_PAGE_SIZE
+    replica = get_replica()
+    # берём на один документ больше — так видно, есть ли страница дальше
+    query = dict(status=status, page_size=size + 1, group=group, cursor=cursor, before=before)
+    if replica.ready:
+        res = replica.list_submissions(**query)
+    else:
+        try:
+            res = await get_async_repo().list_submissions(**query)
+        except AppwriteException as e:
+            if not cursor or is_transient(e):
+                raise
+            # документ-курсор успели удалить — список заново с первой страницы
+            logging.info("[Admin] курсор %s не найден (%s) — страница 1", cursor, e)
+            cursor, before, page = None, False, 1
+            res = await get_async_repo().list_submissions(status=status, page_size=size + 1, group=group)
+    docs = res.get("documents", [])
+    if before:
+        items = docs[-size:]
+        has_prev, has_next = len(docs) > size, True
+    else:
+        items = docs[:size]
+        has_prev, has_next = cursor is not None, len(docs) > size
+    if before and not has_prev:
+        page = 1
+    return items, res.get("total", "?"), page, has_prev, has_next
+
+async def _send_list_by_status(
+    msg_or_cb,
+    status: str,
+    group: Optional[str] = None,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    before: bool = False,
+    selected: Optional[Collection[str]] = None,
+):
+    items, total, page, has_prev, has_next = await _fetch_list_page(status, group, page, cursor, before)
+
+    header = f"<b>{_status_title(status)}</b> — найдено {total}"
+    if group:
+        header += f"\nГруппа: {escape(group, quote=False)}"
+    if selected is not None:
+        header += f"\nВыбрано: {len(selected)} — отметьте заявки и выберите решение"
+    kb = admin_list_kb(items, status, page, has_prev, has_next, selected=selected)
+    if isinstance(msg_or_cb, Message):
+        await msg_or_cb.answer(header, parse_mode="HTML", reply_markup=kb)
+    else:
+        await msg_or_cb.message.edit_text(header, parse_mode="HTML", reply_markup=kb)
 
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
+def _groups_kb(matches, status: str):
+    """Найденные группы с числом заявок; выбор открывает список по группе."""
     kb = InlineKeyboardBuilder()
-    for doc in items:
-        title = f"{doc.get('full_name','?')} | {doc.get('group','?')}"
-        kb.button(text=title[:60], callback_data=f"admin:view:{doc['$id']}:{status}")
-
-    kb.adjust(1)
-    kb.button(text="🔎 Поиск по группе", callback_data=f"admin:search:{status}")
-    kb.button(text="⬅️ Назад", callback_data="admin:menu")
-    kb.adjust(1)
+    for group, count in matches:
+        kb.button(text=f"{group} ({count})", callback_data=A_GROUP.pack(status=status, group=group))
+    kb.button(text="⬅️ Назад", callback_data=A_SHOW.pack(status=status))
+    kb.adjust(2)
+    return kb.as_markup()
 
-    header = f"<b>{_status_title(status)}</b> — найдено {res.get('total','?')}"
+# ----------------------------------------------------------------------------- #
+# Поиск /find (по локальной реплике)
+# ----------------------------------------------------------------------------- #
+FIND_KEYS = {
+    "status": "status", "статус": "status",
+    "group": "group", "группа": "group",
+    "topic": "thesisTopic", "тема": "thesisTopic",
+    "desc": "thesisDescription", "описание": "thesisDescription",
+    "stack": "techStack", "стек": "techStack",
+}
+
+FIND_HELP = (
+    "Поиск по заявкам:\n"
+    "<code>/find status=pending stack=django</code>\n"
+    "<code>/find group=ВИС-41 тема=бот</code>\n\n"
+    "Ключи: status, group, topic, desc, stack (или статус, группа, тема, описание, стек). "
+    "Слова без ключа ищутся в теме, описании и стеке."
+)
+
+def _parse_find(query: str) -> Dict[str, Any]:
+    """«status=pending stack=django бот» → условия для SubmissionReplica.search."""
+    conds: Dict[str, Any] = {"status": None, "group": None, "words": {}, "anywhere": []}
+    for part in query.split():
+        key, sep, value = part.partition("=")
+        field = FIND_KEYS.get(key.lower()) if sep else None
+        if field is None:
+            conds["anywhere"].extend(tokenize(part))
+        elif field in ("status", "group"):
+            conds[field] = value.strip() or None
+        else:
+            conds["words"].setdefault(field, []).extend(tokenize(value))
+    return conds
+
+async def _send_find_results(msg_or_cb, query: str, page: int = 1):
+    docs = get_replica().search(**_parse_find(query))
+    size = Settings.ADMIN_PAGE_SIZE
+    pages = max(1, -(-len(docs) // size))
+    page = min(max(1, page), pages)
+    items = docs[(page - 1) * size: page * size]
+
+    header = f"<b>Поиск</b>: {escape(query)} — найдено {len(docs)}"
+    kb = admin_find_kb(items, page, pages)
     if isinstance(msg_or_cb, Message):
-        await msg_or_cb.answer(header, parse_mode="HTML", reply_markup=kb.as_markup())
+        await msg_or_cb.answer(header, parse_mode="HTML", reply_markup=kb)
+    else:
+        await msg_or_cb.message.edit_text(header, parse_mode="HTML", reply_markup=kb)
+
+# ----------------------------------------------------------------------------- #
+# Кнопки: одна таблица «действие → обработчик» вместо цепочки startswith-фильтров
+# ----------------------------------------------------------------------------- #
+_HANDLERS: Dict[Action, Callable[..., Awaitable[Any]]] = {}
+
+def on(action: Action):
+    """Регистрирует обработчик кнопки: fn(cb, state, **поля действия)."""
+    def register(fn):
+        _HANDLERS[action] = fn
+        return fn
+    return register
+
+async def _refuse_non_admin(event: Message | CallbackQuery, state: FSMContext) -> bool:
+    """Отказ не-админу (в том числе снятому с роли посреди диалога); True — отказали.
+
+    callback_data присылает клиент, поэтому проверяем каждый апдейт
+    админки, а не только команды.
+    """
+    if await get_admin_directory().is_admin(str(event.from_user.id)):
+        return False
+    if isinstance(event, CallbackQuery):
+        await event.answer("Доступ запрещён.", show_alert=True)
     else:
-        await msg_or_cb.message.edit_text(header, parse_mode="HTML", reply_markup=kb.as_markup())
+        await state.clear()  # выходим из состояния админки
+        await event.answer("Доступ запрещён.")
+    return True
+
+@callbacks.prefix(CALLBACK_PREFIX)
+async def admin_callback(cb: CallbackQuery, state: FSMContext):
+    if await _refuse_non_admin(cb, state):
+        return
+    try:
+        action, values = ADMIN.unpack(cb.data)
+    except CallbackExpired:
+        await cb.answer("Кнопка устарела — откройте /admin заново", show_alert=True)
+        return
+    await _HANDLERS[action](cb, state, **values)
+
+@callbacks.prefix("admin")
+async def admin_stale_callback(cb: CallbackQuery, state: FSMContext):
+    # кнопки старого формата (admin:…), оставшиеся в чатах до перехода на упакованные
+    await cb.answer("Кнопка устарела — откройте /admin заново", show_alert=True)
 
 # ----------------------------------------------------------------------------- #
 # Handlers
 # ----------------------------------------------------------------------------- #
 @router.message(Command("admin"))
 async def admin_entry(msg: Message):
-    repo = get_repo()
-    if not repo.is_admin(str(msg.from_user.id)):
+    if not await get_admin_directory().is_admin(str(msg.from_user.id)):
         await msg.answer("Доступ запрещён.")
         return
     await _send_status_menu(msg)
 
-@router.callback_query(F.data.startswith("admin:show:"))
-async def admin_show(cb: CallbackQuery):
-    _, _, status = cb.data.split(":")
+@router.message(Command("stats"))
+async def admin_stats(msg: Message):
+    repo = get_async_repo()
+    if not await get_admin_directory().is_admin(str(msg.from_user.id)):
+        await msg.answer("Доступ запрещён.")
+        return
+    await msg.answer(
+        f"<b>Appwrite pool</b>\n{describe(repo.pool_stats())}\n\n"
+        f"<b>Кэш заявок</b>\n{repo.user_cache.describe()}\n\n"
+        f"<b>Уведомления</b>\n{get_notifier().describe()}",
+        parse_mode="HTML",
+    )
+
+@router.message(Command("find"))
+async def admin_find(msg: Message, command: CommandObject, state: FSMContext):
+    if not await get_admin_directory().is_admin(str(msg.from_user.id)):
+        await msg.answer("Доступ запрещён.")
+        return
+    query = (command.args or "").strip()
+    if not query:
+        await msg.answer(FIND_HELP, parse_mode="HTML")
+        return
+    if not get_replica().ready:
+        await msg.answer("Поиск пока недоступен: заявки ещё загружаются. Попробуйте через минуту.")
+        return
+    await state.update_data(find_query=query)
+    await _send_find_results(msg, query)
+
+@on(A_FIND)
+async def admin_find_page(cb: CallbackQuery, state: FSMContext, page: int):
+    query = (await state.get_data()).get("find_query")
+    if not query or not get_replica().ready:
+        await cb.answer("Поиск устарел — повторите /find", show_alert=True)
+        return
+    await _send_find_results(cb, query, page=page)
+    await cb.answer()
+
+@on(A_SHOW)
+async def admin_show(cb: CallbackQuery, state: FSMContext, status: str):
+    # новый список из меню — без фильтра по группе и выбора
+    await state.update_data(list_group=None, bulk_ids=None)
     await _send_list_by_status(cb, status=status)
     await cb.answer()
 
-@router.callback_query(F.data == "admin:menu")
-async def admin_back(cb: CallbackQuery):
+@on(A_PAGE)
+async def admin_page(cb: CallbackQuery, state: FSMContext, status: str, before: bool, page: int, cursor: str):
+    data = await state.get_data()
+    view = {"page": max(1, page), "cursor": cursor, "before": before}
+    if data.get("bulk_ids") is not None and data.get("bulk_status") == status:
+        # режим выбора: запоминаем страницу, чтобы перерисовывать её при отметках
+        await state.update_data(bulk_view=view)
+        await _send_list_by_status(cb, status=status, group=data.get("list_group"),
+                                   selected=set(data["bulk_ids"]), **view)
+    else:
+        await _send_list_by_status(cb, status=status, group=data.get("list_group"), **view)
+    await cb.answer()
+
+# --- Массовые решения ---
+async def _render_bulk(cb: CallbackQuery, data: Dict[str, Any]):
+    view = data.get("bulk_view") or {}
+    await _send_list_by_status(
+        cb, status=data["bulk_status"], group=data.get("list_group"),
+        selected=set(data.get("bulk_ids") or ()), **view,
+    )
+
+@on(A_BULK)
+async def admin_bulk_start(cb: CallbackQuery, state: FSMContext, status: str):
+    await state.update_data(bulk_ids=[], bulk_status=status, bulk_view=None)
+    await _render_bulk(cb, await state.get_data())
+    await cb.answer()
+
+@on(A_BSEL)
+async def admin_bulk_toggle(cb: CallbackQuery, state: FSMContext, doc_id: str):
+    data = await state.get_data()
+    if data.get("bulk_ids") is None:
+        await cb.answer("Режим выбора закрыт — откройте список заново", show_alert=True)
+        return
+    ids = list(data["bulk_ids"])
+    if doc_id in ids:
+        ids.remove(doc_id)
+    else:
+        ids.append(doc_id)
+    await state.update_data(bulk_ids=ids)
+    await _render_bulk(cb, {**data, "bulk_ids": ids})
+    await cb.answer()
+
+@on(A_BPAGE)
+async def admin_bulk_toggle_page(cb: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    if data.get("bulk_ids") is None:
+        await cb.answer("Режим выбора закрыт — откройте список заново", show_alert=True)
+        return
+    view = data.get("bulk_view") or {}
+    items, *_ = await _fetch_list_page(data["bulk_status"], data.get("list_group"), **view)
+    page_ids = [d["$id"] for d in items]
+    ids = list(data["bulk_ids"])
+    if all(i in ids for i in page_ids):
+        ids = [i for i in ids if i not in page_ids]
+    else:
+        ids += [i for i in page_ids if i not in ids]
+    await state.update_data(bulk_ids=ids)
+    await _render_bulk(cb, {**data, "bulk_ids": ids})
+    await cb.answer()
+
+@on(A_BDO)
+async def admin_bulk_decide(cb: CallbackQuery, state: FSMContext, decision: str):
+    ids = (await state.get_data()).get("bulk_ids") or []
+    if not ids:
+        await cb.answer("Ничего не выбрано", show_alert=True)
+        return
+    await state.update_data(bulk_decision=decision)
+    await cb.message.answer(
+        f"Решение «{'принять' if decision == 'approved' else 'отклонить'}» для {len(ids)} заявок.\n"
+        "Напишите общий комментарий (или '-' если без комментария)."
+    )
+    await state.set_state(AdminState.waiting_bulk_comment)
+    await cb.answer()
+
+@router.message(AdminState.waiting_bulk_comment)
+async def admin_bulk_comment(msg: Message, state: FSMContext, bot: Bot):
+    if await _refuse_non_admin(msg, state):
+        return
+    data = await state.get_data()
+    await state.clear()
+    comment = "" if msg.text.strip() == "-" else msg.text.strip()
+    await _apply_bulk_decision(
+        msg, bot, list(data.get("bulk_ids") or ()), data["bulk_decision"], comment,
+        prev_status=data.get("bulk_status"),
+    )
+    await _send_status_menu(msg)
+
+async def _apply_bulk_decision(
+    msg: Message,
+    bot: Bot,
+    doc_ids: List[str],
+    decision: str,
+    comment: str,
+    prev_status: Optional[str],
+):
+    """Appwrite — параллельно, Sheets — одним пакетом, студентам — через очередь уведомлений."""
+    repo = get_async_repo()
+    replica = get_replica()
+    total = len(doc_ids)
+    progress = await msg.answer(f"⏳ Обработка: 0/{total}")
+
+    sem = asyncio.Semaphore(max(1, Settings.APPWRITE_MAX_WORKERS))
+    updated: List[Dict[str, Any]] = []
+    failed = 0
+
+    async def one(doc_id: str):
+        nonlocal failed
+        prev = (replica.get(doc_id) or {}).get("status") or prev_status
+        async with sem:
+            try:
+                updated.append(await repo.update_submission_status(
+                    doc_id, decision, comment,
+                    previous={"status": prev} if prev else None,
+                ))
+            except Exception as e:
+                failed += 1
+                logging.warning("[Admin] массовое решение: %s не обновлена: %s", doc_id, e)
+
+    async def report():
+        shown = 0
+        while True:
+            await asyncio.sleep(PROGRESS_EDIT_INTERVAL)
+            done = len(updated) + failed
+            if done != shown:
+                shown = done
+                try:
+                    await progress.edit_text(f"⏳ Обработка: {done}/{total}")
+                except Exception:
+                    pass
+
+    reporter = asyncio.create_task(report())
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(one(doc_id) for doc_id in doc_ids))
+    finally:
+        reporter.cancel()
+
+    writer = get_sheets_writer()
+    writer.enqueue_updates({doc["$id"]: _sheet_values(decision, comment or None) for doc in updated})
+    writer.flush_soon()
+
+    chat_ids = []
+    for doc in updated:
+        try:
+            chat_ids.append(int(str(doc.get("tg_user_id", "")).strip()))
+        except ValueError:
+            pass
+    get_notifier().notify(bot, chat_ids, _decision_text(decision, comment), parse_mode="HTML")
+
+    text = f"Готово ✅ Обновлено {len(updated)} из {total} за {time.monotonic() - started:.1f} с"
+    if failed:
+        text += f"\n⚠️ Не удалось: {failed} (останутся в прежнем статусе)"
+    try:
+        await progress.edit_text(text)
+    except Exception:
+        await msg.answer(text)
+
+@on(A_NOOP)
+async def admin_noop(cb: CallbackQuery, state: FSMContext):
+    await cb.answer()
+
+@on(A_MENU)
+async def admin_back(cb: CallbackQuery, state: FSMContext):
     await _send_status_menu(cb)
     await cb.answer()
 
-@router.callback_query(F.data.startswith("admin:search:"))
-async def admin_search(cb: CallbackQuery, state: FSMContext):
-    _, _, status = cb.data.split(":")
+@on(A_SEARCH)
+async def admin_search(cb: CallbackQuery, state: FSMContext, status: str):
     await state.update_data(status=status)
-    await cb.message.answer("Введите название группы (например: ВИС-41):")
+    await cb.message.answer("Введите группу или её начало (например: ВИС-41 или вис4):")
     await state.set_state(AdminState.waiting_group)
     await cb.answer()
 
 @router.message(AdminState.waiting_group)
 async def admin_search_group(msg: Message, state: FSMContext):
+    if await _refuse_non_admin(msg, state):
+        return
     data = await state.get_data()
     status = data.get("status", "pending")
     group = msg.text.strip()
     await state.clear()
+
+    replica = get_replica()
+    if replica.ready:
+        matches = replica.index.match_groups(group, status=status)
+        if not matches:
+            await msg.answer(f"Группа «{escape(group)}» не найдена среди заявок «{_status_title(status)}».")
+            await _send_list_by_status(msg, status=status)
+            return
+        if len(matches) > 1 or normalize_group(matches[0][0]) != normalize_group(group):
+            await msg.answer("Выберите группу:", reply_markup=_groups_kb(matches, status))
+            return
+        group = matches[0][0]
+
+    # фильтр запоминаем — по нему листаются страницы и идёт возврат из карточки
+    await state.update_data(list_group=group)
     await _send_list_by_status(msg, status=status, group=group)
 
-@router.callback_query(F.data.startswith("admin:view:"))
-async def admin_view(cb: CallbackQuery):
-    _, _, doc_id, status = cb.data.split(":")
-    repo = get_repo()
+@on(A_GROUP)
+async def admin_pick_group(cb: CallbackQuery, state: FSMContext, status: str, group: str):
+    await state.update_data(list_group=group)
+    await _send_list_by_status(cb, status=status, group=group)
+    await cb.answer()
+
+@on(A_VIEW)
+async def admin_view(cb: CallbackQuery, state: FSMContext, doc_id: str, status: str):
+    doc = get_replica().get(doc_id)
     try:
-        doc = repo.db.get_document(repo.db_id, repo.sub_col, doc_id)
+        if doc is None:
+            doc = await get_async_repo().get_submission(doc_id)
     except Exception:
         await cb.answer("Не удалось загрузить документ", show_alert=True)
         return
 
+    await _show_card_part(cb, doc, status, 0)
+    await cb.answer()
+
+async def _show_card_part(cb: CallbackQuery, doc: dict, back_status: str, part: int):
+    parts = admin_card_pages(doc)
+    part = min(max(0, part), len(parts) - 1)
     allow = bool(doc.get("allow_student_reply", False))
-    text = (
-        f"<b>Заявка</b>\n\n"
-        f"👤 ФИО: {doc.get('full_name','—')}\n"
-        f"👥 Группа: {doc.get('group','—')}\n"
-        f"📧 Email: {doc.get('email','—')}\n"
-        f"📅 Дата рождения: {doc.get('birthDate','—')}\n\n"
-        f"📚 Любимые книги: {doc.get('books','—')}\n"
-        f"🎬 Любимый фильм/сериал: {doc.get('likedRecentMovie','—')}\n"
-        f"ℹ️ Коротко о вас: {doc.get('aboutYou','—')}\n"
-        f"🎓 Планы после университета: {doc.get('afterUniversity','—')}\n"
-        f"🎖 Красный диплом: {doc.get('redDiploma','—')}\n"
-        f"📑 Интерес к научной деятельности: {doc.get('scienceInterest','—')}\n\n"
-        f"📝 Тема работы: {doc.get('thesisTopic','—')}\n"
-        f"📄 Описание работы: {doc.get('thesisDescription','—')}\n"
-        f"📊 Аналоги проекта: {doc.get('analogsProsCons','—')}\n"
-        f"⚙️ Планируемый функционал: {doc.get('plannedFeatures','—')}\n"
-        f"🖥️ Стек технологий: {doc.get('techStack','—')}\n\n"
-        f"📌 Статус: {doc.get('status','—')}\n"
-        f"💬 Комментарий: {doc.get('admin_comment','—')}\n\n"
-        f"🗨️ Ответ студента разрешён: {'да' if allow else 'нет'}\n"
-        f"❓ Вопрос студенту: {doc.get('admin_question','—')}\n"
-        f"📝 Ответ студента: {doc.get('student_answer','—')}"
-    )
+    await cb.message.edit_text(parts[part], parse_mode="HTML",
+                               reply_markup=admin_actions_kb(doc["$id"], back_status, allow, part, len(parts)))
 
-    await cb.message.edit_text(text, parse_mode="HTML",
-                               reply_markup=admin_actions_kb(doc_id, status, allow))
+@on(A_PART)
+async def admin_card_part(cb: CallbackQuery, state: FSMContext, doc_id: str, status: str, part: int):
+    doc = get_replica().get(doc_id)
+    try:
+        if doc is None:
+            doc = await get_async_repo().get_submission(doc_id)
+    except Exception:
+        await cb.answer("Не удалось загрузить документ", show_alert=True)
+        return
+    await _show_card_part(cb, doc, status, part)
     await cb.answer()
 
 # --- Решение (approve/reject) ---
-@router.callback_query(F.data.startswith("admin:decide:"))
-async def admin_decide(cb: CallbackQuery, state: FSMContext):
-    _, _, doc_id, decision, back_status, _ = cb.data.split(":")
-    await state.update_data(doc_id=doc_id, decision=decision, back_status=back_status)
+@on(A_DECIDE)
+async def admin_decide(cb: CallbackQuery, state: FSMContext, doc_id: str, decision: str, back_status: str):
+    # карточку открыли из списка back_status — это и есть текущий статус заявки
+    await state.update_data(doc_id=doc_id, decision=decision, back_status=back_status, prev_status=back_status)
     await cb.message.answer("Напишите комментарий к решению (или '-' если без комментария).")
     await state.set_state(AdminState.waiting_comment)
     await cb.answer()
 
 @router.message(AdminState.waiting_comment)
 async def admin_comment(msg: Message, state: FSMContext, bot: Bot):
+    if await _refuse_non_admin(msg, state):
+        return
     data = await state.get_data()
-    repo = get_repo()
+    repo = get_async_repo()
     doc_id = data["doc_id"]
     decision = data["decision"]
     comment = "" if msg.text.strip() == "-" else msg.text.strip()
 
+    prev_status = data.get("prev_status")
     try:
-        doc = repo.db.get_document(repo.db_id, repo.sub_col, doc_id)
+        doc = await repo.update_submission_status(
+            doc_id, decision, comment,
+            previous={"status": prev_status} if prev_status else None,
+        )
     except Exception:
-        await msg.answer("Не удалось получить документ.")
+        await msg.answer("Не удалось сохранить решение.")
         await state.clear()
         return
 
-    repo.update_submission_status(doc_id, decision, comment)
     update_sheet_status_and_comment(doc_id, decision, comment or None)
 
-    student_tg = doc.get("tg_user_id")
-    if student_tg:
-        try:
-            await bot.send_message(
-                int(student_tg),
-                f"📌 Решение по вашей заявке: <b>{'принята' if decision=='approved' else 'отклонена'}</b>\n"
-                f"💬 Комментарий: {comment or '—'}",
-                parse_mode="HTML",
-            )
-        except Exception:
-            pass
+    _notify_student(bot, doc, _decision_text(decision, comment), parse_mode="HTML")
 
     await msg.answer("Готово ✅")
     await state.clear()
     await _send_status_menu(msg)
 
 # --- Просто комментарий ---
-@router.callback_query(F.data.startswith("admin:note:"))
-async def admin_note_ask(cb: CallbackQuery, state: FSMContext):
-    _, _, doc_id, back_status = cb.data.split(":")
+@on(A_NOTE)
+async def admin_note_ask(cb: CallbackQuery, state: FSMContext, doc_id: str, back_status: str):
     await state.update_data(doc_id=doc_id, back_status=back_status)
     await cb.message.answer("Напишите комментарий (без изменения статуса).")
     await state.set_state(AdminState.waiting_note)
@@ -353,32 +652,19 @@ async def admin_note_ask(cb: CallbackQuery, state: FSMContext):
 
 @router.message(AdminState.waiting_note)
 async def admin_note_save(msg: Message, state: FSMContext, bot: Bot):
+    if await _refuse_non_admin(msg, state):
+        return
     data = await state.get_data()
-    repo = get_repo()
+    repo = get_async_repo()
     doc_id = data["doc_id"]
     note = msg.text.strip()
 
     try:
-        repo.db.update_document(
-            database_id=repo.db_id,
-            collection_id=repo.sub_col,
-            document_id=doc_id,
-            data={"admin_comment": note},
-        )
+        doc = await repo.update_submission(doc_id, {"admin_comment": note})
         update_sheet_status_and_comment(doc_id, None, note or None)
 
         # уведомим студента
-        try:
-            doc = repo.db.get_document(repo.db_id, repo.sub_col, doc_id)
-            student_tg = doc.get("tg_user_id")
-            if student_tg:
-                await bot.send_message(
-                    int(student_tg),
-                    f"💬 Комментарий по вашей заявке: {note or '—'}",
-                    parse_mode="HTML",
-                )
-        except Exception:
-            pass
+        _notify_student(bot, doc, f"💬 Комментарий по вашей заявке: {escape(note, quote=False) or '—'}", parse_mode="HTML")
 
         await msg.answer("Комментарий сохранён ✅")
     except Exception:
@@ -388,29 +674,20 @@ async def admin_note_save(msg: Message, state: FSMContext, bot: Bot):
         await _send_status_menu(msg)
 
 # --- Toggle allow student reply ---
-@router.callback_query(F.data.startswith("admin:toggle_reply:"))
-async def admin_toggle_reply(cb: CallbackQuery):
-    _, _, doc_id, back_status, mode = cb.data.split(":")
-    repo = get_repo()
-    allow = True if mode == "on" else False
+@on(A_TOGGLE)
+async def admin_toggle_reply(cb: CallbackQuery, state: FSMContext, doc_id: str, back_status: str, allow: bool):
+    repo = get_async_repo()
 
     # 1) Обновляем флаг в БД
     try:
-        repo.db.update_document(
-            database_id=repo.db_id,
-            collection_id=repo.sub_col,
-            document_id=doc_id,
-            data={"allow_student_reply": allow},
-        )
+        doc = await repo.update_submission(doc_id, {"allow_student_reply": allow})
     except Exception:
         await cb.answer("Ошибка при обновлении", show_alert=True)
         return
 
     # 2) Оповещаем студента
     try:
-        doc = repo.db.get_document(repo.db_id, repo.sub_col, doc_id)
-        student_tg = doc.get("tg_user_id")
-        if student_tg:
+        if doc.get("tg_user_id"):
             if allow:
                 # если используете модель с «принять/отклонить» от студента:
                 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -420,56 +697,20 @@ async def admin_toggle_reply(cb: CallbackQuery):
                 kb.button(text="📄 Моя заявка", callback_data="student:menu:view")
                 kb.adjust(2, 1)
 
-                await cb.bot.send_message(
-                    int(student_tg),
+                _notify_student(
+                    cb.bot, doc,
                     "🗨️ Вам разрешили ответ по вашей заявке. Выберите вариант:",
                     reply_markup=kb.as_markup(),
                 )
             else:
-                await cb.bot.send_message(
-                    int(student_tg),
-                    "⛔️ Возможность ответа по вашей заявке отключена.",
-                )
+                _notify_student(cb.bot, doc, "⛔️ Возможность ответа по вашей заявке отключена.")
     except Exception:
         # не ломаемся, если уведомление не ушло
         pass
 
-    # 3) Перерисовываем карточку сразу у админа (REAL-TIME)
+    # 3) Перерисовываем карточку сразу у админа (REAL-TIME) — по документу из ответа на update
     try:
-        # свежие данные
-        doc = repo.db.get_document(repo.db_id, repo.sub_col, doc_id)
-        allow_now = bool(doc.get("allow_student_reply", False))
-        has_question = bool(doc.get("admin_question"))
-        allow_answer = bool(doc.get("allow_student_reply", False))
-
-        text = (
-            f"<b>Заявка</b>\n\n"
-            f"👤 ФИО: {doc.get('full_name','—')}\n"
-            f"👥 Группа: {doc.get('group','—')}\n"
-            f"📧 Email: {doc.get('email','—')}\n"
-            f"📅 Дата рождения: {doc.get('birthDate','—')}\n\n"
-            f"📚 Любимые книги: {doc.get('books','—')}\n"
-            f"🎬 Любимый фильм/сериал: {doc.get('likedRecentMovie','—')}\n"
-            f"ℹ️ Коротко о вас: {doc.get('aboutYou','—')}\n"
-            f"🎓 Планы после университета: {doc.get('afterUniversity','—')}\n"
-            f"🎖 Красный диплом: {doc.get('redDiploma','—')}\n"
-            f"📑 Интерес к научной деятельности: {doc.get('scienceInterest','—')}\n\n"
-            f"📝 Тема работы: {doc.get('thesisTopic','—')}\n"
-            f"📄 Описание работы: {doc.get('thesisDescription','—')}\n"
-            f"📊 Аналоги проекта: {doc.get('analogsProsCons','—')}\n"
-            f"⚙️ Планируемый функционал: {doc.get('plannedFeatures','—')}\n"
-            f"🖥️ Стек технологий: {doc.get('techStack','—')}\n\n"
-            f"📌 Статус: {doc.get('status','—')}\n"
-            f"💬 Комментарий: {doc.get('admin_comment','—')}\n\n"
-            f"🗨️ Ответ студента разрешён: {'да' if allow_now else 'нет'}\n"
-            f"❓ Вопрос студенту: {doc.get('admin_question','—')}\n"
-            f"📝 Ответ студента: {doc.get('student_answer','—')}"
-        )
-
-        await cb.message.edit_text(
-            text, parse_mode="HTML",
-            reply_markup=admin_actions_kb(doc_id, back_status, allow_now)
-        )
+        await _show_card_part(cb, doc, back_status, 0)
     except Exception:
         # в крайнем случае просто молча игнорим (например, "message is not modified")
         pass
@@ -478,9 +719,8 @@ async def admin_toggle_reply(cb: CallbackQuery):
 
 
 # --- Ask question to student ---
-@router.callback_query(F.data.startswith("admin:ask:"))
-async def admin_ask_question(cb: CallbackQuery, state: FSMContext):
-    _, _, doc_id, back_status = cb.data.split(":")
+@on(A_ASK)
+async def admin_ask_question(cb: CallbackQuery, state: FSMContext, doc_id: str, back_status: str):
     await state.update_data(doc_id=doc_id, back_status=back_status)
     await cb.message.answer("Введите вопрос студенту:")
     await state.set_state(AdminState.waiting_question)
@@ -488,32 +728,23 @@ async def admin_ask_question(cb: CallbackQuery, state: FSMContext):
 
 @router.message(AdminState.waiting_question)
 async def admin_save_question(msg: Message, state: FSMContext, bot: Bot):
+    if await _refuse_non_admin(msg, state):
+        return
     data = await state.get_data()
-    repo = get_repo()
+    repo = get_async_repo()
     doc_id = data["doc_id"]
     q = msg.text.strip()
 
     try:
-        repo.db.update_document(
-            database_id=repo.db_id,
-            collection_id=repo.sub_col,
-            document_id=doc_id,
-            data={"admin_question": q},
-        )
+        doc = await repo.update_submission(doc_id, {"admin_question": q})
 
         # уведомляем студента
-        try:
-            doc = repo.db.get_document(repo.db_id, repo.sub_col, doc_id)
-            student_tg = doc.get("tg_user_id")
-            if student_tg:
-                await bot.send_message(
-                    int(student_tg),
-                    "❓ Вам задан вопрос по вашей заявке.",
-                    # Кнопка только «Открыть мою заявку», без «Принять/Отклонить»
-                    reply_markup=_student_open_kb(allow_answer=False),
-                )
-        except Exception:
-            pass
+        _notify_student(
+            bot, doc,
+            "❓ Вам задан вопрос по вашей заявке.",
+            # Кнопка только «Открыть мою заявку», без «Принять/Отклонить»
+            reply_markup=_student_open_kb(allow_answer=False),
+        )
 
         await msg.answer("Вопрос сохранён ✅")
     except Exception:
@@ -523,8 +754,9 @@ async def admin_save_question(msg: Message, state: FSMContext, bot: Bot):
         await _send_status_menu(msg)
 
 
-@router.callback_query(F.data.startswith("admin:back:"))
-async def admin_back_to_list(cb: CallbackQuery):
-    _, _, status = cb.data.split(":")
-    await _send_list_by_status(cb, status=status)
+@on(A_BACK)
+async def admin_back_to_list(cb: CallbackQuery, state: FSMContext, status: str):
+    group = (await state.get_data()).get("list_group")
+    await state.update_data(bulk_ids=None)
+    await _send_list_by_status(cb, status=status, group=group)
     await cb.answer()
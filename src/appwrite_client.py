@@ -1,17 +1,58 @@
-from appwrite.client import Client
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
 from appwrite.services.databases import Databases
 from appwrite.query import Query
+from appwrite.exception import AppwriteException
 from .config import Settings
-from typing import Optional, Dict, Any
+from .http_pool import make_client
+from .cache import MISSING, TTLCache
+from .fields import missing_required
+from typing import Optional, Dict, Any, List, Callable, Tuple, AsyncIterator
+
+
+# поля, которые выставляет админ; при повторной подаче заявки сбрасываются
+ADMIN_FIELDS_RESET = {
+    "admin_comment": "",
+    "allow_student_reply": False,
+    "admin_question": None,
+    "student_answer": None,
+    "student_text_answer": None,
+}
+
+
+def submission_id_for(tg_user_id: str) -> str:
+    """Детерминированный id заявки пользователя (одна заявка на tg_user_id)."""
+    return f"tg{str(tg_user_id).strip()}"
+
+
+def can_resubmit(doc: Dict[str, Any]) -> bool:
+    """Заявку можно подать заново: её отклонили или студент от неё отказался."""
+    return doc.get("status") == "rejected" or doc.get("student_answer") is False
+
+
+def is_transient(exc: Exception) -> bool:
+    """Сетевая ошибка или 5xx/429 — запрос можно повторить."""
+    if isinstance(exc, AppwriteException):
+        code = getattr(exc, "code", None)
+        return not code or code == 429 or code >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError))
 
 
 class AppwriteRepo:
     def __init__(self):
 
-        self.client = Client()
-        self.client.set_endpoint(Settings.APPWRITE_ENDPOINT)
-        self.client.set_project(Settings.APPWRITE_PROJECT_ID)
-        self.client.set_key(Settings.APPWRITE_API_KEY)
+        self.client = make_client(
+            endpoint=Settings.APPWRITE_ENDPOINT,
+            project=Settings.APPWRITE_PROJECT_ID,
+            key=Settings.APPWRITE_API_KEY,
+            max_connections=Settings.APPWRITE_MAX_CONNECTIONS,
+            connect_timeout=Settings.APPWRITE_CONNECT_TIMEOUT,
+            read_timeout=Settings.APPWRITE_READ_TIMEOUT,
+        )
 
         self.db = Databases(self.client)
 
@@ -28,6 +69,13 @@ class AppwriteRepo:
 
     def get_submission_by_user(self, tg_user_id: str) -> Optional[Dict[str, Any]]:
         """Получить заявку по Telegram user id"""
+        try:
+            return self.db.get_document(self.db_id, self.sub_col, submission_id_for(tg_user_id))
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 404:
+                raise
+
+        # заявки, созданные до перехода на детерминированные id
         res = self.db.list_documents(
             database_id=self.db_id,
             collection_id=self.sub_col,
@@ -36,19 +84,45 @@ class AppwriteRepo:
         docs = res.get("documents", [])
         return docs[0] if docs else None
 
-    def create_submission(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Создать заявку. Статус по умолчанию — pending."""
-        payload = dict(payload)  
+    def get_submission(self, doc_id: str) -> Dict[str, Any]:
+        """Получить заявку по id документа."""
+        return self.db.get_document(self.db_id, self.sub_col, doc_id)
+
+    def upsert_submission(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Создать заявку или принять повторную подачу.
+
+        id документа выводится из tg_user_id, поэтому повтор запроса или
+        двойной callback не создаёт второй документ. Существующая заявка
+        перезаписывается (с обнулением полей админа), только если это
+        повторная подача — см. can_resubmit; иначе возвращается как есть.
+        Возвращает (документ, "create" | "update" | None — ничего не записано).
+        """
+        payload = dict(payload)
         payload.setdefault("status", "pending")
         payload.pop("created_at", None)
         payload.pop("updated_at", None)
+        doc_id = submission_id_for(payload["tg_user_id"])
 
-        return self.db.create_document(
-            database_id=self.db_id,
-            collection_id=self.sub_col,
-            document_id="unique()",
-            data=payload,
-        )
+        try:
+            doc = self.db.create_document(
+                database_id=self.db_id,
+                collection_id=self.sub_col,
+                document_id=doc_id,
+                data=payload,
+            )
+            return doc, "create"
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 409:
+                raise
+
+        existing = self.get_submission(doc_id)
+        if not can_resubmit(existing) or missing_required(payload):
+            return existing, None
+        return self.update_submission(doc_id, {**ADMIN_FIELDS_RESET, **payload}), "update"
+
+    def create_submission(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Создать заявку. Статус по умолчанию — pending."""
+        return self.upsert_submission(payload)[0]
 
     def list_submissions(
         self,
@@ -56,9 +130,20 @@ class AppwriteRepo:
         page: int = 1,
         page_size: int = 20,
         group: Optional[str] = None,
+        cursor: Optional[str] = None,
+        before: bool = False,
     ) -> Dict[str, Any]:
-        """Список заявок с фильтрами по статусу/группе и пагинацией."""
-        queries = [Query.limit(page_size), Query.offset((page - 1) * page_size)]
+        """Список заявок с фильтрами по статусу/группе и пагинацией.
+
+        С cursor (id документа) страница берётся курсором — после него,
+        либо перед ним при before=True — и не замедляется с ростом
+        номера страницы, в отличие от offset.
+        """
+        queries = [Query.limit(page_size)]
+        if cursor:
+            queries.append(Query.cursor_before(cursor) if before else Query.cursor_after(cursor))
+        elif page > 1:
+            queries.append(Query.offset((page - 1) * page_size))
         if status:
             queries.append(Query.equal("status", [status]))
         if group:
@@ -70,18 +155,69 @@ class AppwriteRepo:
             queries=queries,
         )
 
-    def update_submission_status(self, doc_id: str, status: str, comment: str = "") -> Dict[str, Any]:
-        """Обновить статус и комментарий администратора."""
+    def list_submissions_changed(
+        self,
+        since: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """Заявки с $updatedAt >= since по возрастанию $updatedAt (для реплики)."""
+        queries = [Query.limit(limit), Query.order_asc("$updatedAt")]
+        if since:
+            queries.append(Query.greater_than_equal("$updatedAt", since))
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+
+        return self.db.list_documents(
+            database_id=self.db_id,
+            collection_id=self.sub_col,
+            queries=queries,
+        )
+
+    def update_submission(self, doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Частичное обновление заявки."""
         return self.db.update_document(
             database_id=self.db_id,
             collection_id=self.sub_col,
             document_id=doc_id,
-            data={
+            data=data,
+        )
+
+    def update_submission_status(self, doc_id: str, status: str, comment: str = "") -> Dict[str, Any]:
+        """Обновить статус и комментарий администратора."""
+        return self.update_submission(
+            doc_id,
+            {
                 "status": status,
                 "admin_comment": comment or "",
             },
         )
 
+    def delete_submission(self, doc_id: str) -> None:
+        """Удалить заявку."""
+        self.db.delete_document(self.db_id, self.sub_col, doc_id)
+
+    def list_admins(self) -> List[Dict[str, Any]]:
+        """Все документы коллекции админов."""
+        if not self.admins_col:
+            return []
+        res = self.db.list_documents(
+            database_id=self.db_id,
+            collection_id=self.admins_col,
+        )
+        return res.get("documents", [])
+
+    def ping(self) -> None:
+        """Дешёвый запрос — открывает соединение в пуле."""
+        self.db.list_documents(
+            database_id=self.db_id,
+            collection_id=self.sub_col,
+            queries=[Query.limit(1)],
+        )
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return self.client.stats()
+
     def is_admin(self, tg_user_id: str) -> bool:
         """Проверка — пользователь админ?"""
         if not self.admins_col:
@@ -97,10 +233,214 @@ class AppwriteRepo:
         except Exception:
             return False
 
+
+@dataclass
+class SubmissionEvent:
+    """Изменение заявки, сделанное этим процессом."""
+    kind: str                                # "create" | "update" | "delete"
+    doc_id: str
+    doc: Optional[Dict[str, Any]] = None       # состояние после записи
+    previous: Optional[Dict[str, Any]] = None  # состояние до записи, если известно
+    fields: Tuple[str, ...] = ()               # какие поля менялись
+
+
+class AsyncAppwriteRepo:
+    """Асинхронная обёртка над AppwriteRepo.
+
+    SDK Appwrite синхронный, поэтому каждый вызов уходит в ограниченный
+    пул потоков — event loop не блокируется, а число одновременных
+    запросов к Appwrite не превышает APPWRITE_MAX_WORKERS.
+    """
+
+    def __init__(self, repo: Optional[AppwriteRepo] = None, max_workers: Optional[int] = None):
+        self.sync = repo or AppwriteRepo()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Settings.APPWRITE_MAX_WORKERS,
+            thread_name_prefix="appwrite",
+        )
+        self._listeners: List[Callable[[SubmissionEvent], None]] = []
+        # рассылка событий другим процессам (см. supervisor.py)
+        self.publisher: Optional[Callable[[SubmissionEvent], None]] = None
+
+        # tg_user_id → документ заявки (или None — заявки нет)
+        self.user_cache = TTLCache(maxsize=Settings.USER_CACHE_SIZE, ttl=Settings.USER_CACHE_TTL)
+
+    def add_listener(self, fn: Callable[[SubmissionEvent], None]) -> None:
+        """Подписка на собственные записи репозитория (кэши, счётчики)."""
+        self._listeners.append(fn)
+
+    def _emit(self, event: SubmissionEvent) -> None:
+        self._apply(event)
+        if self.publisher is not None:
+            try:
+                self.publisher(event)
+            except Exception:
+                logging.exception("[Appwrite] не удалось разослать событие %s", event.kind)
+
+    def _apply(self, event: SubmissionEvent) -> None:
+        self._write_through(event)
+        for fn in self._listeners:
+            try:
+                fn(event)
+            except Exception:
+                logging.exception("[Appwrite] ошибка в обработчике события %s", event.kind)
+
+    def apply_remote(self, event: SubmissionEvent) -> None:
+        """Событие от другого воркера: обновить кэши, но не рассылать повторно."""
+        self._apply(event)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    # ------------------------- кэш заявок по пользователю ------------------------- #
+    def _write_through(self, event: SubmissionEvent) -> None:
+        if event.doc and event.doc.get("tg_user_id"):
+            self.user_cache.set(str(event.doc["tg_user_id"]), event.doc)
+        elif event.kind == "delete":
+            owner = (event.previous or {}).get("tg_user_id")
+            if owner:
+                self.user_cache.set(str(owner), None)
+            else:
+                self.invalidate_doc(event.doc_id)
+
+    def invalidate_user(self, tg_user_id: str) -> None:
+        """Сбросить кэш заявки пользователя (изменения сделаны вне процесса)."""
+        self.user_cache.pop(str(tg_user_id))
+
+    def invalidate_doc(self, doc_id: str) -> None:
+        self.user_cache.pop_where(lambda d: bool(d) and d.get("$id") == doc_id)
+
+    async def get_submission_by_user(self, tg_user_id: str) -> Optional[Dict[str, Any]]:
+        key = str(tg_user_id)
+        cached = self.user_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        doc = await self._run_idempotent(self.sync.get_submission_by_user, key)
+        self.user_cache.set(key, doc)
+        return doc
+
+    async def get_submission(self, doc_id: str) -> Dict[str, Any]:
+        return await self._run(self.sync.get_submission, doc_id)
+
+    async def _run_idempotent(self, fn, *args, **kwargs):
+        """Вызов с автоматическим повтором — только для идемпотентных операций."""
+        attempts = max(1, Settings.APPWRITE_RETRIES + 1)
+        for attempt in range(attempts):
+            try:
+                return await self._run(fn, *args, **kwargs)
+            except Exception as e:
+                if attempt == attempts - 1 or not is_transient(e):
+                    raise
+                await asyncio.sleep(0.3 * 2 ** attempt)
+
+    async def upsert_submission(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Подать заявку; (документ, записана ли) — см. AppwriteRepo.upsert_submission."""
+        doc, kind = await self._run_idempotent(self.sync.upsert_submission, payload)
+        if kind is None:
+            self.user_cache.set(str(payload["tg_user_id"]), doc)
+            return doc, False
+        self._emit(SubmissionEvent(kind, doc["$id"], doc=doc, fields=tuple(payload) + ("status",)))
+        return doc, True
+
+    async def create_submission(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.upsert_submission(payload))[0]
+
+    async def list_submissions(
+        self,
+        status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 20,
+        group: Optional[str] = None,
+        cursor: Optional[str] = None,
+        before: bool = False,
+    ) -> Dict[str, Any]:
+        return await self._run(
+            self.sync.list_submissions,
+            status=status, page=page, page_size=page_size, group=group,
+            cursor=cursor, before=before,
+        )
+
+    async def iter_submissions_changed(
+        self,
+        since: Optional[str] = None,
+        page_size: int = 100,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Заявки, изменённые начиная с since (все — при since=None), по $updatedAt."""
+        cursor: Optional[str] = None
+        while True:
+            res = await self._run(self.sync.list_submissions_changed, since, cursor, page_size)
+            docs = res.get("documents", [])
+            for doc in docs:
+                yield doc
+            if len(docs) < page_size:
+                return
+            cursor = docs[-1]["$id"]
+
+    async def update_submission(
+        self,
+        doc_id: str,
+        data: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        doc = await self._run_idempotent(self.sync.update_submission, doc_id, data)
+        self._emit(SubmissionEvent("update", doc_id, doc=doc, previous=previous, fields=tuple(data)))
+        return doc
+
+    async def update_submission_status(
+        self,
+        doc_id: str,
+        status: str,
+        comment: str = "",
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        doc = await self._run_idempotent(self.sync.update_submission_status, doc_id, status, comment)
+        self._emit(SubmissionEvent("update", doc_id, doc=doc, previous=previous,
+                                   fields=("status", "admin_comment")))
+        return doc
+
+    async def delete_submission(self, doc_id: str, previous: Optional[Dict[str, Any]] = None) -> None:
+        await self._run(self.sync.delete_submission, doc_id)
+        self._emit(SubmissionEvent("delete", doc_id, previous=previous))
+
+    async def list_admins(self) -> List[Dict[str, Any]]:
+        return await self._run(self.sync.list_admins)
+
+    async def is_admin(self, tg_user_id: str) -> bool:
+        return await self._run(self.sync.is_admin, tg_user_id)
+
+    async def warmup(self, connections: Optional[int] = None) -> None:
+        """Открывает keep-alive соединения заранее, до первых апдейтов."""
+        n = connections if connections is not None else Settings.APPWRITE_WARMUP_CONNECTIONS
+        n = max(0, min(n, self.sync.client.max_connections))
+        results = await asyncio.gather(
+            *(self._run(self.sync.ping) for _ in range(n)),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logging.warning("[Appwrite] прогрев пула: %d из %d запросов с ошибкой: %s", len(failed), n, failed[0])
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений (in_use, idle, waits) для мониторинга."""
+        return self.sync.pool_stats()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.sync.client.close()
+
+
 _repo_singleton: Optional[AppwriteRepo] = None
+_async_repo_singleton: Optional[AsyncAppwriteRepo] = None
 
 def get_repo() -> AppwriteRepo:
     global _repo_singleton
     if _repo_singleton is None:
         _repo_singleton = AppwriteRepo()
     return _repo_singleton
+
+def get_async_repo() -> AsyncAppwriteRepo:
+    global _async_repo_singleton
+    if _async_repo_singleton is None:
+        _async_repo_singleton = AsyncAppwriteRepo(get_repo())
+    return _async_repo_singleton
@@ -0,0 +1,142 @@
+"""Микробенчмарк диспетчера кнопок.
+
+Прогоняет поток callback_data двумя способами и печатает накладные
+расходы на один апдейт:
+
+  * linear — цепочка фильтров `F.data == …` / `F.data.startswith(…)`
+    в порядке «сначала частные», как раньше проверял aiogram;
+  * trie   — CallbackTrie.match (один фильтр, см. dispatch.py).
+
+    python -m src.bench_dispatch [трафик] [-n ПОВТОРОВ]
+
+Трафик — файл, по строке на callback: либо сам callback_data, либо JSON
+апдейта Telegram (выгрузка getUpdates или лог вебхука). Без файла —
+синтетическая смесь кнопок студента и админки.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, List, Optional
+
+from aiogram import F
+
+from . import admin_flow, student_flow  # noqa: F401 — регистрируют кнопки
+from .callbacks import A_DECIDE, A_FIND, A_PAGE, A_PART, A_SHOW, A_TOGGLE, A_VIEW
+from .dispatch import CallbackTrie, callbacks
+from .fields import FIELDS
+
+FIELD_KEYS = [key for key, _, _ in FIELDS]
+
+
+def load_traffic(path: str) -> List[str]:
+    datas = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                update = json.loads(line)
+                data = (update.get("callback_query") or {}).get("data")
+                if data:
+                    datas.append(data)
+            else:
+                datas.append(line)
+    return datas
+
+
+def synthetic_traffic(size: int = 10_000, seed: int = 1) -> List[str]:
+    """Смесь, похожая на реальную: анкета и листание у студентов, списки и решения у админа."""
+    rnd = random.Random(seed)
+
+    def doc() -> str:
+        return f"tg{rnd.randint(10**8, 10**10)}"
+
+    makers: List[Callable[[], str]] = [
+        lambda: "student:begin",
+        lambda: f"student:back:{rnd.choice(FIELD_KEYS)}",
+        lambda: f"student:pick:redDiploma:{rnd.choice(('yes', 'no', 'undecided'))}",
+        lambda: f"student:pick:scienceInterest:{rnd.choice(('yes', 'no', 'maybe'))}",
+        lambda: rnd.choice(("student:confirm:send", "student:confirm:reset", "student:confirm:back")),
+        lambda: f"student:confirm:editmenu:{rnd.randint(1, 3)}",
+        lambda: f"student:edit:{rnd.choice(FIELD_KEYS)}",
+        lambda: f"student:menu:{rnd.choice(('view', 'back', 'edit', 'cancel', 'answer'))}",
+        lambda: f"student:answer:{rnd.choice(('yes', 'no'))}",
+        lambda: f"student:card:{rnd.randint(0, 2)}",
+        lambda: A_SHOW.pack(status="pending"),
+        lambda: A_PAGE.pack(status="pending", before=rnd.random() < 0.3, page=rnd.randint(1, 30), cursor=doc()),
+        lambda: A_VIEW.pack(doc_id=doc(), status="pending"),
+        lambda: A_PART.pack(doc_id=doc(), status="pending", part=1),
+        lambda: A_DECIDE.pack(doc_id=doc(), decision=rnd.choice(("approved", "rejected")), back_status="pending"),
+        lambda: A_TOGGLE.pack(doc_id=doc(), back_status="pending", allow=True),
+        lambda: A_FIND.pack(page=rnd.randint(1, 5)),
+        lambda: "noop",  # кнопка без обработчика
+    ]
+    weights = [2, 4, 2, 2, 3, 1, 2, 6, 1, 1, 3, 6, 8, 1, 4, 1, 1, 1]
+    return [rnd.choices(makers, weights)[0]() for _ in range(size)]
+
+
+def linear_filters(trie: CallbackTrie) -> List[Any]:
+    # частные фильтры раньше общих — иначе «student:confirm» съел бы «student:confirm:back»
+    routes = sorted(trie.routes, key=lambda r: (not r[1], -len(r[0])))
+    return [F.data == key if exact else F.data.startswith(key) for key, exact in routes]
+
+
+def run_linear(filters: List[Any], cb: Any) -> Optional[int]:
+    for i, flt in enumerate(filters):
+        if flt.resolve(cb):
+            return i
+    return None
+
+
+def measure(fn: Callable[[Any], Any], events: List[Any], repeat: int) -> dict:
+    # общий прогон — среднее без накладных расходов на таймер
+    t0 = time.perf_counter_ns()
+    for _ in range(repeat):
+        for ev in events:
+            fn(ev)
+    mean = (time.perf_counter_ns() - t0) / (repeat * len(events))
+
+    samples = []
+    for ev in events:
+        t = time.perf_counter_ns()
+        fn(ev)
+        samples.append(time.perf_counter_ns() - t)
+    samples.sort()
+    return {
+        "mean": mean,
+        "p50": samples[len(samples) // 2],
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Накладные расходы диспетчера кнопок на апдейт")
+    parser.add_argument("traffic", nargs="?", help="файл с callback_data или апдейтами (JSON на строку)")
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="сколько раз прогнать поток")
+    args = parser.parse_args(argv)
+
+    datas = load_traffic(args.traffic) if args.traffic else synthetic_traffic()
+    if not datas:
+        raise SystemExit("в файле нет callback_data")
+    events = [SimpleNamespace(data=d) for d in datas]
+
+    filters = linear_filters(callbacks)
+    resolved = sum(callbacks.resolve(d) is not None for d in datas)
+    print(f"апдейтов: {len(datas)}, с обработчиком: {resolved}, маршрутов: {len(callbacks.routes)}")
+
+    results = {
+        "linear": measure(lambda cb: run_linear(filters, cb), events, args.repeat),
+        "trie": measure(callbacks.match, events, args.repeat),
+    }
+    for name, r in results.items():
+        print(f"{name:>6}: {r['mean'] / 1000:7.2f} мкс/апдейт (p50 {r['p50'] / 1000:.2f}, p99 {r['p99'] / 1000:.2f})")
+    print(f"ускорение: ×{results['linear']['mean'] / results['trie']['mean']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
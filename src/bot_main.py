@@ -1,12 +1,23 @@
 import asyncio
+import logging
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 
 from .config import Settings
+from .appwrite_client import get_async_repo
+from .http_pool import describe
+from .sheets_writer import get_sheets_writer
+from .admin_directory import get_admin_directory
+from .notifier import get_notifier
+from .replica import get_replica
+from .middlewares import ConcurrencyLimitMiddleware, UserSerialMiddleware
+from .fsm_storage import build_storage, reshard_sqlite
 from .student_flow import router as student_router
 from .admin_flow import router as admin_router
+from .dispatch import router as callbacks_router
 
 
 async def set_bot_commands(bot: Bot) -> None:
@@ -19,23 +30,105 @@ async def set_bot_commands(bot: Bot) -> None:
     )
 
 
-async def main():
+async def on_startup(bot: Bot) -> None:
+    # Установим команды в меню
+    await set_bot_commands(bot)
+
+    # Прогреваем пул соединений к Appwrite
+    repo = get_async_repo()
+    await repo.warmup()
+    logging.info("[Appwrite] пул: %s", describe(repo.pool_stats()))
+
+    # Список админов — в кэш, дальше обновляется в фоне
+    await get_admin_directory().start()
+
+    # Реплика заявок для админки
+    if Settings.REPLICA_ENABLED:
+        await get_replica().start()
+
+    # Фоновая запись в Google Sheets
+    await get_sheets_writer().start()
+
+    print("Шифу запущен...")
+
+
+async def on_shutdown(dispatcher: Dispatcher) -> None:
+    # сначала доделываем апдейты в работе (включая ждущие в очередях пользователей),
+    # потом гасим фоновые сервисы
+    serial: UserSerialMiddleware = dispatcher["serial"]
+    await serial.drain(Settings.SHUTDOWN_DRAIN_TIMEOUT)
+    await get_notifier().drain()
+    await get_sheets_writer().stop()
+    await get_replica().stop()
+    await get_admin_directory().stop()
+    await dispatcher.storage.close()
+
+
+def _include_routers(dp: Dispatcher) -> None:
+    # все кнопки — через один фильтр с деревом префиксов (см. dispatch.py)
+    dp.include_router(callbacks_router)
+    dp.include_router(student_router)
+    dp.include_router(admin_router)
+
+
+def used_update_types() -> list[str]:
+    """Типы апдейтов, которые обрабатывает бот, — без хранилища FSM и сервисов."""
+    dp = Dispatcher(storage=MemoryStorage())
+    _include_routers(dp)
+    return dp.resolve_used_update_types()
+
+
+def build_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=build_storage())
+    # порядок важен: сначала очередь пользователя, потом общий лимит —
+    # ждущие своей очереди апдейты не занимают слоты параллельности
+    serial = UserSerialMiddleware(Settings.USER_MAX_PENDING_UPDATES)
+    limiter = ConcurrencyLimitMiddleware(Settings.UPDATE_CONCURRENCY)
+    dp["serial"] = serial
+    dp["concurrency"] = limiter
+    dp.update.outer_middleware(serial)
+    dp.update.outer_middleware(limiter)
+
+    _include_routers(dp)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+def build_bot() -> Bot:
     st = Settings()
-    bot = Bot(
+    return Bot(
         st.TELEGRAM_BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
 
-    dp = Dispatcher()
-    dp.include_router(student_router)
-    dp.include_router(admin_router)
 
-    # Установим команды в меню
-    await set_bot_commands(bot)
-
-    print("Шифу запущен...")
+async def main():
+    bot = build_bot()
+    dp = build_dispatcher()
     await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
 
+def _collect_fsm_shards() -> None:
+    # один процесс после многопроцессного запуска: FSM воркеров — в общий файл
+    if Settings.FSM_STORAGE == "sqlite":
+        reshard_sqlite(Settings.FSM_SQLITE_PATH, 1)
+
+
+def run() -> None:
+    logging.basicConfig(level=logging.INFO)
+    if Settings.BOT_MODE == "webhook":
+        from .webhook import run_webhook
+        _collect_fsm_shards()
+        run_webhook(build_dispatcher(), build_bot())
+    elif Settings.BOT_WORKERS > 1:
+        from .supervisor import run_supervisor
+        run_supervisor(Settings.BOT_WORKERS)
+    else:
+        _collect_fsm_shards()
+        asyncio.run(main())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
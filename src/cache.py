@@ -0,0 +1,65 @@
+"""Небольшой LRU-кэш с TTL для горячих данных процесса."""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU с ограничением размера и временем жизни записей.
+
+    Хранить можно и None (например, «у пользователя нет заявки»), поэтому
+    промах обозначается отдельным маркером MISSING.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[Any], bool]) -> None:
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        now = time.monotonic()
+        for key, (expires, value) in list(self._data.items()):
+            if expires >= now:
+                yield key, value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def describe(self) -> str:
+        return f"size={len(self._data)}/{self.maxsize} hits={self.hits} misses={self.misses}"
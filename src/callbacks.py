@@ -0,0 +1,248 @@
+"""Компактный callback_data для кнопок админки.
+
+Вместо строк вида `admin:decide:<id>:approved:pending:1` кнопка несёт
+типизированный пакет: код действия (1 байт) + поля в бинарном виде,
+закодированные base64url с префиксом `a:` (пространство имён админки
+в диспетчере кнопок, см. dispatch.py). Поля:
+
+  DOC    — id заявки: `tg<число>` → varint, иначе строка;
+  STATUS — pending/approved/rejected → 1 байт;
+  INT    — varint; BOOL — 1 байт;
+  TEXT   — строка (например, название группы).
+
+Короткие строки лежат прямо в пакете, длинные заменяются номером из
+таблицы коротких id (ограниченный LRU в памяти процесса). Двоеточия и
+прочие символы в значениях ничего не ломают — пакет не режется по «:».
+"""
+from __future__ import annotations
+
+import base64
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+PREFIX = "a:"
+# Telegram: callback_data не длиннее 64 байт
+MAX_LENGTH = 64
+# строки длиннее — через таблицу коротких id
+INLINE_MAX = 24
+TABLE_SIZE = 10_000
+
+STATUSES = ("pending", "approved", "rejected")
+
+DOC, STATUS, INT, BOOL, TEXT = "doc", "status", "int", "bool", "text"
+
+_TG_ID = re.compile(r"tg([1-9]\d{0,17})")
+_TAG_TG, _TAG_INLINE, _TAG_REF = 0, 1, 2
+
+
+class CallbackExpired(ValueError):
+    """Кнопка не разбирается: устарела (нет в таблице) или повреждена."""
+
+
+# ----------------------------------------------------------------------------- #
+# Таблица коротких id
+# ----------------------------------------------------------------------------- #
+class ShortIdTable:
+    """Строка ↔ номер; при переполнении забываются давно не нужные строки."""
+
+    def __init__(self, maxsize: int = TABLE_SIZE):
+        self.maxsize = maxsize
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._values: Dict[int, str] = {}
+        self._next = 0
+
+    def ref(self, value: str) -> int:
+        sid = self._ids.get(value)
+        if sid is None:
+            sid = self._next
+            self._next += 1
+            self._ids[value] = sid
+            self._values[sid] = value
+            while len(self._ids) > self.maxsize:
+                _, old = self._ids.popitem(last=False)
+                del self._values[old]
+        else:
+            self._ids.move_to_end(value)
+        return sid
+
+    def resolve(self, sid: int) -> str:
+        value = self._values.get(sid)
+        if value is None:
+            raise CallbackExpired(f"short id {sid} is gone")
+        self._ids.move_to_end(value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+_table = ShortIdTable()
+
+
+# ----------------------------------------------------------------------------- #
+# Примитивы
+# ----------------------------------------------------------------------------- #
+def _put_varint(buf: bytearray, n: int) -> None:
+    if n < 0:
+        raise ValueError("varint must be non-negative")
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            buf.append(b | 0x80)
+        else:
+            buf.append(b)
+            return
+
+
+def _get_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return n, pos
+        shift += 7
+
+
+def _put_text(buf: bytearray, value: str) -> None:
+    raw = value.encode()
+    if len(raw) <= INLINE_MAX:
+        buf.append(_TAG_INLINE)
+        buf.append(len(raw))
+        buf += raw
+    else:
+        buf.append(_TAG_REF)
+        _put_varint(buf, _table.ref(value))
+
+
+def _get_text(data: bytes, pos: int, tag: int) -> Tuple[str, int]:
+    if tag == _TAG_INLINE:
+        size = data[pos]
+        pos += 1
+        return data[pos:pos + size].decode(), pos + size
+    if tag == _TAG_REF:
+        sid, pos = _get_varint(data, pos)
+        return _table.resolve(sid), pos
+    raise CallbackExpired(f"bad text tag {tag}")
+
+
+def _encode_field(buf: bytearray, kind: str, value: Any) -> None:
+    if kind == DOC:
+        m = _TG_ID.fullmatch(str(value))
+        if m:
+            buf.append(_TAG_TG)
+            _put_varint(buf, int(m.group(1)))
+        else:
+            _put_text(buf, str(value))
+    elif kind == STATUS:
+        buf.append(STATUSES.index(value))
+    elif kind == INT:
+        _put_varint(buf, int(value))
+    elif kind == BOOL:
+        buf.append(1 if value else 0)
+    elif kind == TEXT:
+        _put_text(buf, str(value))
+    else:
+        raise ValueError(f"unknown field kind {kind}")
+
+
+def _decode_field(data: bytes, pos: int, kind: str) -> Tuple[Any, int]:
+    if kind == DOC:
+        tag = data[pos]
+        if tag == _TAG_TG:
+            n, pos = _get_varint(data, pos + 1)
+            return f"tg{n}", pos
+        return _get_text(data, pos + 1, tag)
+    if kind == STATUS:
+        return STATUSES[data[pos]], pos + 1
+    if kind == INT:
+        return _get_varint(data, pos)
+    if kind == BOOL:
+        return bool(data[pos]), pos + 1
+    if kind == TEXT:
+        return _get_text(data, pos + 1, data[pos])
+    raise ValueError(f"unknown field kind {kind}")
+
+
+# ----------------------------------------------------------------------------- #
+# Действия
+# ----------------------------------------------------------------------------- #
+class Action:
+    """Тип кнопки: имя, код и упорядоченные поля (имя → тип)."""
+
+    def __init__(self, name: str, code: int, fields: Tuple[Tuple[str, str], ...]):
+        self.name = name
+        self.code = code
+        self.fields = fields
+
+    def pack(self, **values: Any) -> str:
+        buf = bytearray((self.code,))
+        for name, kind in self.fields:
+            _encode_field(buf, kind, values[name])
+        data = PREFIX + base64.urlsafe_b64encode(bytes(buf)).decode().rstrip("=")
+        if len(data.encode()) > MAX_LENGTH:
+            raise ValueError(f"callback_data for {self.name} is too long ({len(data)})")
+        return data
+
+    def __repr__(self) -> str:
+        return f"Action({self.name!r})"
+
+
+class CallbackCodec:
+    def __init__(self):
+        self._by_code: Dict[int, Action] = {}
+
+    def action(self, name: str, **fields: str) -> Action:
+        code = len(self._by_code)
+        if code > 0xFF:
+            raise ValueError("too many callback actions")
+        act = Action(name, code, tuple(fields.items()))
+        self._by_code[code] = act
+        return act
+
+    def unpack(self, data: Optional[str]) -> Tuple[Action, Dict[str, Any]]:
+        if not data or not data.startswith(PREFIX):
+            raise CallbackExpired("not a packed callback")
+        try:
+            body = data[len(PREFIX):]
+            raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+            act = self._by_code[raw[0]]
+            values: Dict[str, Any] = {}
+            pos = 1
+            for name, kind in act.fields:
+                values[name], pos = _decode_field(raw, pos, kind)
+        except CallbackExpired:
+            raise
+        except (ValueError, KeyError, IndexError, UnicodeDecodeError) as e:
+            raise CallbackExpired(str(e)) from e
+        return act, values
+
+
+# ----------------------------------------------------------------------------- #
+# Кнопки админки
+# ----------------------------------------------------------------------------- #
+# код действия — порядковый номер: новые действия добавлять только в конец,
+# иначе уже отправленные кнопки начнут означать другое
+ADMIN = CallbackCodec()
+
+A_NOOP    = ADMIN.action("noop")
+A_MENU    = ADMIN.action("menu")
+A_SHOW    = ADMIN.action("show", status=STATUS)
+A_BACK    = ADMIN.action("back", status=STATUS)
+A_PAGE    = ADMIN.action("page", status=STATUS, before=BOOL, page=INT, cursor=DOC)
+A_SEARCH  = ADMIN.action("search", status=STATUS)
+A_GROUP   = ADMIN.action("group", status=STATUS, group=TEXT)
+A_FIND    = ADMIN.action("find", page=INT)
+A_VIEW    = ADMIN.action("view", doc_id=DOC, status=STATUS)
+A_PART    = ADMIN.action("part", doc_id=DOC, status=STATUS, part=INT)
+A_DECIDE  = ADMIN.action("decide", doc_id=DOC, decision=STATUS, back_status=STATUS)
+A_NOTE    = ADMIN.action("note", doc_id=DOC, back_status=STATUS)
+A_TOGGLE  = ADMIN.action("toggle_reply", doc_id=DOC, back_status=STATUS, allow=BOOL)
+A_ASK     = ADMIN.action("ask", doc_id=DOC, back_status=STATUS)
+A_BULK    = ADMIN.action("bulk", status=STATUS)
+A_BSEL    = ADMIN.action("bulk_select", doc_id=DOC)
+A_BPAGE   = ADMIN.action("bulk_page")
+A_BDO     = ADMIN.action("bulk_decide", decision=STATUS)
@@ -0,0 +1,239 @@
+"""Карточка заявки — один рендерер для админки, студента и уведомлений.
+
+Поля, подписи и порядок берутся из справочника FIELDS; префиксы
+«эмодзи + подпись» собраны заранее, значения экранируются для HTML.
+Готовый текст карточки запоминается по ($id, $updatedAt): повторный показ
+и перерисовка без изменений документа строку не пересобирают.
+
+Длинная карточка (Telegram принимает до 4096 символов) делится на части
+по границам строк — теги и HTML-сущности не разрываются; части тоже
+кэшируются, листание между ними ничего не пересчитывает.
+"""
+from __future__ import annotations
+
+from html import escape
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .cache import MISSING, TTLCache
+from .fields import CARD_SECTIONS, FIELD_EMOJI, FIELD_LABEL
+
+EMPTY = "—"
+CARD_CACHE_SIZE = 2000
+CARD_CACHE_TTL = 3600.0
+# лимит Telegram — 4096 (в UTF-16); запас под «Часть i/n»
+CARD_PAGE_LIMIT = 3900
+
+# [(ключ поля, "👤 ФИО: "), ...] по блокам
+_SEGMENTS = tuple(
+    tuple((key, f"{FIELD_EMOJI[key]} {FIELD_LABEL[key]}: ") for key in section)
+    for section in CARD_SECTIONS
+)
+
+_cache = TTLCache(CARD_CACHE_SIZE, CARD_CACHE_TTL)
+
+Line = Tuple[str, Any]  # (префикс, значение)
+
+
+def ru_status(s: str) -> str:
+    return {
+        "pending":  "В ожидании",
+        "approved": "Принята",
+        "rejected": "Отклонена",
+    }.get((s or "").lower(), s or EMPTY)
+
+
+def answer_text(value: Any) -> str:
+    """student_answer: True/False/None → «принял ✅» / «отклонил ❌» / «—»."""
+    if value is True:
+        return "принял ✅"
+    if value is False:
+        return "отклонил ❌"
+    return EMPTY
+
+
+def _value(value: Any) -> str:
+    if value is None:
+        return EMPTY
+    if isinstance(value, bool):
+        return "да" if value else "нет"
+    s = str(value).strip()
+    return escape(s, quote=False) if s else EMPTY
+
+
+def _render(title: str, doc: Dict[str, Any], tail: Sequence[Sequence[Line]] = ()) -> str:
+    blocks = [title]
+    for section in _SEGMENTS:
+        blocks.append("\n".join(prefix + _value(doc.get(key)) for key, prefix in section))
+    for section in tail:
+        blocks.append("\n".join(prefix + _value(value) for prefix, value in section))
+    return "\n\n".join(blocks)
+
+
+def _utf16_len(s: str) -> int:
+    return len(s.encode("utf-16-le")) // 2
+
+
+def _fit(s: str, limit: int) -> int:
+    """Сколько символов s помещается в limit единиц UTF-16."""
+    size = 0
+    for i, ch in enumerate(s):
+        size += 2 if ord(ch) > 0xFFFF else 1
+        if size > limit:
+            return i
+    return len(s)
+
+
+def _cut(line: str, limit: int) -> Tuple[str, str]:
+    """Отрезать от строки начало не длиннее limit: по пробелу, не внутри &…;."""
+    cut = _fit(line, limit)
+    space = line.rfind(" ", 0, cut)
+    if space > cut // 2:
+        cut = space
+    amp = line.rfind("&", 0, cut)
+    if amp > 0 and ";" not in line[amp:cut]:
+        cut = amp
+    return line[:cut].rstrip(), line[cut:].lstrip()
+
+
+def _chop(line: str, limit: int) -> List[str]:
+    """Слишком длинная строка → куски не длиннее limit."""
+    chunks = []
+    while _utf16_len(line) > limit:
+        head, line = _cut(line, limit)
+        chunks.append(head)
+    if line:
+        chunks.append(line)
+    return chunks
+
+
+def split_card(text: str, limit: int = CARD_PAGE_LIMIT) -> List[str]:
+    """Разбить текст карточки на части не длиннее limit.
+
+    Режем между строками, по возможности — между блоками (пустая строка);
+    строку длиннее остатка страницы — по словам, начиная с этого остатка.
+    Частей из одного заголовка или пары строк не бывает.
+    """
+    if _utf16_len(text) <= limit:
+        return [text]
+
+    # меньше этого страницу не оставляем почти пустой
+    small = limit // 4
+    pages: List[str] = []
+    cur: List[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal cur, size
+        page = "\n".join(cur).strip("\n")
+        if page:
+            pages.append(page)
+        cur, size = [], 0
+
+    def add(line: str) -> None:
+        nonlocal size
+        size += _utf16_len(line) + (1 if cur else 0)
+        cur.append(line)
+
+    for line in text.split("\n"):
+        n = _utf16_len(line)
+        room = limit - size - (1 if cur else 0)
+        if n <= room:
+            add(line)
+            continue
+
+        if n <= limit:
+            # короткий начатый блок лучше перенести целиком к его продолжению,
+            # если до него на странице остаётся достаточно текста
+            brk = len(cur) - 1 - cur[::-1].index("") if "" in cur[1:] else 0
+            if brk:
+                head = _utf16_len("\n".join(cur[:brk]).strip("\n"))
+                tail = cur[brk + 1:]
+                tail_size = _utf16_len("\n".join(tail))
+                if head >= small and tail_size < small and tail_size + 1 + n <= limit:
+                    cur = cur[:brk]
+                    flush()
+                    for t in tail:
+                        add(t)
+                    add(line)
+                    continue
+            flush()
+            add(line)
+            continue
+
+        # строка длиннее страницы: сначала заполняем остаток текущей
+        if cur and room >= small:
+            first, line = _cut(line, room)
+            add(first)
+        flush()
+        chunks = _chop(line, limit)
+        for chunk in chunks[:-1]:
+            pages.append(chunk)
+        add(chunks[-1])
+    flush()
+
+    if len(pages) > 1:
+        pages = [f"{p}\n\n<i>Часть {i}/{len(pages)}</i>" for i, p in enumerate(pages, 1)]
+    return pages
+
+
+def _memo(kind: str, doc: Dict[str, Any], build: Callable[[], Any]) -> Any:
+    doc_id, updated = doc.get("$id"), doc.get("$updatedAt")
+    if not doc_id or not updated:
+        return build()
+    key = (kind, doc_id, updated)
+    text = _cache.get(key)
+    if text is MISSING:
+        text = build()
+        _cache.set(key, text)
+    return text
+
+
+# ------------------------------- виды карточки ------------------------------- #
+def admin_card(doc: Dict[str, Any]) -> str:
+    """Карточка заявки в админке."""
+    return _memo("admin", doc, lambda: _render("<b>Заявка</b>", doc, (
+        (
+            ("📌 Статус: ", ru_status(doc.get("status"))),
+            ("💬 Комментарий: ", doc.get("admin_comment")),
+        ),
+        (
+            ("🗨️ Ответ студента разрешён: ", bool(doc.get("allow_student_reply", False))),
+            ("❓ Вопрос студенту: ", doc.get("admin_question")),
+            ("📝 Ответ студента: ", doc.get("student_text_answer")),
+            ("✅ Выбор студента: ", answer_text(doc.get("student_answer"))),
+        ),
+    )))
+
+
+def student_card(doc: Dict[str, Any]) -> str:
+    """«Моя заявка» у студента."""
+    return _memo("student", doc, lambda: _render("📄 <b>Ваша заявка</b>", doc, (
+        (
+            ("📌 Статус: ", ru_status(doc.get("status"))),
+            ("💬 Комментарий преподавателя: ", doc.get("admin_comment")),
+        ),
+        (
+            ("❓ Вопрос от преподавателя: ", doc.get("admin_question")),
+            ("📝 Ваш текстовый ответ: ", doc.get("student_text_answer")),
+            ("✅ Ваш выбор (если требуется): ", answer_text(doc.get("student_answer"))),
+        ),
+    )))
+
+
+def admin_card_pages(doc: Dict[str, Any]) -> Tuple[str, ...]:
+    return _memo("admin:pages", doc, lambda: tuple(split_card(admin_card(doc))))
+
+
+def student_card_pages(doc: Dict[str, Any]) -> Tuple[str, ...]:
+    return _memo("student:pages", doc, lambda: tuple(split_card(student_card(doc))))
+
+
+def summary_card(data: Dict[str, Any]) -> str:
+    """Проверка анкеты перед отправкой (данные FSM, без кэша)."""
+    return _render("🗂 <b>Проверьте анкету</b>", data)
+
+
+def notification_card(title: str, doc: Dict[str, Any], status: str | None = None) -> str:
+    """Уведомление админам о новой/изменённой заявке."""
+    tail = ((("📌 Статус: ", ru_status(status)),),) if status else ()
+    return _render(f"<b>{escape(title, quote=False)}</b>", doc, tail)
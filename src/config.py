@@ -6,12 +6,60 @@ load_dotenv()
 
 class Settings:
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+
+    # режим получения апдейтов: "polling" | "webhook"
+    BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+    WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+    WEB_PORT = int(os.getenv("PORT", os.getenv("WEB_PORT", "8080")))
+    # число процессов-воркеров в режиме polling (см. supervisor.py)
+    BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+    # сколько апдейтов обрабатывается одновременно и сколько ждать их при остановке
+    UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "64"))
+    SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+    # сколько апдейтов одного пользователя может ждать своей очереди
+    USER_MAX_PENDING_UPDATES = int(os.getenv("USER_MAX_PENDING_UPDATES", "5"))
+
+    # хранилище FSM: "memory" | "sqlite" | "redis"
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "memory").strip().lower()
+    FSM_SQLITE_PATH = os.getenv("FSM_SQLITE_PATH", "./fsm.sqlite3")
+    FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+    FSM_TTL = float(os.getenv("FSM_TTL", str(3 * 24 * 3600)))
+    FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "1"))
     APPWRITE_ENDPOINT = os.getenv("APPWRITE_ENDPOINT", "")
     APPWRITE_PROJECT_ID = os.getenv("APPWRITE_PROJECT_ID", "")
     APPWRITE_API_KEY = os.getenv("APPWRITE_API_KEY", "")
     APPWRITE_DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID", "")
     APPWRITE_COLLECTION_SUBMISSIONS = os.getenv("APPWRITE_COLLECTION_SUBMISSIONS", "")
     APPWRITE_COLLECTION_ADMINS = os.getenv("APPWRITE_COLLECTION_ADMINS", "")
+    # сколько запросов к Appwrite может выполняться одновременно
+    APPWRITE_MAX_WORKERS = int(os.getenv("APPWRITE_MAX_WORKERS", "8"))
+    # пул keep-alive соединений к Appwrite
+    APPWRITE_MAX_CONNECTIONS = int(os.getenv("APPWRITE_MAX_CONNECTIONS", "8"))
+    APPWRITE_CONNECT_TIMEOUT = float(os.getenv("APPWRITE_CONNECT_TIMEOUT", "5"))
+    APPWRITE_READ_TIMEOUT = float(os.getenv("APPWRITE_READ_TIMEOUT", "15"))
+    # повторы идемпотентных запросов при сетевых ошибках/5xx
+    APPWRITE_RETRIES = int(os.getenv("APPWRITE_RETRIES", "2"))
+    APPWRITE_WARMUP_CONNECTIONS = int(os.getenv("APPWRITE_WARMUP_CONNECTIONS", "2"))
+    # кэш списка админов (сек)
+    ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "300"))
+    # заявок на странице списка в админке
+    ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "10"))
+    # кэш заявок по tg_user_id (сек / записей)
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+    # кэш счётчиков заявок по статусам в меню админа (сек)
+    STATUS_COUNT_TTL = float(os.getenv("STATUS_COUNT_TTL", "60"))
+    # локальная реплика заявок для админки: вкл/выкл, опрос изменений и полная сверка (сек)
+    REPLICA_ENABLED = os.getenv("REPLICA_ENABLED", "1") == "1"
+    REPLICA_SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_INTERVAL", "15"))
+    REPLICA_RECONCILE_INTERVAL = float(os.getenv("REPLICA_RECONCILE_INTERVAL", "900"))
+    # лимиты рассылки уведомлений (Telegram: ~30 msg/s всего, 1 msg/s в чат)
+    NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))
+    NOTIFY_PER_CHAT_INTERVAL = float(os.getenv("NOTIFY_PER_CHAT_INTERVAL", "1"))
+    NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "3"))
 
 def utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,101 @@
+"""Диспетчер callback-кнопок: префиксное дерево по сегментам callback_data.
+
+Раньше каждая кнопка была отдельным фильтром `F.data == …` /
+`F.data.startswith(…)`, и aiogram проверял их по очереди — в обоих
+роутерах, на каждый callback. Теперь на все кнопки один фильтр: точные
+ключи ищутся одним обращением к словарю, префиксы — спуском по дереву
+сегментов (`student:back:<key>` → student → back). Побеждает самый
+длинный подходящий префикс, поэтому порядок регистрации не важен.
+
+Обработчик кнопки вызывается как fn(cb, state).
+"""
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+SEP = ":"
+
+CallbackHandler = Callable[[CallbackQuery, FSMContext], Awaitable[Any]]
+
+
+class _Node:
+    __slots__ = ("children", "handler")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.handler: Optional[CallbackHandler] = None
+
+
+class CallbackTrie:
+    def __init__(self):
+        self._exact: Dict[str, CallbackHandler] = {}
+        self._root = _Node()
+        # (ключ, точный?) в порядке регистрации — для бенчмарка и отладки
+        self.routes: List[Tuple[str, bool]] = []
+
+    # ------------------------------ регистрация ------------------------------ #
+    def add(self, key: str, handler: CallbackHandler, exact: bool = True) -> None:
+        if exact:
+            if key in self._exact:
+                raise ValueError(f"callback {key!r} is already registered")
+            self._exact[key] = handler
+        else:
+            node = self._root
+            for segment in key.rstrip(SEP).split(SEP):
+                node = node.children.setdefault(segment, _Node())
+            if node.handler is not None:
+                raise ValueError(f"callback prefix {key!r} is already registered")
+            node.handler = handler
+        self.routes.append((key, exact))
+
+    def exact(self, key: str):
+        """Кнопка с ровно таким callback_data."""
+        def register(fn):
+            self.add(key, fn, exact=True)
+            return fn
+        return register
+
+    def prefix(self, key: str):
+        """Кнопки, у которых callback_data начинается с сегментов key
+        («student:back» — это student:back и student:back:<что угодно>)."""
+        def register(fn):
+            self.add(key, fn, exact=False)
+            return fn
+        return register
+
+    # --------------------------------- поиск --------------------------------- #
+    def resolve(self, data: Optional[str]) -> Optional[CallbackHandler]:
+        if not data:
+            return None
+        handler = self._exact.get(data)
+        if handler is not None:
+            return handler
+        node = self._root
+        for segment in data.split(SEP):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.handler is not None:
+                handler = node.handler
+        return handler
+
+    def match(self, cb: CallbackQuery) -> Any:
+        """Фильтр aiogram: найденный обработчик передаётся в хендлер."""
+        handler = self.resolve(cb.data)
+        if handler is None:
+            return False
+        return {"callback_handler": handler}
+
+
+callbacks = CallbackTrie()
+
+router = Router(name="callbacks")
+
+
+@router.callback_query(callbacks.match)
+async def dispatch_callback(cb: CallbackQuery, state: FSMContext, callback_handler: CallbackHandler):
+    await callback_handler(cb, state)
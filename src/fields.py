@@ -0,0 +1,86 @@
+"""Справочник полей анкеты: общий для сценария студента и карточек заявки.
+
+Порядок вопросов анкеты — порядок FIELDS; вопрос добавляется или
+переставляется правкой таблиц ниже (см. questionnaire.py).
+"""
+
+# ====================== СПРАВОЧНИК ПОЛЕЙ ======================
+FIELDS = [
+    ("full_name",         "ФИО",                     "Введите ФИО полностью"),
+    ("group",             "Группа",                  "Укажите вашу группу (например, ВИС-41)"),
+    ("email",             "Email",                   "Введите рабочий email"),
+    ("birthDate",         "Дата рождения",           "Например, 26.02.2003"),
+    ("books",             "Книги",                   "Какие книги вдохновляют? Какая последняя?"),
+    ("likedRecentMovie",  "Фильм/сериал",            "Что понравилось из последнего?"),
+    ("aboutYou",          "О студенте",              "Что ещё следует о вас знать?"),
+    ("afterUniversity",   "После университета",      "Кем видите себя после выпуска?"),
+    ("redDiploma",        "Красный диплом",          "Выберите вариант ниже"),
+    ("scienceInterest",   "Научная деятельность",    "Выберите вариант ниже"),
+    ("thesisTopic",       "Тема диплома",            "Введите название проекта"),
+    ("thesisDescription", "Описание",                "Коротко опишите проект"),
+    ("analogsProsCons",   "Аналоги (плюсы/минусы)",  "Какие есть аналоги, их плюсы и минусы"),
+    ("plannedFeatures",   "Планируемый функционал",  "Перечень функций (и ролей, если есть)"),
+    ("techStack",         "Стек технологий",         "На чем планируете писать"),
+]
+FIELD_LABEL = {k: label for k, label, _ in FIELDS}
+FIELD_HINT  = {k: hint  for k, _, hint in FIELDS}
+
+# текст вопроса (Markdown); без записи — «подпись: подсказка»
+FIELD_PROMPT = {
+    "full_name":          "👤 Введите *ФИО*:",
+    "group":              "👥 Укажите вашу *группу* (например, ВИС-41):",
+    "email":              "📧 Введите ваш *email*:",
+    "birthDate":          "📅 Введите *дату рождения* (например, 26.02.2003):",
+    "books":              "📚 Какие книги вдохновляют тебя? И какая последняя встретилась на пути твоём?",
+    "likedRecentMovie":   "🎬 *Какой фильм/сериал из последнего вам понравился?*",
+    "aboutYou":           "ℹ️ *Что ещё следует о вас знать?*",
+    "afterUniversity":    "🎓 *Кем видите себя после окончания университета?*",
+    "redDiploma":         "🎖 *Идёте на красный диплом?*",
+    "scienceInterest":    "📑 *Есть ли желание заниматься научной деятельностью?*",
+    "thesisTopic":        "📝 *Введите тему дипломной работы (название проекта)*:",
+    "thesisDescription":  "📄 *Введите описание проекта:*",
+    "analogsProsCons":    "📊 *Какие есть аналоги? Их плюсы и минусы:*",
+    "plannedFeatures":    "⚙️ *Примерный перечень функционала (с ролями при наличии):*",
+    "techStack":          "🖥️ *На чём планируете писать? (стек технологий)*:",
+}
+
+# поля-выборы: (значение, текст кнопки); остальные поля — свободный текст
+FIELD_CHOICES = {
+    "redDiploma":      (("yes", "✅ Да"), ("no", "❌ Нет"), ("undecided", "🤔 Не решил")),
+    "scienceInterest": (("yes", "✅ Да"), ("no", "❌ Нет"), ("maybe", "🤔 Может быть")),
+}
+
+
+def validate_email(value: str) -> bool:
+    return "@" in value and "@" != value[0] and "." in value
+
+
+# проверки текстовых ответов: (функция, что ответить на неподходящее значение)
+FIELD_CHECKS = {
+    "email": (validate_email, "Похоже на некорректный email, попробуйте ещё раз."),
+}
+
+# без этих полей заявка не принимается (как в models.SubmissionCreate)
+REQUIRED_FIELDS = ("full_name", "group", "email", "thesisTopic")
+
+
+def missing_required(data: dict) -> list:
+    """Обязательные поля, которые пусты в data."""
+    return [key for key in REQUIRED_FIELDS if not str(data.get(key) or "").strip()]
+
+
+# эмодзи в карточке заявки
+FIELD_EMOJI = {
+    "full_name": "👤", "group": "👥", "email": "📧", "birthDate": "📅",
+    "books": "📚", "likedRecentMovie": "🎬", "aboutYou": "ℹ️", "afterUniversity": "🎓",
+    "redDiploma": "🎖", "scienceInterest": "📑",
+    "thesisTopic": "📝", "thesisDescription": "📄", "analogsProsCons": "📊",
+    "plannedFeatures": "⚙️", "techStack": "🖥️",
+}
+
+# блоки карточки (между блоками — пустая строка)
+CARD_SECTIONS = (
+    ("full_name", "group", "email", "birthDate"),
+    ("books", "likedRecentMovie", "aboutYou", "afterUniversity", "redDiploma", "scienceInterest"),
+    ("thesisTopic", "thesisDescription", "analogsProsCons", "plannedFeatures", "techStack"),
+)
@@ -0,0 +1,295 @@
+"""Хранилища FSM: незаполненные анкеты и состояния админов переживают рестарт.
+
+FSM_STORAGE выбирает бэкенд:
+  memory — встроенное в aiogram (как раньше, теряется при рестарте);
+  sqlite — файл FSM_SQLITE_PATH, без внешних сервисов;
+  redis  — FSM_REDIS_URL, общий для нескольких воркеров
+           (для локальной проверки годится `fakeredis://`).
+
+Брошенные анкеты удаляются через FSM_TTL секунд без активности.
+"""
+from __future__ import annotations
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from .config import Settings
+
+PURGE_INTERVAL = 60.0
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            getattr(key, "thread_id", None) or "",
+            getattr(key, "business_connection_id", None) or "",
+            key.destiny,
+        )
+    )
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM в SQLite с отложенной пакетной записью.
+
+    Чтение и запись идут в словарь в памяти (микросекунды на переход
+    состояния), изменённые ключи раз в FSM_FLUSH_INTERVAL секунд
+    сбрасываются на диск одной транзакцией.
+    """
+
+    def __init__(self, path: str, ttl: float, flush_interval: float):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+
+        # ключ → (state, data, время последнего изменения)
+        self._items: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self._dirty: set = set()
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._load()
+
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _load(self) -> None:
+        border = time.time() - self.ttl
+        with self._db_lock:
+            self._conn.execute("DELETE FROM fsm WHERE updated_at < ?", (border,))
+            self._conn.commit()
+            rows = self._conn.execute("SELECT key, state, data, updated_at FROM fsm").fetchall()
+        for key, state, data, updated_at in rows:
+            try:
+                self._items[key] = (state, json.loads(data), updated_at)
+            except ValueError:
+                continue
+        if rows:
+            logging.info("[FSM] восстановлено состояний: %d", len(self._items))
+
+    # ------------------------------ доступ ------------------------------ #
+    def _get(self, k: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        item = self._items.get(k)
+        if item is None:
+            return None, {}
+        state, data, updated_at = item
+        if time.time() - updated_at > self.ttl:
+            del self._items[k]
+            self._dirty.add(k)
+            return None, {}
+        return state, data
+
+    def _put(self, k: str, state: Optional[str], data: Dict[str, Any]) -> None:
+        if state is None and not data:
+            self._items.pop(k, None)
+        else:
+            self._items[k] = (state, data, time.time())
+        self._dirty.add(k)
+        self._ensure_task()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = _key(key)
+        _, data = self._get(k)
+        self._put(k, _state_name(state), data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._get(_key(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        k = _key(key)
+        state, _ = self._get(k)
+        self._put(k, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return dict(self._get(_key(key))[1])
+
+    # --------------------------- запись на диск --------------------------- #
+    def _ensure_task(self) -> None:
+        if self._task is None and not self._closed:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="fsm-sqlite-flush")
+
+    def _snapshot(self):
+        keys, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for k in keys:
+            item = self._items.get(k)
+            if item is None:
+                deletes.append((k,))
+            else:
+                state, data, updated_at = item
+                upserts.append((k, state, json.dumps(data, ensure_ascii=False, default=str), updated_at))
+        return upserts, deletes
+
+    def _write(self, upserts, deletes, purge: bool) -> None:
+        with self._db_lock:
+            with self._conn:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                        upserts,
+                    )
+                if deletes:
+                    self._conn.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+                if purge:
+                    self._conn.execute("DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,))
+
+    def _expire(self) -> None:
+        border = time.time() - self.ttl
+        for k in [k for k, (_, _, t) in self._items.items() if t < border]:
+            del self._items[k]
+
+    async def flush(self, purge: bool = False) -> None:
+        if purge:
+            self._expire()
+        upserts, deletes = self._snapshot()
+        if upserts or deletes or purge:
+            try:
+                await asyncio.to_thread(self._write, upserts, deletes, purge)
+            except Exception as e:
+                logging.warning("[FSM] не удалось записать состояния: %s", e)
+                self._dirty.update(k for k, *_ in upserts)
+                self._dirty.update(k for (k,) in deletes)
+
+    async def _run(self) -> None:
+        last_purge = time.monotonic()
+        while not self._closed:
+            await asyncio.sleep(self.flush_interval)
+            purge = time.monotonic() - last_purge > PURGE_INTERVAL
+            if purge:
+                last_purge = time.monotonic()
+            await self.flush(purge=purge)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+def shard_path(base_path: str, index: int, workers: int) -> str:
+    """Файл FSM воркера index; в однопроцессном режиме — сам base_path."""
+    return base_path if workers == 1 else f"{base_path}.{index}"
+
+
+def reshard_sqlite(base_path: str, workers: int) -> int:
+    """Разложить состояния по файлам под новое число воркеров N.
+
+    Воркер i хранит FSM пользователей с user_id % N == i (см.
+    supervisor.shard_of) в `<base_path>.<i>`; один процесс (N=1) — в самом
+    base_path. Если N поменялось между запусками, состояния переносятся в
+    нужные файлы, файлы прежней раскладки удаляются. Вызывать до старта
+    воркеров. Возвращает число перенесённых состояний.
+    """
+    pattern = re.compile(re.escape(base_path) + r"\.(\d+)$")
+    sources = [base_path] if os.path.exists(base_path) else []
+    for path in sorted(glob.glob(glob.escape(base_path) + ".*")):
+        if pattern.match(path):
+            sources.append(path)
+    if not sources:
+        return 0
+    targets = {shard_path(base_path, i, workers) for i in range(workers)}
+
+    conns = {}
+
+    def conn(path: str) -> sqlite3.Connection:
+        c = conns.get(path)
+        if c is None:
+            c = conns[path] = sqlite3.connect(path)
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                " key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+        return c
+
+    moved = 0
+    try:
+        for path in sources:
+            rows = conn(path).execute("SELECT key, state, data, updated_at FROM fsm").fetchall()
+            for row in rows:
+                try:
+                    target = shard_path(base_path, int(row[0].split(":")[2]) % workers, workers)
+                except (IndexError, ValueError):
+                    target = path if path in targets else shard_path(base_path, 0, workers)
+                if target == path:
+                    continue
+                # в целевом файле могло остаться что-то своё — берём более свежее
+                conn(target).execute(
+                    "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data,"
+                    " updated_at = excluded.updated_at WHERE excluded.updated_at > fsm.updated_at",
+                    row,
+                )
+                conn(path).execute("DELETE FROM fsm WHERE key = ?", (row[0],))
+                moved += 1
+        for c in conns.values():
+            c.commit()
+    finally:
+        for c in conns.values():
+            c.close()
+
+    for path in sources:
+        if path not in targets:
+            os.remove(path)
+    if moved:
+        logging.info("[FSM] перенесено состояний под %d воркеров: %d", workers, moved)
+    return moved
+
+
+def build_storage() -> BaseStorage:
+    backend = Settings.FSM_STORAGE
+    ttl = Settings.FSM_TTL
+
+    if backend == "sqlite":
+        return SQLiteStorage(Settings.FSM_SQLITE_PATH, ttl=ttl, flush_interval=Settings.FSM_FLUSH_INTERVAL)
+
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis требует пакет redis: pip install redis") from e
+
+        url = Settings.FSM_REDIS_URL
+        if url.startswith("fakeredis://"):
+            # локальная подмена Redis для проверки без сервера
+            try:
+                from fakeredis.aioredis import FakeRedis
+            except ImportError as e:
+                raise RuntimeError(
+                    "FSM_REDIS_URL=fakeredis:// требует пакет fakeredis: pip install -r requirements-dev.txt"
+                ) from e
+            return RedisStorage(redis=FakeRedis(), state_ttl=int(ttl), data_ttl=int(ttl))
+        return RedisStorage.from_url(url, state_ttl=int(ttl), data_ttl=int(ttl))
+
+    if backend != "memory":
+        logging.warning("⚠️ Неизвестный FSM_STORAGE=%s — использую memory", backend)
+    return MemoryStorage()
@@ -0,0 +1,137 @@
+"""Пул HTTP-соединений для Appwrite.
+
+SDK Appwrite на каждый вызов делает `requests.request(...)`, то есть
+открывает новое TCP/TLS-соединение. PooledClient держит один
+`requests.Session` с keep-alive и ограниченным пулом на хост.
+
+Путь запроса SDK (кодирование параметров, заголовки, разбор ошибок) не
+трогаем: подменяется только транспорт — `requests` внутри appwrite.client
+отправляет запрос через сессию того клиента, который сейчас выполняет
+call в этом потоке. Прочие клиенты SDK работают как раньше.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from appwrite import client as _sdk_client
+from appwrite.client import Client
+
+_local = threading.local()
+
+
+class _Transport:
+    """Вместо модуля requests в appwrite.client: request() — через сессию пула."""
+
+    def request(self, method, url, **kwargs):
+        pooled: Optional[PooledClient] = getattr(_local, "client", None)
+        if pooled is None:
+            return requests.request(method, url, **kwargs)
+        kwargs.setdefault("timeout", pooled.timeout)
+        return pooled.session.request(method, url, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(requests, name)
+
+
+_sdk_client.requests = _Transport()
+
+
+class PooledClient(Client):
+    """Client Appwrite поверх requests.Session с пулом соединений."""
+
+    def __init__(
+        self,
+        max_connections: int = 8,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+    ):
+        super().__init__()
+        self.max_connections = max_connections
+        self.timeout = (connect_timeout, read_timeout)
+
+        self._adapter = HTTPAdapter(
+            pool_connections=1,          # один хост — Appwrite endpoint
+            pool_maxsize=max_connections,
+            pool_block=True,             # при исчерпании пула ждём, а не открываем лишние
+            max_retries=0,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waits = 0
+        self._requests = 0
+
+    # ------------------------------------------------------------------ #
+    def call(self, *args, **kwargs):
+        with self._lock:
+            if self._in_use >= self.max_connections:
+                self._waits += 1
+            self._in_use += 1
+            self._requests += 1
+
+        outer = getattr(_local, "client", None)
+        _local.client = self
+        try:
+            return super().call(*args, **kwargs)
+        finally:
+            _local.client = outer
+            with self._lock:
+                self._in_use -= 1
+
+    # ------------------------------------------------------------------ #
+    def stats(self) -> Dict[str, Any]:
+        """Состояние пула: занятые/свободные соединения и ожидания."""
+        idle = 0
+        opened = 0
+        pools = self._adapter.poolmanager.pools
+        for pool in [pools[k] for k in pools.keys()]:
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            opened += pool.num_connections
+        with self._lock:
+            return {
+                "max_connections": self.max_connections,
+                "in_use": self._in_use,
+                "idle": idle,
+                "waits": self._waits,
+                "requests": self._requests,
+                "opened": opened,
+            }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def make_client(
+    endpoint: str,
+    project: str,
+    key: str,
+    max_connections: int,
+    connect_timeout: float,
+    read_timeout: float,
+) -> PooledClient:
+    client = PooledClient(
+        max_connections=max_connections,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+    )
+    client.set_endpoint(endpoint)
+    client.set_project(project)
+    client.set_key(key)
+    return client
+
+
+def describe(stats: Optional[Dict[str, Any]]) -> str:
+    if not stats:
+        return "—"
+    return (
+        f"in_use={stats['in_use']}/{stats['max_connections']} "
+        f"idle={stats['idle']} waits={stats['waits']} "
+        f"requests={stats['requests']} opened={stats['opened']}"
+    )
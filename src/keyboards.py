@@ -1,5 +1,9 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from typing import List, Dict, Any
+from typing import Any, Collection, Dict, List, Optional
+
+from .callbacks import (
+    STATUSES, A_BACK, A_BDO, A_BPAGE, A_BSEL, A_BULK, A_DECIDE, A_FIND, A_MENU, A_NOOP, A_PAGE, A_SEARCH, A_VIEW,
+)
 
 def confirm_kb():
     kb = InlineKeyboardBuilder()
@@ -16,26 +20,59 @@ def admin_filters_kb(cur_status: str):
     kb.adjust(1)
     return kb.as_markup()
 
-def admin_list_kb(items: List[Dict[str, Any]], status: str, page: int, page_size: int):
+def admin_list_kb(
+    items: List[Dict[str, Any]],
+    status: str,
+    page: int,
+    has_prev: bool,
+    has_next: bool,
+    selected: Optional[Collection[str]] = None,
+):
+    """Список заявок + пейджер.
+
+    В callback_data кнопок «◀️/▶️» — направление, номер страницы и id
+    крайнего документа (курсор) — см. callbacks.A_PAGE.
+    С selected (режим выбора) заявки — чекбоксы, внизу — массовые решения.
+    """
     kb = InlineKeyboardBuilder()
     for doc in items:
         title = f"{doc.get('full_name','?')} | {doc.get('group','?')}"
-        kb.button(text=title[:64], callback_data=f"admin:view:{doc['$id']}:{status}:{page}")
-    kb.adjust(1)
-    nav = InlineKeyboardBuilder()
-    prev_p = max(1, page - 1)
-    next_p = page + 1
-    nav.button(text="◀️", callback_data=f"admin:page:{status}:{prev_p}")
-    nav.button(text=f"Стр. {page}", callback_data="admin:noop")
-    nav.button(text="▶️", callback_data=f"admin:page:{status}:{next_p}")
-    nav.adjust(3)
-    return kb.as_markup(), nav.as_markup()
+        if selected is None:
+            kb.button(text=title[:60], callback_data=A_VIEW.pack(doc_id=doc['$id'], status=status))
+        else:
+            mark = "☑️" if doc["$id"] in selected else "⬜"
+            kb.button(text=f"{mark} {title}"[:60], callback_data=A_BSEL.pack(doc_id=doc['$id']))
+
+    nav = 0
+    if has_prev and items:
+        kb.button(text="◀️", callback_data=A_PAGE.pack(status=status, before=True, page=page - 1, cursor=items[0]['$id']))
+        nav += 1
+    if has_prev or has_next:
+        kb.button(text=f"Стр. {page}", callback_data=A_NOOP.pack())
+        nav += 1
+    if has_next and items:
+        kb.button(text="▶️", callback_data=A_PAGE.pack(status=status, before=False, page=page + 1, cursor=items[-1]['$id']))
+        nav += 1
+
+    if selected is None:
+        kb.button(text="☑️ Выбрать несколько", callback_data=A_BULK.pack(status=status))
+        kb.button(text="🔎 Поиск по группе", callback_data=A_SEARCH.pack(status=status))
+        kb.button(text="⬅️ Назад", callback_data=A_MENU.pack())
+        tail = (1, 1, 1)
+    else:
+        kb.button(text="☑️ Вся страница", callback_data=A_BPAGE.pack())
+        kb.button(text=f"✅ Принять ({len(selected)})", callback_data=A_BDO.pack(decision="approved"))
+        kb.button(text=f"❌ Отклонить ({len(selected)})", callback_data=A_BDO.pack(decision="rejected"))
+        kb.button(text="✖️ Отмена", callback_data=A_BACK.pack(status=status))
+        tail = (1, 2, 1)
+    kb.adjust(*([1] * len(items)), *([nav] if nav else []), *tail)
+    return kb.as_markup()
 
 def decision_kb(doc_id: str, status: str, page: int):
     kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Принять", callback_data=f"admin:decide:{doc_id}:approved:{status}:{page}")
-    kb.button(text="❌ Отклонить", callback_data=f"admin:decide:{doc_id}:rejected:{status}:{page}")
-    kb.button(text="⬅️ Назад", callback_data=f"admin:back:{status}")  
+    kb.button(text="✅ Принять", callback_data=A_DECIDE.pack(doc_id=doc_id, decision="approved", back_status=status))
+    kb.button(text="❌ Отклонить", callback_data=A_DECIDE.pack(doc_id=doc_id, decision="rejected", back_status=status))
+    kb.button(text="⬅️ Назад", callback_data=A_BACK.pack(status=status))
     kb.adjust(2, 1)
     return kb.as_markup()
 
@@ -46,4 +83,26 @@ def student_menu_kb():
     kb.button(text="❌ Отменить", callback_data="student:menu:cancel")
     # kb.button(text="ℹ️ Помощь", url="https://t.me/ArtycoB")  
     kb.adjust(2, 2)
-    return kb.as_markup()
\ No newline at end of file
+    return kb.as_markup()
+
+def admin_find_kb(items: List[Dict[str, Any]], page: int, pages: int):
+    """Результаты /find: карточки + пейджер по номеру страницы."""
+    kb = InlineKeyboardBuilder()
+    for doc in items:
+        title = f"{doc.get('full_name','?')} | {doc.get('group','?')}"
+        # статус вне справочника (старые или правленные вручную заявки) в пакет не влезет
+        status = doc.get('status') if doc.get('status') in STATUSES else 'pending'
+        kb.button(text=title[:60], callback_data=A_VIEW.pack(doc_id=doc['$id'], status=status))
+    nav = 0
+    if page > 1:
+        kb.button(text="◀️", callback_data=A_FIND.pack(page=page - 1))
+        nav += 1
+    if pages > 1:
+        kb.button(text=f"{page}/{pages}", callback_data=A_NOOP.pack())
+        nav += 1
+    if page < pages:
+        kb.button(text="▶️", callback_data=A_FIND.pack(page=page + 1))
+        nav += 1
+    kb.button(text="⬅️ В меню", callback_data=A_MENU.pack())
+    kb.adjust(*([1] * len(items)), *([nav] if nav else []), 1)
+    return kb.as_markup()
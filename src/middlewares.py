@@ -0,0 +1,114 @@
+"""Outer-middleware диспетчера."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+class _InFlight:
+    """Счётчик апдейтов «в работе» для drain при остановке."""
+
+    def __init__(self):
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def _enter(self) -> None:
+        self._in_flight += 1
+        self._idle.clear()
+
+    def _leave(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight == 0:
+            self._idle.set()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def drain(self, timeout: float) -> None:
+        """Дождаться завершения апдейтов в работе (не дольше timeout)."""
+        if self._in_flight == 0:
+            return
+        logging.info("[Bot] жду завершения %d апдейтов…", self._in_flight)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logging.warning("[Bot] не дождался %d апдейтов за %.0f с", self._in_flight, timeout)
+
+
+class ConcurrencyLimitMiddleware(_InFlight, BaseMiddleware):
+    """Ограничивает число одновременно обрабатываемых апдейтов.
+
+    Заодно считает апдейты «в работе», чтобы при остановке дождаться их
+    завершения (drain), а не обрывать на середине.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self._sem = asyncio.Semaphore(limit)
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        self._enter()
+        try:
+            async with self._sem:
+                return await handler(event, data)
+        finally:
+            self._leave()
+
+
+class UserSerialMiddleware(_InFlight, BaseMiddleware):
+    """Апдейты одного пользователя — строго по очереди, разных — параллельно.
+
+    Двойной тап по «Отправить» больше не запускает два confirm_handler
+    одновременно: второй дождётся первого и увидит уже созданную заявку.
+    Очередь на пользователя ограничена max_pending; лишние апдейты
+    отбрасываются (на callback отвечаем «подождите»).
+    """
+
+    def __init__(self, max_pending: int):
+        super().__init__()
+        self.max_pending = max_pending
+        # user_id → [lock, сколько апдейтов ждёт/выполняется]
+        self._slots: Dict[int, List[Any]] = {}
+        self.dropped = 0
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        slot = self._slots.get(user.id)
+        if slot is None:
+            slot = self._slots[user.id] = [asyncio.Lock(), 0]
+        if slot[1] >= self.max_pending:
+            self.dropped += 1
+            await self._reject(event)
+            return None
+
+        slot[1] += 1
+        self._enter()
+        try:
+            # asyncio.Lock справедлив (FIFO) — порядок апдейтов сохраняется
+            async with slot[0]:
+                return await handler(event, data)
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._slots.pop(user.id, None)
+            self._leave()
+
+    @staticmethod
+    async def _reject(event: TelegramObject) -> None:
+        if isinstance(event, Update) and event.callback_query is not None:
+            try:
+                await event.callback_query.answer("Подождите, обрабатываю предыдущее действие…")
+            except Exception:
+                pass
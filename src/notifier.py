@@ -0,0 +1,164 @@
+"""Рассылка уведомлений в Telegram.
+
+Все сообщения админам и студентам идут через один диспетчер: отправка
+параллельная, но в рамках лимитов Telegram (общий — ~30 сообщений/сек,
+на один чат — не чаще раза в секунду). RetryAfter выдерживается,
+сетевые/серверные ошибки повторяются, итоги копятся в метриках.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from .config import Settings
+
+
+class RateLimiter:
+    """Token bucket: не больше `rate` операций в секунду с запасом `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Notifier:
+    def __init__(
+        self,
+        global_rate: float,
+        per_chat_interval: float,
+        max_retries: int,
+    ):
+        self.global_limit = RateLimiter(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_last: Dict[int, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.metrics: Dict[str, int] = {
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "retry_after": 0,
+        }
+
+    # ------------------------------------------------------------------ #
+    async def _wait_chat_slot(self, chat_id: int) -> None:
+        last = self._chat_last.get(chat_id)
+        if last is not None:
+            delay = last + self.per_chat_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def _forget_idle_chats(self) -> None:
+        if len(self._chat_last) < 10_000:
+            return
+        border = time.monotonic() - self.per_chat_interval
+        for chat_id in [c for c, t in self._chat_last.items() if t < border]:
+            lock = self._chat_locks.get(chat_id)
+            if lock is None or not lock.locked():
+                self._chat_last.pop(chat_id, None)
+                self._chat_locks.pop(chat_id, None)
+
+    async def send(self, bot: Bot, chat_id: int, text: str, **kwargs: Any) -> bool:
+        """Отправить одно сообщение с учётом лимитов и повторов. True — доставлено."""
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            attempt = 0
+            while True:
+                await self._wait_chat_slot(chat_id)
+                await self.global_limit.acquire()
+                try:
+                    await bot.send_message(chat_id, text, **kwargs)
+                    self._chat_last[chat_id] = time.monotonic()
+                    self.metrics["sent"] += 1
+                    return True
+                except TelegramRetryAfter as e:
+                    self.metrics["retry_after"] += 1
+                    self.global_limit.pause(e.retry_after)
+                    await asyncio.sleep(e.retry_after)
+                except (TelegramNetworkError, TelegramServerError) as e:
+                    if attempt >= self.max_retries:
+                        logging.warning("[Notify] chat=%s: не доставлено после %d попыток: %s", chat_id, attempt + 1, e)
+                        break
+                    self.metrics["retried"] += 1
+                    await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt))
+                except Exception as e:
+                    # бот заблокирован, чат не найден, разметка не разобрана и т.п. —
+                    # повтор не поможет, но сообщение потеряно: это не INFO
+                    logging.warning("[Notify] chat=%s: не доставлено: %s", chat_id, e)
+                    break
+                finally:
+                    attempt += 1
+            self._chat_last[chat_id] = time.monotonic()
+            self.metrics["failed"] += 1
+            return False
+
+    async def broadcast(self, bot: Bot, chat_ids: Iterable[int], text: str, **kwargs: Any) -> int:
+        """Параллельная рассылка; возвращает число доставленных."""
+        results = await asyncio.gather(*(self.send(bot, cid, text, **kwargs) for cid in set(chat_ids)))
+        self._forget_idle_chats()
+        return sum(1 for ok in results if ok)
+
+    # ------------------------------------------------------------------ #
+    def notify(self, bot: Bot, chat_ids: Iterable[int], text: str, **kwargs: Any) -> asyncio.Task:
+        """Рассылка в фоне — хендлер не ждёт доставки."""
+        task = asyncio.create_task(self.broadcast(bot, list(chat_ids), text, **kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self) -> None:
+        """Дождаться фоновых рассылок (при остановке бота)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def describe(self) -> str:
+        m = self.metrics
+        return (
+            f"sent={m['sent']} failed={m['failed']} retried={m['retried']} "
+            f"retry_after={m['retry_after']} in_flight={len(self._tasks)}"
+        )
+
+
+_notifier: Optional[Notifier] = None
+
+def get_notifier() -> Notifier:
+    global _notifier
+    if _notifier is None:
+        _notifier = Notifier(
+            global_rate=Settings.NOTIFY_GLOBAL_RATE,
+            per_chat_interval=Settings.NOTIFY_PER_CHAT_INTERVAL,
+            max_retries=Settings.NOTIFY_MAX_RETRIES,
+        )
+    return _notifier
@@ -0,0 +1,119 @@
+"""Анкета студента как данные: вопросы, переходы и клавиатуры.
+
+Всё собирается один раз при импорте из таблиц fields.py: у каждого
+вопроса заранее известны соседи (Назад/дальше), проверка ответа и готовые
+клавиатуры. Сценарий (student_flow) по ключу поля достаёт вопрос одним
+обращением к словарю — без списков порядка, словарей состояний и
+текстов, которые раньше пересобирались на каждом шаге.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from .fields import FIELD_CHECKS, FIELD_CHOICES, FIELD_PROMPT, FIELDS
+
+Choice = Tuple[str, str]  # (значение, текст кнопки)
+
+
+class Question:
+    __slots__ = (
+        "key", "label", "hint", "prompt", "choices", "check", "error",
+        "prev", "next", "keyboard", "back_keyboard",
+    )
+
+    def __init__(
+        self,
+        key: str,
+        label: str,
+        hint: str,
+        prompt: str,
+        choices: Tuple[Choice, ...] = (),
+        check: Optional[Callable[[str], bool]] = None,
+        error: str = "",
+    ):
+        self.key = key
+        self.label = label
+        self.hint = hint
+        self.prompt = prompt
+        self.choices = dict(choices)
+        self.check = check
+        self.error = error
+        # заполняет Questionnaire
+        self.prev: Optional[str] = None
+        self.next: Optional[str] = None
+        self.keyboard: Optional[InlineKeyboardMarkup] = None
+        self.back_keyboard: Optional[InlineKeyboardMarkup] = None
+
+    def is_valid(self, value: str) -> bool:
+        return self.check is None or self.check(value)
+
+    def __repr__(self) -> str:
+        return f"Question({self.key!r})"
+
+
+def _build_keyboard(q: Question, with_choices: bool) -> Optional[InlineKeyboardMarkup]:
+    kb = InlineKeyboardBuilder()
+    rows = []
+    if with_choices and q.choices:
+        for value, text in q.choices.items():
+            kb.button(text=text, callback_data=f"student:pick:{q.key}:{value}")
+        rows.append(len(q.choices))
+    if q.prev:
+        kb.button(text="⬅️ Назад", callback_data=f"student:back:{q.prev}")
+        rows.append(1)
+    if not rows:
+        return None
+    kb.adjust(*rows)
+    return kb.as_markup()
+
+
+class Questionnaire:
+    def __init__(self, questions: Iterable[Question]):
+        self.questions: Dict[str, Question] = {}
+        prev: Optional[Question] = None
+        for q in questions:
+            if q.key in self.questions:
+                raise ValueError(f"duplicate question {q.key!r}")
+            self.questions[q.key] = q
+            if prev is not None:
+                prev.next, q.prev = q.key, prev.key
+            prev = q
+        if not self.questions:
+            raise ValueError("questionnaire is empty")
+        self.first = next(iter(self.questions))
+
+        for q in self.questions.values():
+            q.keyboard = _build_keyboard(q, with_choices=True)
+            q.back_keyboard = _build_keyboard(q, with_choices=False)
+
+    def __getitem__(self, key: str) -> Question:
+        return self.questions[key]
+
+    def get(self, key: Optional[str]) -> Optional[Question]:
+        return self.questions.get(key) if key else None
+
+    def __iter__(self):
+        return iter(self.questions.values())
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+def build_form() -> Questionnaire:
+    questions = []
+    for key, label, hint in FIELDS:
+        check, error = FIELD_CHECKS.get(key, (None, ""))
+        questions.append(Question(
+            key, label, hint,
+            prompt=FIELD_PROMPT.get(key) or f"*{label}*: {hint}",
+            choices=FIELD_CHOICES.get(key, ()),
+            check=check,
+            error=error,
+        ))
+    return Questionnaire(questions)
+
+
+FORM = build_form()
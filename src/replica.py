@@ -0,0 +1,223 @@
+"""Локальная реплика коллекции заявок для админки.
+
+Заявок — единицы тысяч, поэтому вся коллекция держится в памяти
+процесса: списки, карточки и счётчики админки строятся без запросов к
+Appwrite.
+
+Синхронизация:
+  * при старте — полная загрузка;
+  * раз в REPLICA_SYNC_INTERVAL — дозагрузка изменённого
+    ($updatedAt >= последнего увиденного);
+  * раз в REPLICA_RECONCILE_INTERVAL — полная сверка, которая находит
+    удалённые в обход бота документы (пока первая загрузка не удалась —
+    она повторяется каждые REPLICA_SYNC_INTERVAL);
+  * собственные записи бота применяются сразу (через слушателя репозитория).
+
+Пока реплика не загружена (или выключена REPLICA_ENABLED=0), админка
+читает из Appwrite напрямую.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .appwrite_client import AsyncAppwriteRepo, SubmissionEvent, get_async_repo
+from .config import Settings
+from .search_index import SubmissionIndex
+from .status_counter import STATUSES
+
+SortKey = Tuple[str, str]
+
+
+def _sort_key(doc: Dict[str, Any]) -> SortKey:
+    # тот же порядок, что и у списка Appwrite по умолчанию — по созданию
+    return (str(doc.get("$createdAt", "")), str(doc["$id"]))
+
+
+class SubmissionReplica:
+    def __init__(self, repo: AsyncAppwriteRepo, sync_interval: float, reconcile_interval: float):
+        self.repo = repo
+        self.sync_interval = sync_interval
+        self.reconcile_interval = reconcile_interval
+
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._order: List[SortKey] = []
+        self.index = SubmissionIndex()
+        # наибольший $updatedAt, полученный от сервера (не от своих записей)
+        self._watermark: Optional[str] = None
+        self._ready = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.synced_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ------------------------------ изменения ------------------------------ #
+    def _upsert(self, doc: Dict[str, Any]) -> None:
+        doc_id = doc["$id"]
+        old = self._docs.get(doc_id)
+        if old is not None:
+            # не затираем более свежую версию (своя запись могла обогнать опрос)
+            if str(doc.get("$updatedAt", "")) < str(old.get("$updatedAt", "")):
+                return
+            old_key, new_key = _sort_key(old), _sort_key(doc)
+            if old_key != new_key:
+                self._remove_key(old_key)
+                bisect.insort(self._order, new_key)
+            self.index.remove(old)
+        else:
+            bisect.insort(self._order, _sort_key(doc))
+        self.index.add(doc)
+        self._docs[doc_id] = doc
+
+    def _remove_key(self, key: SortKey) -> None:
+        i = bisect.bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    def _remove(self, doc_id: str) -> None:
+        old = self._docs.pop(doc_id, None)
+        if old is not None:
+            self._remove_key(_sort_key(old))
+            self.index.remove(old)
+
+    def on_event(self, event: SubmissionEvent) -> None:
+        if event.kind == "delete":
+            self._remove(event.doc_id)
+        elif event.doc:
+            self._upsert(event.doc)
+
+    # ---------------------------- синхронизация ---------------------------- #
+    async def _pull(self, since: Optional[str]) -> Set[str]:
+        """Загрузить изменённое с since; вернуть id всех полученных документов."""
+        seen: Set[str] = set()
+        async for doc in self.repo.iter_submissions_changed(since):
+            self._upsert(doc)
+            seen.add(doc["$id"])
+            updated = str(doc.get("$updatedAt", ""))
+            if self._watermark is None or updated > self._watermark:
+                self._watermark = updated
+        self.synced_at = time.monotonic()
+        return seen
+
+    async def sync(self) -> int:
+        """Дозагрузить изменения с последней синхронизации."""
+        async with self._lock:
+            return len(await self._pull(self._watermark))
+
+    async def reconcile(self) -> int:
+        """Полная сверка: перечитать всё и убрать документы, которых больше нет."""
+        async with self._lock:
+            border = self._watermark
+            seen = await self._pull(None)
+            # то, что появилось уже во время сверки, не трогаем
+            gone = [
+                doc_id for doc_id, doc in self._docs.items()
+                if doc_id not in seen and border is not None and str(doc.get("$updatedAt", "")) <= border
+            ]
+            for doc_id in gone:
+                self._remove(doc_id)
+            self._ready = True
+            return len(gone)
+
+    async def _run(self) -> None:
+        last_reconcile = time.monotonic()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                # первая загрузка не удалась — повторяем её, а не дозагрузку
+                if not self._ready or time.monotonic() - last_reconcile >= self.reconcile_interval:
+                    was_ready = self._ready
+                    removed = await self.reconcile()
+                    last_reconcile = time.monotonic()
+                    if removed:
+                        logging.info("[Replica] сверка: удалено %d", removed)
+                    if not was_ready:
+                        logging.info("[Replica] загружено заявок: %d", len(self._docs))
+                else:
+                    await self.sync()
+            except Exception as e:
+                logging.warning("[Replica] синхронизация не удалась: %s", e)
+
+    async def start(self) -> None:
+        try:
+            await self.reconcile()
+            logging.info("[Replica] загружено заявок: %d", len(self._docs))
+        except Exception as e:
+            logging.warning("[Replica] не удалось загрузить заявки, админка читает Appwrite: %s", e)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="submission-replica")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # -------------------------------- чтение -------------------------------- #
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self._docs.get(doc_id)
+
+    def counts(self) -> Dict[str, int]:
+        by_status = self.index.by_status
+        return {s: len(by_status.get(s, ())) for s in STATUSES}
+
+    def search(self, **conditions) -> List[Dict[str, Any]]:
+        """Заявки по условиям SubmissionIndex.query, в порядке создания."""
+        ids = self.index.query(**conditions)
+        if ids is None:
+            return [self._docs[key[1]] for key in self._order]
+        return sorted((self._docs[i] for i in ids), key=_sort_key)
+
+    def list_submissions(
+        self,
+        status: Optional[str] = None,
+        page_size: int = 20,
+        group: Optional[str] = None,
+        cursor: Optional[str] = None,
+        before: bool = False,
+    ) -> Dict[str, Any]:
+        """То же, что AsyncAppwriteRepo.list_submissions, но из памяти
+        (группа сравнивается нормализованной)."""
+        docs = self._docs
+        matched = self.search(status=status, group=group)
+
+        start, end = 0, page_size
+        anchor = docs.get(cursor) if cursor else None
+        if anchor is not None:
+            key = _sort_key(anchor)
+            # позиция курсора среди отобранных; сам курсор мог уже выпасть из фильтра
+            i = bisect.bisect_left([_sort_key(d) for d in matched], key)
+            if before:
+                start, end = max(0, i - page_size), i
+            else:
+                if i < len(matched) and matched[i]["$id"] == cursor:
+                    i += 1
+                start, end = i, i + page_size
+        return {"total": len(matched), "documents": matched[start:end]}
+
+
+_replica: Optional[SubmissionReplica] = None
+
+def get_replica() -> SubmissionReplica:
+    global _replica
+    if _replica is None:
+        repo = get_async_repo()
+        _replica = SubmissionReplica(
+            repo,
+            sync_interval=Settings.REPLICA_SYNC_INTERVAL,
+            reconcile_interval=Settings.REPLICA_RECONCILE_INTERVAL,
+        )
+        repo.add_listener(_replica.on_event)
+    return _replica
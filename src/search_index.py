@@ -0,0 +1,220 @@
+"""Вторичные индексы над заявками реплики.
+
+  * хэш-индексы: status → id, ключ группы (normalize_group) → id
+    (плюс отсортированный список ключей для поиска по префиксу и с опечатками);
+  * инвертированный индекс по словам thesisTopic / thesisDescription /
+    techStack (слово запроса совпадает и с началом слова: «react» → «reactjs»).
+
+Индексы обновляет SubmissionReplica на каждое изменение документа, запрос
+сводится к пересечению множеств id.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+TEXT_FIELDS = ("thesisTopic", "thesisDescription", "techStack")
+
+_DASHES = str.maketrans({"–": "-", "—": "-", "‑": "-", "−": "-", "_": "-"})
+# латиница, которую путают с кириллицей в названиях групп
+_LOOKALIKES = str.maketrans("ABCEHKMOPTXY", "АВСЕНКМОРТХУ")
+_TOKEN_RE = re.compile(r"[\w#+]+(?:\.[\w#+]+)*")
+
+
+def clean_group(value: Any) -> str:
+    """Группа для сохранения: «виc – 41 » → «ВИC-41».
+
+    Только регистр, тире и пробелы — буквы не подменяются (в «IT-41»
+    латиница настоящая), так что ответ студента остаётся его ответом.
+    """
+    s = str(value or "").upper().translate(_DASHES).strip()
+    s = re.sub(r"\s*-[\s-]*", "-", s)
+    return re.sub(r"\s+", " ", s)
+
+
+def normalize_group(value: Any) -> str:
+    """Ключ группы в индексе: «вис 41», «ВИС41», «BИC-41» → «ВИС-41».
+
+    Сверх clean_group латинские двойники приводятся к кириллице, а пробелы
+    убираются — ключ нужен только для сравнения и наружу не показывается.
+    """
+    s = clean_group(value).translate(_LOOKALIKES)
+    # «ВИС 41» / «ВИС41»: буквы и номер разделяем дефисом
+    s = re.sub(r"^([^\W\d_]+)\s*(\d+[^\W\d_]?)$", r"\1-\2", s)
+    return s.replace(" ", "")
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Левенштейна; всё, что больше limit, — limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return min(prev[-1], limit + 1)
+
+
+def tokenize(text: Any) -> List[str]:
+    """Слова для индекса: нижний регистр, c++ / c# / node.js остаются целыми."""
+    return _TOKEN_RE.findall(str(text or "").lower().replace("ё", "е"))
+
+
+class SubmissionIndex:
+    def __init__(self):
+        self.by_status: Dict[str, Set[str]] = {}
+        self.by_group: Dict[str, Set[str]] = {}
+        # ключ группы → как её показывать (записанное в заявке написание)
+        self.group_label: Dict[str, str] = {}
+        # поле → слово → id
+        self.words: Dict[str, Dict[str, Set[str]]] = {f: {} for f in TEXT_FIELDS}
+        self._vocab: Dict[str, Optional[List[str]]] = {f: None for f in TEXT_FIELDS}
+        self._groups: Optional[List[str]] = None
+
+    # ------------------------------ обновление ------------------------------ #
+    @staticmethod
+    def _put(index: Dict[str, Set[str]], key: str, doc_id: str) -> bool:
+        ids = index.get(key)
+        if ids is None:
+            index[key] = {doc_id}
+            return True
+        ids.add(doc_id)
+        return False
+
+    @staticmethod
+    def _drop(index: Dict[str, Set[str]], key: str, doc_id: str) -> bool:
+        ids = index.get(key)
+        if ids is None:
+            return False
+        ids.discard(doc_id)
+        if not ids:
+            del index[key]
+            return True
+        return False
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        doc_id = doc["$id"]
+        self._put(self.by_status, str(doc.get("status", "")), doc_id)
+        key = normalize_group(doc.get("group"))
+        if self._put(self.by_group, key, doc_id):
+            self.group_label[key] = clean_group(doc.get("group"))
+            self._groups = None
+        for field in TEXT_FIELDS:
+            for word in set(tokenize(doc.get(field))):
+                if self._put(self.words[field], word, doc_id):
+                    self._vocab[field] = None
+
+    def remove(self, doc: Dict[str, Any]) -> None:
+        doc_id = doc["$id"]
+        self._drop(self.by_status, str(doc.get("status", "")), doc_id)
+        key = normalize_group(doc.get("group"))
+        if self._drop(self.by_group, key, doc_id):
+            self.group_label.pop(key, None)
+            self._groups = None
+        for field in TEXT_FIELDS:
+            for word in set(tokenize(doc.get(field))):
+                if self._drop(self.words[field], word, doc_id):
+                    self._vocab[field] = None
+
+    def clear(self) -> None:
+        self.__init__()
+
+    # -------------------------------- запросы -------------------------------- #
+    def _vocabulary(self, field: str) -> List[str]:
+        vocab = self._vocab[field]
+        if vocab is None:
+            vocab = self._vocab[field] = sorted(self.words[field])
+        return vocab
+
+    def word_ids(self, field: str, word: str) -> Set[str]:
+        """id документов, где в поле есть слово, начинающееся с word."""
+        vocab = self._vocabulary(field)
+        index = self.words[field]
+        ids: Set[str] = set()
+        i = bisect.bisect_left(vocab, word)
+        while i < len(vocab) and vocab[i].startswith(word):
+            ids |= index[vocab[i]]
+            i += 1
+        return ids
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        group: Optional[str] = None,
+        words: Optional[Dict[str, Iterable[str]]] = None,
+        anywhere: Iterable[str] = (),
+    ) -> Optional[Set[str]]:
+        """Пересечение условий; None — условий нет (подходит всё)."""
+        sets: List[Set[str]] = []
+        if status:
+            sets.append(self.by_status.get(status, set()))
+        if group:
+            sets.append(self.by_group.get(normalize_group(group), set()))
+        for field, terms in (words or {}).items():
+            for term in terms:
+                sets.append(self.word_ids(field, term))
+        for term in anywhere:
+            found: Set[str] = set()
+            for field in TEXT_FIELDS:
+                found |= self.word_ids(field, term)
+            sets.append(found)
+
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            if not result:
+                break
+            result &= s
+        return result
+
+    # ------------------------------ группы ------------------------------ #
+    def group_count(self, group: str, status: Optional[str] = None) -> int:
+        ids = self.by_group.get(group, set())
+        if status:
+            return len(ids & self.by_status.get(status, set()))
+        return len(ids)
+
+    def match_groups(self, text: str, status: Optional[str] = None, limit: int = 8) -> List[Tuple[str, int]]:
+        """Группы под ввод админа: точное совпадение, затем по префиксу,
+        затем с опечатками. Пары (группа как в заявке, число заявок),
+        пустые — отброшены."""
+        if self._groups is None:
+            self._groups = sorted(self.by_group)
+        groups = self._groups
+        query = normalize_group(text)
+        if not query:
+            return []
+
+        found: List[str] = []
+        i = bisect.bisect_left(groups, query)
+        while i < len(groups) and groups[i].startswith(query):
+            found.append(groups[i])
+            i += 1
+
+        if len(found) < limit:
+            max_dist = 1 if len(query) <= 4 else 2
+            fuzzy = []
+            for g in groups:
+                if g in found:
+                    continue
+                # «ВИС4» ищет и среди «ВИС-41»: сравниваем с началом той же длины
+                d = min(edit_distance(query, g, max_dist), edit_distance(query, g[:len(query)], max_dist))
+                if d <= max_dist:
+                    fuzzy.append((d, g))
+            found.extend(g for _, g in sorted(fuzzy))
+
+        result = []
+        for g in found:
+            count = self.group_count(g, status)
+            if count:
+                result.append((self.group_label.get(g, g), count))
+            if len(result) >= limit:
+                break
+        return result
@@ -0,0 +1,248 @@
+"""Общая сессия Google Sheets для student_flow и admin_flow.
+
+Авторизация, открытие таблицы и чтение заголовков выполняются один раз
+на процесс; токен сервис-аккаунта обновляется только по истечении.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- Google Sheets (опционально) ---
+try:
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import Request
+except Exception:
+    gspread = None
+    Credentials = None
+    Request = None
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+DEFAULT_HEADERS = [
+    "timestamp","appwrite_id","tg_user_id","full_name","group","email",
+    "birthDate","books","likedRecentMovie","aboutYou","afterUniversity",
+    "redDiploma","scienceInterest","thesisTopic","thesisDescription",
+    "analogsProsCons","plannedFeatures","techStack","status",
+]
+
+# возможные названия колонки с id документа Appwrite
+ID_HEADERS = ("appwrite_id", "appwrite id", "id")
+
+# как часто сверять индекс строк с таблицей (сек)
+INDEX_CHECK_INTERVAL = float(os.getenv("GOOGLE_SHEET_INDEX_CHECK_INTERVAL", "600"))
+
+_A1_ROW_RE = re.compile(r"![A-Z]+(\d+)")
+
+
+class SheetSession:
+    def __init__(self, sheet_id: str, tab_name: str, sa_path: str):
+        self.sheet_id = sheet_id
+        self.tab_name = tab_name
+        self.sa_path = sa_path
+
+        self._lock = threading.RLock()
+        self._creds = None
+        self._client = None
+        self._ws = None
+        self._headers: Optional[Dict[str, int]] = None
+
+        # appwrite_id → номер строки; строится одним чтением листа
+        self._rows: Optional[Dict[str, int]] = None
+        self._checked_at = 0.0
+
+    @classmethod
+    def from_env(cls) -> "SheetSession":
+        return cls(
+            sheet_id=os.getenv("GOOGLE_SHEET_ID", ""),
+            tab_name=os.getenv("GOOGLE_SHEET_TAB", "Лист1"),
+            sa_path=os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON_PATH", "./service_account.json"),
+        )
+
+    def _authorize(self) -> None:
+        if gspread is None or Credentials is None:
+            raise RuntimeError("Зависимости gspread / google-auth не установлены.")
+        if not self.sheet_id:
+            raise RuntimeError("GOOGLE_SHEET_ID не задан в .env")
+        if not os.path.exists(self.sa_path):
+            raise RuntimeError(f"Файл сервис-аккаунта не найден: {self.sa_path}")
+
+        self._creds = Credentials.from_service_account_file(self.sa_path, scopes=SCOPES)
+        self._client = gspread.authorize(self._creds)
+
+    def _refresh_if_expired(self) -> None:
+        if self._creds is not None and not self._creds.valid:
+            self._creds.refresh(Request())
+
+    def worksheet(self):
+        """Кэшированный лист; при первом обращении — авторизация и заголовки."""
+        with self._lock:
+            if self._client is None:
+                self._authorize()
+            else:
+                self._refresh_if_expired()
+
+            if self._ws is None:
+                sh = self._client.open_by_key(self.sheet_id)
+                try:
+                    ws = sh.worksheet(self.tab_name)
+                except gspread.exceptions.WorksheetNotFound:
+                    ws = sh.add_worksheet(title=self.tab_name, rows="2000", cols="40")
+
+                headers = ws.row_values(1)
+                if not headers:
+                    ws.append_row(DEFAULT_HEADERS, value_input_option="RAW")
+                    headers = list(DEFAULT_HEADERS)
+                self._set_headers(headers)
+                self._ws = ws
+            return self._ws
+
+    def _set_headers(self, headers: List[str]) -> None:
+        self._headers = {(h or "").strip().lower(): i + 1 for i, h in enumerate(headers)}
+
+    def header_indexes(self) -> Dict[str, int]:
+        """Заголовок (в нижнем регистре) → номер колонки (с 1)."""
+        with self._lock:
+            if self._headers is None:
+                self.worksheet()
+            return dict(self._headers or {})
+
+    # ------------------------- индекс строк ------------------------- #
+    def _build_index(self) -> None:
+        """Один bulk-read: заголовки + колонка ID по всем строкам."""
+        ws = self.worksheet()
+        values = ws.get_all_values()
+        if values:
+            self._set_headers(values[0])
+        id_col = self._id_col()
+        rows: Dict[str, int] = {}
+        if id_col:
+            for i, row in enumerate(values[1:], start=2):
+                if len(row) >= id_col and row[id_col - 1]:
+                    rows[row[id_col - 1]] = i  # повторная подача — актуальна последняя строка
+        self._rows = rows
+        self._checked_at = time.monotonic()
+
+    def _id_col(self) -> Optional[int]:
+        idx = self._headers or {}
+        for h in ID_HEADERS:
+            if h in idx:
+                return idx[h]
+        return None
+
+    def _check_index(self) -> None:
+        """Дешёвая сверка: читаем только колонку ID и пересобираем карту при расхождении."""
+        id_col = self._id_col()
+        if not id_col:
+            return
+        column = self.worksheet().col_values(id_col)
+        rows: Dict[str, int] = {}
+        for i, v in enumerate(column[1:], start=2):
+            if v:
+                rows[v] = i
+        if rows != self._rows:
+            logging.info("[Sheets] индекс строк устарел — пересобираю (%d → %d)", len(self._rows), len(rows))
+            self._rows = rows
+        self._checked_at = time.monotonic()
+
+    def row_of(self, appwrite_id: str) -> Optional[int]:
+        """Номер строки заявки без сканирования всего листа."""
+        with self._lock:
+            if self._rows is None:
+                self._build_index()
+            elif time.monotonic() - self._checked_at > INDEX_CHECK_INTERVAL:
+                self._check_index()
+            if self._id_col() is None:
+                # в таблице нет колонки с id — ищем ячейку по значению
+                cell = self.worksheet().find(appwrite_id)
+                return cell.row if cell else None
+            row = self._rows.get(appwrite_id)
+            if row is None and time.monotonic() - self._checked_at > 5:
+                # строку могли добавить руками — одна пересборка на промах
+                self._build_index()
+                row = self._rows.get(appwrite_id)
+            return row
+
+    def append_rows(self, items: List[Tuple[str, List[Any]]]) -> None:
+        """Добавить строки одним append_rows и сразу занести их в индекс.
+
+        items — пары (appwrite_id, значения строки).
+        """
+        if not items:
+            return
+        with self._lock:
+            ws = self.worksheet()
+            res = ws.append_rows([row for _, row in items], value_input_option="USER_ENTERED")
+            first = _row_from_response(res)
+            if self._rows is None:
+                return
+            if first is None:
+                self._rows = None  # не распарсили ответ — перечитаем при следующем обращении
+                return
+            for offset, (appwrite_id, _) in enumerate(items):
+                if appwrite_id:
+                    self._rows[appwrite_id] = first + offset
+
+    def update_rows(self, updates: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Записать значения по заголовкам в строки заявок одним batch_update.
+
+        Возвращает id заявок, для которых строка не найдена.
+        """
+        missing: List[str] = []
+        with self._lock:
+            batch = []
+            for appwrite_id, values in updates.items():
+                row = self.row_of(appwrite_id)
+                if row is None:
+                    missing.append(appwrite_id)
+                    continue
+                idx = self._headers or {}
+                for header, value in values.items():
+                    col = idx.get(header.lower())
+                    if col:
+                        batch.append({
+                            "range": gspread.utils.rowcol_to_a1(row, col),
+                            "values": [[value]],
+                        })
+            if batch:
+                self.worksheet().batch_update(batch, value_input_option="RAW")
+        return missing
+
+    @property
+    def enabled(self) -> bool:
+        """Sheets настроены в окружении (есть зависимости и id таблицы)."""
+        return gspread is not None and Credentials is not None and bool(self.sheet_id)
+
+    def reset(self) -> None:
+        """Сбросить кэш листа (например, после ошибки доступа)."""
+        with self._lock:
+            self._ws = None
+            self._headers = None
+            self._rows = None
+
+
+def _row_from_response(res: Any) -> Optional[int]:
+    try:
+        m = _A1_ROW_RE.search(res["updates"]["updatedRange"])
+        return int(m.group(1)) if m else None
+    except Exception:
+        return None
+
+
+_session: Optional[SheetSession] = None
+_session_lock = threading.Lock()
+
+def get_sheet_session() -> SheetSession:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = SheetSession.from_env()
+        return _session
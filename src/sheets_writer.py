@@ -0,0 +1,195 @@
+"""Фоновая запись в Google Sheets (write-behind).
+
+Хендлеры только ставят операции в очередь и сразу отвечают пользователю.
+Раз в GOOGLE_SHEET_FLUSH_INTERVAL секунд очередь сбрасывается: все новые
+строки — одним append_rows, все обновления — одним batch_update
+(несколько обновлений одной строки сливаются в одно). Очередь хранится
+на диске, поэтому рестарт ничего не теряет.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sheets import SheetSession, get_sheet_session, gspread
+
+FLUSH_INTERVAL = float(os.getenv("GOOGLE_SHEET_FLUSH_INTERVAL", "5"))
+QUEUE_PATH = os.getenv("GOOGLE_SHEET_QUEUE_PATH", "./sheets_queue.json")
+MAX_BACKOFF = 120.0
+MAX_ATTEMPTS = 8
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """429 и 5xx от Google — повторяем; прочее — ошибка конфигурации/данных."""
+    if gspread is not None and isinstance(exc, gspread.exceptions.APIError):
+        code = getattr(exc, "code", None)
+        if code is None:
+            code = getattr(getattr(exc, "response", None), "status_code", None)
+        return code == 429 or (isinstance(code, int) and code >= 500)
+    return isinstance(exc, (ConnectionError, TimeoutError, OSError))
+
+
+class SheetsWriter:
+    def __init__(self, session: SheetSession, path: str = QUEUE_PATH, interval: float = FLUSH_INTERVAL):
+        self.session = session
+        self.path = path
+        self.interval = interval
+
+        self._appends: List[Tuple[str, List[Any]]] = []
+        self._updates: Dict[str, Dict[str, Any]] = {}
+        # пакет, который сейчас пишется (см. flush)
+        self._in_flight: Tuple[List[Tuple[str, List[Any]]], Dict[str, Dict[str, Any]]] = ([], {})
+        self._attempts = 0
+        self._backoff = 0.0
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._load()
+
+    # ---------------------------- очередь ---------------------------- #
+    def enqueue_append(self, appwrite_id: str, row: List[Any]) -> None:
+        if not self.session.enabled:
+            return
+        self._appends.append((appwrite_id, row))
+        self._persist()
+
+    def enqueue_update(self, appwrite_id: str, values: Dict[str, Any]) -> None:
+        """Обновления одной строки сливаются: побеждает последнее значение."""
+        if not self.session.enabled:
+            return
+        self._updates.setdefault(appwrite_id, {}).update(values)
+        self._persist()
+
+    def enqueue_updates(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """Пакет обновлений разных строк: одна запись очереди на диск."""
+        if not self.session.enabled or not updates:
+            return
+        for appwrite_id, values in updates.items():
+            self._updates.setdefault(appwrite_id, {}).update(values)
+        self._persist()
+
+    def flush_soon(self) -> None:
+        """Сбросить очередь, не дожидаясь интервала (если не ждём после ошибки)."""
+        if not self._backoff:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._appends) + len(self._updates)
+
+    def _persist(self) -> None:
+        tmp = f"{self.path}.tmp"
+        in_appends, in_updates = self._in_flight
+        updates = {k: dict(v) for k, v in in_updates.items()}
+        for appwrite_id, values in self._updates.items():
+            updates.setdefault(appwrite_id, {}).update(values)
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"appends": in_appends + self._appends, "updates": updates},
+                    f, ensure_ascii=False,
+                )
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logging.warning("[Sheets] не удалось сохранить очередь на диск: %s", e)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._appends = [(i, row) for i, row in data.get("appends", [])]
+            self._updates = dict(data.get("updates", {}))
+            if self.pending:
+                logging.info("[Sheets] восстановлено из очереди: %d операций", self.pending)
+        except Exception as e:
+            logging.warning("[Sheets] очередь на диске повреждена, начинаю с пустой: %s", e)
+
+    # ---------------------------- запись ----------------------------- #
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        appends, self._appends = self._appends, []
+        updates, self._updates = self._updates, {}
+        # пока пакет в работе, он остаётся в файле очереди
+        self._in_flight = (appends, updates)
+        try:
+            # сначала строки — обновления могут относиться к только что добавленным
+            if appends:
+                await asyncio.to_thread(self.session.append_rows, appends)
+                # строки уже в таблице: повторять их нельзя — будут дубли
+                appends = []
+                self._in_flight = (appends, updates)
+                self._persist()
+            if updates:
+                missing = await asyncio.to_thread(self.session.update_rows, updates)
+                for appwrite_id in missing:
+                    logging.warning("[Sheets] Не нашёл строку с ID=%s — ничего не обновляю.", appwrite_id)
+        except Exception as e:
+            self._in_flight = ([], {})
+            self._attempts += 1
+            if not _is_retryable(e):
+                self.session.reset()
+                if self._attempts >= MAX_ATTEMPTS:
+                    # отбрасываем только неудавшийся пакет; поставленное за это время остаётся
+                    logging.error("[Sheets] отбрасываю %d операций после %d попыток: %s",
+                                  len(appends) + len(updates), self._attempts, e)
+                    self._attempts = 0
+                    self._backoff = 0.0
+                    self._persist()
+                    return
+            self._requeue(appends, updates)
+            self._persist()
+            self._backoff = min(MAX_BACKOFF, max(1.0, self._backoff * 2)) + random.uniform(0, 1)
+            logging.warning("[Sheets] ошибка записи (%s), повтор через %.1f с", e, self._backoff)
+            return
+
+        self._in_flight = ([], {})
+        self._attempts = 0
+        self._backoff = 0.0
+        self._persist()
+
+    def _requeue(self, appends, updates) -> None:
+        self._appends = appends + self._appends
+        for appwrite_id, values in updates.items():
+            newer = self._updates.get(appwrite_id, {})
+            self._updates[appwrite_id] = {**values, **newer}
+
+    # --------------------------- жизненный цикл --------------------------- #
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval + self._backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="sheets-writer")
+
+    async def stop(self) -> None:
+        """Остановить цикл и сбросить остаток очереди (что не ушло — останется на диске)."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+_writer: Optional[SheetsWriter] = None
+
+def get_sheets_writer() -> SheetsWriter:
+    global _writer
+    if _writer is None:
+        _writer = SheetsWriter(get_sheet_session())
+    return _writer
@@ -0,0 +1,88 @@
+"""Счётчики заявок по статусам для меню админа.
+
+Три total'а запрашиваются параллельно и кэшируются на STATUS_COUNT_TTL
+секунд; собственные записи бота (создание, смена статуса, удаление)
+правят счётчики на месте, без похода в Appwrite.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from .appwrite_client import AsyncAppwriteRepo, SubmissionEvent, get_async_repo
+from .config import Settings
+
+STATUSES = ("pending", "approved", "rejected")
+
+
+class StatusCounter:
+    def __init__(self, repo: AsyncAppwriteRepo, ttl: float):
+        self.repo = repo
+        self.ttl = ttl
+
+        self._counts: Optional[Dict[str, int]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self, status: str) -> int:
+        res = await self.repo.list_submissions(status=status, page=1, page_size=1)
+        return int(res.get("total", 0))
+
+    async def refresh(self) -> None:
+        values = await asyncio.gather(*(self._fetch(s) for s in STATUSES))
+        self._counts = dict(zip(STATUSES, values))
+        self._loaded_at = time.monotonic()
+
+    def _fresh(self) -> bool:
+        return self._counts is not None and time.monotonic() - self._loaded_at <= self.ttl
+
+    async def counts(self) -> Dict[str, Optional[int]]:
+        """Статус → число заявок; None, если посчитать не удалось."""
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    try:
+                        await self.refresh()
+                    except Exception:
+                        pass
+        if self._counts is None:
+            return {s: None for s in STATUSES}
+        return dict(self._counts)
+
+    def invalidate(self) -> None:
+        self._counts = None
+
+    # ------------------------- инкрементальные правки ------------------------- #
+    def _shift(self, status: Optional[str], delta: int) -> None:
+        if self._counts is not None and status in self._counts:
+            self._counts[status] = max(0, self._counts[status] + delta)
+
+    def on_event(self, event: SubmissionEvent) -> None:
+        if self._counts is None:
+            return
+        if event.kind == "create":
+            self._shift((event.doc or {}).get("status"), +1)
+        elif event.kind == "delete":
+            if event.previous and event.previous.get("status"):
+                self._shift(event.previous["status"], -1)
+            else:
+                self.invalidate()
+        elif event.kind == "update" and "status" in event.fields:
+            if event.previous and event.previous.get("status"):
+                self._shift(event.previous["status"], -1)
+                self._shift((event.doc or {}).get("status"), +1)
+            else:
+                # прежний статус неизвестен — честно перечитаем
+                self.invalidate()
+
+
+_counter: Optional[StatusCounter] = None
+
+def get_status_counter() -> StatusCounter:
+    global _counter
+    if _counter is None:
+        repo = get_async_repo()
+        _counter = StatusCounter(repo, ttl=Settings.STATUS_COUNT_TTL)
+        repo.add_listener(_counter.on_event)
+    return _counter
@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart
 from aiogram.fsm.state import StatesGroup, State
@@ -6,40 +6,25 @@ from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
-from .appwrite_client import get_repo
+from .appwrite_client import get_async_repo
+from .dispatch import callbacks
+from .admin_directory import get_admin_directory
+from .notifier import get_notifier
+from .sheets_writer import get_sheets_writer
+from .search_index import clean_group
+from .fields import FIELDS, FIELD_LABEL, missing_required
+from .questionnaire import FORM, Question
+from .cards import notification_card, ru_status, split_card, student_card_pages, summary_card
 
-import os
 from datetime import datetime
-import logging
-
-# --- Google Sheets (опционально) ---
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-except Exception:
-    gspread = None
-    Credentials = None
+from html import escape
 
 router = Router()
 
 # ====================== ВОПРОСЫ АНКЕТЫ ======================
 class StudentForm(StatesGroup):
-    # основной сценарий
-    full_name = State()
-    group = State()
-    email = State()
-    birth_date = State()
-    books = State()
-    liked_recent_movie = State()
-    about_you = State()
-    after_university = State()
-    red_diploma = State()
-    science_interest = State()
-    thesis_topic = State()
-    thesis_description = State()
-    analogs_pros_cons = State()
-    planned_features = State()
-    tech_stack = State()
+    # основной сценарий: текущий вопрос — в данных FSM (form_field), см. questionnaire.py
+    filling = State()
     confirm = State()
 
     # точечное редактирование
@@ -48,71 +33,26 @@ class StudentForm(StatesGroup):
     # текстовый ответ на вопрос от преподавателя
     answering_admin = State()
 
-# порядок полей для шага «Назад»
-ORDER = [
-    "full_name", "group", "email", "birthDate", "books", "likedRecentMovie",
-    "aboutYou", "afterUniversity", "redDiploma", "scienceInterest",
-    "thesisTopic", "thesisDescription", "analogsProsCons",
-    "plannedFeatures", "techStack"
-]
-
-# ====================== СПРАВОЧНИК ПОЛЕЙ ======================
-FIELDS = [
-    ("full_name",         "ФИО",                     "Введите ФИО полностью"),
-    ("group",             "Группа",                  "Укажите вашу группу (например, ВИС-41)"),
-    ("email",             "Email",                   "Введите рабочий email"),
-    ("birthDate",         "Дата рождения",           "Например, 26.02.2003"),
-    ("books",             "Книги",                   "Какие книги вдохновляют? Какая последняя?"),
-    ("likedRecentMovie",  "Фильм/сериал",            "Что понравилось из последнего?"),
-    ("aboutYou",          "О студенте",              "Что ещё следует о вас знать?"),
-    ("afterUniversity",   "После университета",      "Кем видите себя после выпуска?"),
-    ("redDiploma",        "Красный диплом",          "Выберите вариант ниже"),
-    ("scienceInterest",   "Научная деятельность",    "Выберите вариант ниже"),
-    ("thesisTopic",       "Тема диплома",            "Введите название проекта"),
-    ("thesisDescription", "Описание",                "Коротко опишите проект"),
-    ("analogsProsCons",   "Аналоги (плюсы/минусы)",  "Какие есть аналоги, их плюсы и минусы"),
-    ("plannedFeatures",   "Планируемый функционал",  "Перечень функций (и ролей, если есть)"),
-    ("techStack",         "Стек технологий",         "На чем планируете писать"),
-]
-FIELD_LABEL = {k: label for k, label, _ in FIELDS}
-FIELD_HINT  = {k: hint  for k, _, hint in FIELDS}
-
-# ====================== ЛОКАЛЬНЫЕ ХЕЛПЕРЫ ДЛЯ АДМИНОВ (без импортов из admin_flow) ======================
-def _get_admin_chat_ids() -> list[int]:
-    """
-    Возвращает список tg_user_id админов из коллекции админов Appwrite.
-    Без импортов из admin_flow — чтобы не было циклических импортов.
-    """
-    repo = get_repo()
-    try:
-        docs = repo.db.list_documents(
-            database_id=repo.db_id,
-            collection_id=repo.admins_col,
-        ).get("documents", [])
-        ids: list[int] = []
-        for d in docs:
-            try:
-                ids.append(int(str(d.get("tg_user_id", "")).strip()))
-            except Exception:
-                pass
-        return ids
-    except Exception:
-        return []
-
+# ====================== УВЕДОМЛЕНИЯ АДМИНАМ ======================
 async def notify_admins(bot, text: str):
-    try:
-        admin_ids = _get_admin_chat_ids()
-        for aid in admin_ids:
-            try:
-                await bot.send_message(aid, text, parse_mode="HTML")
-            except Exception:
-                pass
-    except Exception:
-        pass
+    """Рассылка всем админам в фоне через общий диспетчер уведомлений."""
+    admin_ids = await get_admin_directory().chat_ids()
+    # длинную заявку — частями (очередь на чат сохраняет их порядок)
+    for part in split_card(text):
+        get_notifier().notify(bot, admin_ids, part, parse_mode="HTML")
+
+def _who(doc: dict) -> str:
+    """«ФИО | группа» для HTML-уведомления: текст студента экранируется."""
+    return " | ".join(escape(str(doc.get(key) or "—"), quote=False) for key in ("full_name", "group"))
 
 # --- Клавиатуры ---
-def student_menu_with_answer_kb(allow_answer: bool, has_question: bool):
+def student_menu_with_answer_kb(allow_answer: bool, has_question: bool, part: int = 0, parts: int = 1):
     kb = InlineKeyboardBuilder()
+    # листание частей длинной заявки
+    if part > 0:
+        kb.button(text="◀️ Предыдущая часть", callback_data=f"student:card:{part - 1}")
+    if part < parts - 1:
+        kb.button(text="Следующая часть ▶️", callback_data=f"student:card:{part + 1}")
     # кнопка текстового ответа — если есть вопрос
     if has_question:
         kb.button(text="📝 Ответить преподавателю", callback_data="student:menu:answer")
@@ -157,50 +97,17 @@ def start_reply_kb() -> ReplyKeyboardMarkup:
         one_time_keyboard=False,
     )
 
-def ru_status(s: str) -> str:
-    return {
-        "pending":  "В ожидании",
-        "approved": "Принята",
-        "rejected": "Отклонена",
-    }.get((s or "").lower(), s or "—")
-
-def back_kb(prev_key: str | None):
-    kb = InlineKeyboardBuilder()
-    if prev_key:
-        kb.button(text="⬅️ Назад", callback_data=f"student:back:{prev_key}")
-        kb.adjust(1)
-        return kb.as_markup()
-    return None
-
-def red_diploma_kb(prev_key: str | None):
-    kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Да",  callback_data="student:redDiploma:yes")
-    kb.button(text="❌ Нет", callback_data="student:redDiploma:no")
-    kb.button(text="🤔 Не решил", callback_data="student:redDiploma:undecided")
-    kb.adjust(3)
-    if prev_key:
-        kb.button(text="⬅️ Назад", callback_data=f"student:back:{prev_key}")
-        kb.adjust(3, 1)
-    return kb.as_markup()
-
-def science_interest_kb(prev_key: str | None):
-    kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Да",  callback_data="student:scienceInterest:yes")
-    kb.button(text="❌ Нет", callback_data="student:scienceInterest:no")
-    kb.button(text="🤔 Может быть", callback_data="student:scienceInterest:maybe")
-    kb.adjust(3)
-    if prev_key:
-        kb.button(text="⬅️ Назад", callback_data=f"student:back:{prev_key}")
-        kb.adjust(3, 1)
-    return kb.as_markup()
-
 def start_continue_kb():
     kb = InlineKeyboardBuilder()
     kb.button(text="▶️ Продолжить", callback_data="student:begin")
     return kb.as_markup()
 
-def confirm_menu_kb(editing: bool = False):
+def confirm_menu_kb(editing: bool = False, part: int = 0, parts: int = 1):
     kb = InlineKeyboardBuilder()
+    if part > 0:
+        kb.button(text="◀️ Предыдущая часть", callback_data=f"student:summary:{part - 1}")
+    if part < parts - 1:
+        kb.button(text="Следующая часть ▶️", callback_data=f"student:summary:{part + 1}")
     kb.button(text=("💾 Сохранить изменения" if editing else "✅ Отправить"),
               callback_data="student:confirm:send")
     kb.button(text="✏️ Изменить ответы", callback_data="student:confirm:editmenu:1")
@@ -231,88 +138,23 @@ def edit_fields_menu_kb(page: int = 1, per_page: int = 6):
     return kb.as_markup()
 
 # ====================== GOOGLE SHEETS ======================
-def _get_sheet():
-    if gspread is None or Credentials is None:
-        raise RuntimeError("Зависимости gspread / google-auth не установлены.")
-
-    sheet_id = os.getenv("GOOGLE_SHEET_ID")
-    tab_name = os.getenv("GOOGLE_SHEET_TAB", "Лист1")
-    sa_path  = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON_PATH", "./service_account.json")
-    if not sheet_id:
-        raise RuntimeError("GOOGLE_SHEET_ID не задан в .env")
-    if not os.path.exists(sa_path):
-        raise RuntimeError(f"Файл сервис-аккаунта не найден: {sa_path}")
-
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds  = Credentials.from_service_account_file(sa_path, scopes=scopes)
-    client = gspread.authorize(creds)
-    sh = client.open_by_key(sheet_id)
-    try:
-        ws = sh.worksheet(tab_name)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = sh.add_worksheet(title=tab_name, rows="2000", cols="30")
-
-    if not ws.row_values(1):
-        headers = [
-            "timestamp","appwrite_id","tg_user_id","full_name","group","email",
-            "birthDate","books","likedRecentMovie","aboutYou","afterUniversity",
-            "redDiploma","scienceInterest","thesisTopic","thesisDescription",
-            "analogsProsCons","plannedFeatures","techStack","status",
-        ]
-        ws.append_row(headers, value_input_option="RAW")
-    return ws
-
 def append_submission_to_sheet(appw_doc: dict):
-    try:
-        ws = _get_sheet()
-        row = [
-            datetime.now().isoformat(timespec="seconds"),
-            appw_doc.get("$id",""), appw_doc.get("tg_user_id",""),
-            appw_doc.get("full_name",""), appw_doc.get("group",""),
-            appw_doc.get("email",""), appw_doc.get("birthDate",""),
-            appw_doc.get("books",""), appw_doc.get("likedRecentMovie",""),
-            appw_doc.get("aboutYou",""), appw_doc.get("afterUniversity",""),
-            appw_doc.get("redDiploma",""), appw_doc.get("scienceInterest",""),
-            appw_doc.get("thesisTopic",""), appw_doc.get("thesisDescription",""),
-            appw_doc.get("analogsProsCons",""), appw_doc.get("plannedFeatures",""),
-            appw_doc.get("techStack",""), appw_doc.get("status","pending"),
-        ]
-        ws.append_row(row, value_input_option="USER_ENTERED")
-    except Exception as e:
-        logging.exception("Не удалось записать заявку в Google Sheets: %s", e)
-
-# ====================== ХЕЛПЕРЫ ======================
-def _format_submission_for_admin(title: str, payload: dict, appwrite_id: str | None = None, status: str | None = None) -> str:
-    status_ru = ru_status(status) if status else "—"
-    lines = [
-        f"<b>{title}</b>",
+    """Ставит строку заявки в очередь фоновой записи в Sheets."""
+    row = [
+        datetime.now().isoformat(timespec="seconds"),
+        appw_doc.get("$id",""), appw_doc.get("tg_user_id",""),
+        appw_doc.get("full_name",""), appw_doc.get("group",""),
+        appw_doc.get("email",""), appw_doc.get("birthDate",""),
+        appw_doc.get("books",""), appw_doc.get("likedRecentMovie",""),
+        appw_doc.get("aboutYou",""), appw_doc.get("afterUniversity",""),
+        appw_doc.get("redDiploma",""), appw_doc.get("scienceInterest",""),
+        appw_doc.get("thesisTopic",""), appw_doc.get("thesisDescription",""),
+        appw_doc.get("analogsProsCons",""), appw_doc.get("plannedFeatures",""),
+        appw_doc.get("techStack",""), appw_doc.get("status","pending"),
     ]
-    lines += [
-        f"👤 ФИО: {payload.get('full_name','—')}",
-        f"👥 Группа: {payload.get('group','—')}",
-        f"📧 Email: {payload.get('email','—')}",
-        f"📅 Дата рождения: {payload.get('birthDate','—')}",
-        "",
-        f"📚 Книги: {payload.get('books','—')}",
-        f"🎬 Фильм/сериал: {payload.get('likedRecentMovie','—')}",
-        f"ℹ️ О студенте: {payload.get('aboutYou','—')}",
-        f"🎓 После университета: {payload.get('afterUniversity','—')}",
-        f"🎖 Красный диплом: {payload.get('redDiploma','—')}",
-        f"📑 Научная деятельность: {payload.get('scienceInterest','—')}",
-        "",
-        f"📝 Тема: {payload.get('thesisTopic','—')}",
-        f"📄 Описание: {payload.get('thesisDescription','—')}",
-        f"📊 Аналоги: {payload.get('analogsProsCons','—')}",
-        f"⚙️ Функционал: {payload.get('plannedFeatures','—')}",
-        f"🖥️ Стек: {payload.get('techStack','—')}",
-    ]
-    if status:
-        lines += ["", f"📌 Статус: {status_ru}"]
-    return "\n".join(lines)
+    get_sheets_writer().enqueue_append(appw_doc.get("$id", ""), row)
 
+# ====================== ХЕЛПЕРЫ ======================
 async def show_greeting_and_outline(msg: Message):
     await msg.answer(
         "Приветствую! 👋\n\n"
@@ -332,90 +174,30 @@ async def show_greeting_and_outline(msg: Message):
         reply_markup=start_continue_kb(),
     )
 
-def validate_email(value: str) -> bool:
-    return "@" in value and "@" != value[0] and "." in value
-
-def prev_key_of(key: str) -> str | None:
-    try:
-        i = ORDER.index(key)
-        return ORDER[i-1] if i > 0 else None
-    except ValueError:
-        return None
-
 async def ask_for_field(target_key: str, msg_or_cb, state: FSMContext):
-    prev = prev_key_of(target_key)
-    mapping = {
-        "full_name": StudentForm.full_name,
-        "group": StudentForm.group,
-        "email": StudentForm.email,
-        "birthDate": StudentForm.birth_date,
-        "books": StudentForm.books,
-        "likedRecentMovie": StudentForm.liked_recent_movie,
-        "aboutYou": StudentForm.about_you,
-        "afterUniversity": StudentForm.after_university,
-        "redDiploma": StudentForm.red_diploma,
-        "scienceInterest": StudentForm.science_interest,
-        "thesisTopic": StudentForm.thesis_topic,
-        "thesisDescription": StudentForm.thesis_description,
-        "analogsProsCons": StudentForm.analogs_proсs if False else StudentForm.analogs_proсs if False else StudentForm.analogs_pros_cons,
-        "plannedFeatures": StudentForm.planned_features,
-        "techStack": StudentForm.tech_stack,
-    }
-    mapping["analogsProsCons"] = StudentForm.analogs_pros_cons
-
-    await state.set_state(mapping[target_key])
-
-    prompts = {
-        "full_name":          "👤 Введите *ФИО*:",
-        "group":              "👥 Укажите вашу *группу* (например, ВИС-41):",
-        "email":              "📧 Введите ваш *email*:",
-        "birthDate":          "📅 Введите *дату рождения* (например, 26.02.2003):",
-        "books":              "📚 Какие книги вдохновляют тебя? И какая последняя встретилась на пути твоём?",
-        "likedRecentMovie":   "🎬 *Какой фильм/сериал из последнего вам понравился?*",
-        "aboutYou":           "ℹ️ *Что ещё следует о вас знать?*",
-        "afterUniversity":    "🎓 *Кем видите себя после окончания университета?*",
-        "redDiploma":         "🎖 *Идёте на красный диплом?*",
-        "scienceInterest":    "📑 *Есть ли желание заниматься научной деятельностью?*",
-        "thesisTopic":        "📝 *Введите тему дипломной работы (название проекта)*:",
-        "thesisDescription":  "📄 *Введите описание проекта:*",
-        "analogsProsCons":    "📊 *Какие есть аналоги? Их плюсы и минусы:*",
-        "plannedFeatures":    "⚙️ *Примерный перечень функционала (с ролями при наличии):*",
-        "techStack":          "🖥️ *На чём планируете писать? (стек технологий)*:",
-    }
-    text = prompts[target_key]
-
-    if target_key == "redDiploma":
-        markup = red_diploma_kb(prev)
-    elif target_key == "scienceInterest":
-        markup = science_interest_kb(prev)
-    else:
-        markup = back_kb(prev)
+    q = FORM[target_key]
+    await state.set_state(StudentForm.filling)
+    await state.update_data(form_field=q.key)
 
     if isinstance(msg_or_cb, Message):
-        await msg_or_cb.answer(text, parse_mode="Markdown", reply_markup=markup)
+        await msg_or_cb.answer(q.prompt, parse_mode="Markdown", reply_markup=q.keyboard)
     else:
-        await msg_or_cb.message.edit_text(text, parse_mode="Markdown", reply_markup=markup)
-
-async def show_summary(msg_or_cb, data: dict, editing: bool = False):
-    text = (
-        "🗂 <b>Проверьте анкету</b>\n\n"
-        f"👤 ФИО: {data.get('full_name','—')}\n"
-        f"👥 Группа: {data.get('group','—')}\n"
-        f"📧 Email: {data.get('email','—')}\n"
-        f"📅 Дата рождения: {data.get('birthDate','—')}\n\n"
-        f"📚 Книги: {data.get('books','—')}\n"
-        f"🎬 Фильм/сериал: {data.get('likedRecentMovie','—')}\n"
-        f"ℹ️ О студенте: {data.get('aboutYou','—')}\n"
-        f"🎓 После университета: {data.get('afterUniversity','—')}\n"
-        f"🎖 Красный диплом: {data.get('redDiploma','—')}\n"
-        f"📑 Научная деятельность: {data.get('scienceInterest','—')}\n\n"
-        f"📝 Тема: {data.get('thesisTopic','—')}\n"
-        f"📄 Описание: {data.get('thesisDescription','—')}\n"
-        f"📊 Аналоги: {data.get('analogsProsCons','—')}\n"
-        f"⚙️ Функционал: {data.get('plannedFeatures','—')}\n"
-        f"🖥️ Стек: {data.get('techStack','—')}\n"
-    )
-    markup = confirm_menu_kb(editing=editing)
+        await msg_or_cb.message.edit_text(q.prompt, parse_mode="Markdown", reply_markup=q.keyboard)
+
+async def next_step(q: Question, msg_or_cb, state: FSMContext):
+    """После ответа на q — следующий вопрос или проверка анкеты."""
+    if q.next:
+        await ask_for_field(q.next, msg_or_cb, state)
+        return
+    data = await state.get_data()
+    await state.set_state(StudentForm.confirm)
+    await show_summary(msg_or_cb, data, editing=bool(data.get("_editing_doc_id")))
+
+async def show_summary(msg_or_cb, data: dict, editing: bool = False, part: int = 0):
+    parts = split_card(summary_card(data))
+    part = min(max(0, part), len(parts) - 1)
+    text = parts[part]
+    markup = confirm_menu_kb(editing=editing, part=part, parts=len(parts))
     if isinstance(msg_or_cb, Message):
         await msg_or_cb.answer(text, reply_markup=markup, parse_mode="HTML")
     else:
@@ -425,8 +207,8 @@ async def show_summary(msg_or_cb, data: dict, editing: bool = False):
 @router.message(CommandStart())
 async def start(msg: Message, state: FSMContext):
     await state.clear()
-    repo = get_repo()
-    existing = repo.get_submission_by_user(str(msg.from_user.id))
+    repo = get_async_repo()
+    existing = await repo.get_submission_by_user(str(msg.from_user.id))
     if existing and existing.get("status") in ("pending", "approved"):
         st = existing["status"]
         await msg.answer(
@@ -438,195 +220,124 @@ async def start(msg: Message, state: FSMContext):
         return
     await show_greeting_and_outline(msg)
 
-@router.callback_query(F.data == "student:begin")
+@callbacks.exact("student:begin")
 async def begin_flow(cb: CallbackQuery, state: FSMContext):
-    await ask_for_field("full_name", cb, state)
+    await ask_for_field(FORM.first, cb, state)
     await cb.answer()
 
-# ----- шаги (текстовые поля) -----
-@router.message(StudentForm.full_name)
-async def step_full_name(msg: Message, state: FSMContext):
-    await state.update_data(full_name=msg.text.strip())
-    await ask_for_field("group", msg, state)
-
-@router.message(StudentForm.group)
-async def step_group(msg: Message, state: FSMContext):
-    await state.update_data(group=msg.text.strip())
-    await ask_for_field("email", msg, state)
-
-@router.message(StudentForm.email)
-async def step_email(msg: Message, state: FSMContext):
-    value = msg.text.strip()
-    if not validate_email(value):
-        await msg.answer("Похоже на некорректный email, попробуйте ещё раз.", reply_markup=back_kb(prev_key_of("email")))
+# ----- шаги анкеты: один обработчик на все вопросы -----
+@router.message(StudentForm.filling)
+async def form_answer(msg: Message, state: FSMContext):
+    q = FORM.get((await state.get_data()).get("form_field"))
+    if q is None:
+        await ask_for_field(FORM.first, msg, state)
         return
-    await state.update_data(email=value)
-    await ask_for_field("birthDate", msg, state)
-
-@router.message(StudentForm.birth_date)
-async def step_birth_date(msg: Message, state: FSMContext):
-    await state.update_data(birthDate=msg.text.strip())
-    await ask_for_field("books", msg, state)
-
-@router.message(StudentForm.books)
-async def step_books(msg: Message, state: FSMContext):
-    await state.update_data(books=msg.text.strip())
-    await ask_for_field("likedRecentMovie", msg, state)
-
-@router.message(StudentForm.liked_recent_movie)
-async def step_movie(msg: Message, state: FSMContext):
-    await state.update_data(likedRecentMovie=msg.text.strip())
-    await ask_for_field("aboutYou", msg, state)
-
-@router.message(StudentForm.about_you)
-async def step_about(msg: Message, state: FSMContext):
-    await state.update_data(aboutYou=msg.text.strip())
-    await ask_for_field("afterUniversity", msg, state)
-
-@router.message(StudentForm.after_university)
-async def step_after_uni(msg: Message, state: FSMContext):
-    await state.update_data(afterUniversity=msg.text.strip())
-    await ask_for_field("redDiploma", msg, state)
-
-# ----- выборы -----
-@router.callback_query(F.data.startswith("student:redDiploma"))
-async def step_red_diploma(cb: CallbackQuery, state: FSMContext):
-    choice = cb.data.split(":")[-1]
-    data = await state.get_data()
-    if data.get("editing_field") == "redDiploma":
-        await state.update_data(redDiploma=choice, editing_field=None)
-        await state.set_state(StudentForm.confirm)
-        await cb.message.edit_reply_markup()
-        await show_summary(cb, await state.get_data(), editing=bool(data.get("_editing_doc_id")))
-        await cb.answer("Обновлено")
+    if q.choices:
+        await msg.answer("Выберите вариант кнопкой ниже.", reply_markup=q.keyboard)
         return
-    await state.update_data(redDiploma=choice)
-    await ask_for_field("scienceInterest", cb, state)
-    await cb.answer()
 
-@router.callback_query(F.data.startswith("student:scienceInterest"))
-async def step_science(cb: CallbackQuery, state: FSMContext):
-    choice = cb.data.split(":")[-1]
+    value = (msg.text or "").strip()
+    if not value:
+        await msg.answer(f"Нужен текстовый ответ. {q.hint}", reply_markup=q.back_keyboard)
+        return
+    if not q.is_valid(value):
+        await msg.answer(q.error, reply_markup=q.back_keyboard)
+        return
+    await state.update_data(**{q.key: value})
+    await next_step(q, msg, state)
+
+@callbacks.prefix("student:pick")
+async def form_pick(cb: CallbackQuery, state: FSMContext):
+    _, _, key, choice = cb.data.split(":", 3)
+    q = FORM.get(key)
+    if q is None or choice not in q.choices:
+        await cb.answer()
+        return
     data = await state.get_data()
-    if data.get("editing_field") == "scienceInterest":
-        await state.update_data(scienceInterest=choice, editing_field=None)
+    if data.get("editing_field") == key:
+        await state.update_data(**{key: choice, "editing_field": None})
         await state.set_state(StudentForm.confirm)
         await cb.message.edit_reply_markup()
         await show_summary(cb, await state.get_data(), editing=bool(data.get("_editing_doc_id")))
         await cb.answer("Обновлено")
         return
-    await state.update_data(scienceInterest=choice)
-    await ask_for_field("thesisTopic", cb, state)
+    await state.update_data(**{key: choice})
+    await next_step(q, cb, state)
     await cb.answer()
 
-# ----- остальные текстовые -----
-@router.message(StudentForm.thesis_topic)
-async def step_topic(msg: Message, state: FSMContext):
-    await state.update_data(thesisTopic=msg.text.strip())
-    await ask_for_field("thesisDescription", msg, state)
-
-@router.message(StudentForm.thesis_description)
-async def step_description(msg: Message, state: FSMContext):
-    await state.update_data(thesisDescription=msg.text.strip())
-    await ask_for_field("analogsProsCons", msg, state)
-
-@router.message(StudentForm.analogs_pros_cons)
-async def step_analogs(msg: Message, state: FSMContext):
-    await state.update_data(analogsProsCons=msg.text.strip())
-    await ask_for_field("plannedFeatures", msg, state)
-
-@router.message(StudentForm.planned_features)
-async def step_features(msg: Message, state: FSMContext):
-    await state.update_data(plannedFeatures=msg.text.strip())
-    await ask_for_field("techStack", msg, state)
-
-@router.message(StudentForm.tech_stack)
-async def step_stack(msg: Message, state: FSMContext):
-    await state.update_data(techStack=msg.text.strip())
-    data = await state.get_data()
-    await state.set_state(StudentForm.confirm)
-    await show_summary(msg, data, editing=bool(data.get("_editing_doc_id")))
-
 # ----- универсальный «Назад» -----
-@router.callback_query(F.data.startswith("student:back:"))
+@callbacks.prefix("student:back:")
 async def on_back(cb: CallbackQuery, state: FSMContext):
     target_key = cb.data.split(":")[-1]
     await ask_for_field(target_key, cb, state)
     await cb.answer()
 
 # ====================== ЭКРАН ПОДТВЕРЖДЕНИЯ / РЕДАКТИРОВАНИЕ ======================
-@router.callback_query(F.data == "student:confirm:back")
+@callbacks.exact("student:confirm:back")
 async def confirm_back(cb: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     await state.set_state(StudentForm.confirm)
     await show_summary(cb, data, editing=bool(data.get("_editing_doc_id")))
     await cb.answer()
 
-@router.callback_query(F.data.startswith("student:confirm:editmenu:"))
-async def confirm_edit_menu(cb: CallbackQuery):
+@callbacks.prefix("student:confirm:editmenu:")
+async def confirm_edit_menu(cb: CallbackQuery, state: FSMContext):
     page = int(cb.data.split(":")[-1])
     await cb.message.edit_reply_markup(reply_markup=edit_fields_menu_kb(page))
     await cb.answer()
 
-@router.callback_query(F.data.startswith("student:edit:"))
+@callbacks.prefix("student:edit:")
 async def choose_field_to_edit(cb: CallbackQuery, state: FSMContext):
-    key = cb.data.split(":")[-1]
-    if key == "redDiploma":
-        await state.update_data(editing_field="redDiploma")
-        await cb.message.edit_text(
-            f"Изменить: <b>{FIELD_LABEL[key]}</b>\nВыберите вариант:",
-            parse_mode="HTML",
-            reply_markup=red_diploma_kb(prev_key_of("redDiploma")),
-        )
+    q = FORM.get(cb.data.split(":")[-1])
+    if q is None:
         await cb.answer()
         return
-    if key == "scienceInterest":
-        await state.update_data(editing_field="scienceInterest")
+    await state.update_data(editing_field=q.key)
+    if q.choices:
         await cb.message.edit_text(
-            f"Изменить: <b>{FIELD_LABEL[key]}</b>\nВыберите вариант:",
+            f"Изменить: <b>{q.label}</b>\nВыберите вариант:",
             parse_mode="HTML",
-            reply_markup=science_interest_kb(prev_key_of("scienceInterest")),
+            reply_markup=q.keyboard,
         )
         await cb.answer()
         return
 
-    await state.update_data(editing_field=key)
     await state.set_state(StudentForm.editing)
     await cb.message.edit_text(
-        f"✏️ Отправьте новое значение для поля <b>{FIELD_LABEL[key]}</b>\n\n"
-        f"<i>{FIELD_HINT.get(key,'')}</i>",
+        f"✏️ Отправьте новое значение для поля <b>{q.label}</b>\n\n"
+        f"<i>{q.hint}</i>",
         parse_mode="HTML",
-        reply_markup=back_kb(prev_key_of(key)),
+        reply_markup=q.back_keyboard,
     )
     await cb.answer()
 
 @router.message(StudentForm.editing)
 async def save_edited_value(msg: Message, state: FSMContext):
     data = await state.get_data()
-    field = data.get("editing_field")
-    if not field:
+    q = FORM.get(data.get("editing_field"))
+    if q is None:
         await state.set_state(StudentForm.confirm)
         await show_summary(msg, await state.get_data(), editing=bool(data.get("_editing_doc_id")))
         return
 
-    val = msg.text.strip()
-    if field == "email" and not validate_email(val):
-        await msg.answer("Некорректный email, попробуйте ещё раз.", reply_markup=back_kb(prev_key_of("email")))
+    val = (msg.text or "").strip()
+    if not val or not q.is_valid(val):
+        await msg.answer(q.error or f"Нужен текстовый ответ. {q.hint}", reply_markup=q.back_keyboard)
         return
 
-    await state.update_data(**{field: val, "editing_field": None})
+    await state.update_data(**{q.key: val, "editing_field": None})
     await state.set_state(StudentForm.confirm)
     await show_summary(msg, await state.get_data(), editing=bool(data.get("_editing_doc_id")))
 
 # ====================== ОТПРАВКА / СОХРАНЕНИЕ ======================
-@router.callback_query(F.data.startswith("student:confirm"))
+@callbacks.prefix("student:confirm")
 async def confirm_handler(cb: CallbackQuery, state: FSMContext):
     parts = cb.data.split(":")
     action = parts[-1] if len(parts) >= 3 else ""
 
     if action == "reset":
         await state.clear()
-        await ask_for_field("full_name", cb, state)
+        await ask_for_field(FORM.first, cb, state)
         await cb.answer()
         return
 
@@ -637,47 +348,33 @@ async def confirm_handler(cb: CallbackQuery, state: FSMContext):
         return
 
     if action == "send":
+        # повторное нажатие встаёт в очередь за первым (UserSerialMiddleware)
+        # и приходит уже после state.clear() — второй раз ничего не пишем
+        if await state.get_state() != StudentForm.confirm.state:
+            await cb.answer()
+            return
         data = await state.get_data()
-        repo = get_repo()
+        missing = missing_required(data)
+        if missing:
+            await cb.answer("Не заполнено: " + ", ".join(FIELD_LABEL[k] for k in missing), show_alert=True)
+            return
+        repo = get_async_repo()
 
         payload = {
             "tg_user_id": str(cb.from_user.id),
-            "full_name": data.get("full_name"),
-            "group": data.get("group"),
-            "email": data.get("email"),
-            "birthDate": data.get("birthDate"),
-            "books": data.get("books"),
-            "likedRecentMovie": data.get("likedRecentMovie"),
-            "aboutYou": data.get("aboutYou"),
-            "afterUniversity": data.get("afterUniversity"),
-            "redDiploma": data.get("redDiploma"),
-            "scienceInterest": data.get("scienceInterest"),
-            "thesisTopic": data.get("thesisTopic"),
-            "thesisDescription": data.get("thesisDescription"),
-            "analogsProsCons": data.get("analogsProsCons"),
-            "plannedFeatures": data.get("plannedFeatures"),
-            "techStack": data.get("techStack"),
+            **{key: data.get(key) for key in FORM.questions},
+            # « вис – 41» → «ВИС-41»: регистр, тире и пробелы, без подмены букв
+            "group": clean_group(data.get("group")) or data.get("group"),
         }
 
         editing_doc_id = data.get("_editing_doc_id")
         if editing_doc_id:
-            repo.db.update_document(
-                database_id=repo.db_id,
-                collection_id=repo.sub_col,
-                document_id=editing_doc_id,
-                data=payload,
-            )
+            doc = await repo.update_submission(editing_doc_id, payload)
 
-            admin_text = _format_submission_for_admin(
-                title="✏️ Заявка обновлена",
-                payload=payload,
-                appwrite_id=editing_doc_id,
-                status=None,
-            )
+            admin_text = notification_card("✏️ Заявка обновлена", payload)
             await notify_admins(cb.bot, admin_text)
 
             await state.clear()
-            doc = repo.get_submission_by_user(str(cb.from_user.id))
             await cb.message.edit_text(
                 "💾 <b>Изменения сохранены!</b>\n\nДоступные действия:",
                 reply_markup=student_actions_kb(doc),
@@ -687,99 +384,85 @@ async def confirm_handler(cb: CallbackQuery, state: FSMContext):
             return
 
         payload["status"] = "pending"
-        created = repo.create_submission(payload)
+        created, saved = await repo.upsert_submission(payload)
+        if not saved:
+            # уже есть заявка, которую нельзя подать заново (на рассмотрении или одобрена)
+            await state.clear()
+            await cb.message.edit_text(
+                f"У вас уже есть заявка со статусом: <b>{ru_status(created.get('status', 'pending'))}</b>.\n\n"
+                "Доступные действия:",
+                reply_markup=student_actions_kb(created),
+                parse_mode="HTML",
+            )
+            await cb.answer()
+            return
 
         payload_with_ids = dict(payload)
         payload_with_ids["$id"] = created.get("$id")
         append_submission_to_sheet(payload_with_ids)
 
-        admin_text = _format_submission_for_admin(
-            title="🆕 Новая заявка",
-            payload=payload,
-            appwrite_id=created.get("$id"),
-            status=payload.get("status"),
-        )
+        admin_text = notification_card("🆕 Новая заявка", payload, status=payload.get("status"))
         await notify_admins(cb.bot, admin_text)
 
         await state.clear()
-        doc = repo.get_submission_by_user(str(cb.from_user.id))
         await cb.message.edit_text(
             "✅ <b>Анкета отправлена!</b>\n\n"
             f"Статус: ⏳ {ru_status('pending')}\n"
             "О решении придёт уведомление.\n\n"
             "Доступные действия:",
-            reply_markup=student_actions_kb(doc),
+            reply_markup=student_actions_kb(created),
             parse_mode="HTML",
         )
         await cb.answer("Отправлено")
         return
 
 # ====================== МОЯ ЗАЯВКА / МЕНЮ ДЕЙСТВИЙ ======================
-@router.callback_query(F.data == "student:menu:view")
-async def view_submission(cb: CallbackQuery):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+@callbacks.exact("student:menu:view")
+async def view_submission(cb: CallbackQuery, state: FSMContext):
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     if not doc:
         await cb.answer("У вас нет заявки.", show_alert=True)
         return
 
-    status_ru_ = ru_status(doc.get("status"))
-    admin_comment = doc.get("admin_comment")
-    admin_comment = admin_comment if (isinstance(admin_comment, str) and admin_comment.strip()) else "нет"
+    await _show_student_card_part(cb, doc, 0)
+    await cb.answer()
+
+async def _show_student_card_part(cb: CallbackQuery, doc: dict, part: int):
+    parts = student_card_pages(doc)
+    part = min(max(0, part), len(parts) - 1)
     allow_answer = bool(doc.get("allow_student_reply", False))
-    admin_question = doc.get("admin_question") or "—"
+    has_question = bool(doc.get("admin_question"))
+    await cb.message.edit_text(parts[part], parse_mode="HTML",
+                               reply_markup=student_menu_with_answer_kb(allow_answer, has_question, part, len(parts)))
 
-    ans_bool = doc.get("student_answer", None)
-    if ans_bool is True:
-        ans_bool_text = "принял ✅"
-    elif ans_bool is False:
-        ans_bool_text = "отклонил ❌"
-    else:
-        ans_bool_text = "—"
-
-    text_answer = doc.get("student_text_answer") or "—"
-
-    text = (
-        "📄 <b>Ваша заявка</b>\n\n"
-        f"👤 ФИО: {doc.get('full_name','—')}\n"
-        f"👥 Группа: {doc.get('group','—')}\n"
-        f"📧 Email: {doc.get('email','—')}\n"
-        f"📅 Дата рождения: {doc.get('birthDate','—')}\n\n"
-        f"📚 Книги: {doc.get('books','—')}\n"
-        f"🎬 Фильм/сериал: {doc.get('likedRecentMovie','—')}\n"
-        f"ℹ️ О студенте: {doc.get('aboutYou','—')}\n"
-        f"🎓 После университета: {doc.get('afterUniversity','—')}\n"
-        f"🎖 Красный диплом: {doc.get('redDiploma','—')}\n"
-        f"📑 Научная деятельность: {doc.get('scienceInterest','—')}\n\n"
-        f"📝 Тема: {doc.get('thesisTopic','—')}\n"
-        f"📄 Описание: {doc.get('thesisDescription','—')}\n"
-        f"📊 Аналоги: {doc.get('analogsProsCons','—')}\n"
-        f"⚙️ Функционал: {doc.get('plannedFeatures','—')}\n"
-        f"🖥️ Стек: {doc.get('techStack','—')}\n\n"
-        f"📌 Статус: {status_ru_}\n"
-        f"💬 Комментарий преподавателя: {admin_comment}\n\n"
-        f"❓ Вопрос от преподавателя: {admin_question}\n"
-        f"📝 Ваш текстовый ответ: {text_answer}\n"
-        f"✅ Ваш выбор (если требуется): {ans_bool_text}"
-    )
+@callbacks.prefix("student:card:")
+async def view_submission_part(cb: CallbackQuery, state: FSMContext):
+    doc = await get_async_repo().get_submission_by_user(str(cb.from_user.id))
+    if not doc:
+        await cb.answer("У вас нет заявки.", show_alert=True)
+        return
+    await _show_student_card_part(cb, doc, int(cb.data.split(":")[2]))
+    await cb.answer()
 
-    has_question = bool(doc.get("admin_question"))
-    await cb.message.edit_text(text, parse_mode="HTML",
-                               reply_markup=student_menu_with_answer_kb(allow_answer, has_question))
+@callbacks.prefix("student:summary:")
+async def summary_part(cb: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    await show_summary(cb, data, editing=bool(data.get("_editing_doc_id")), part=int(cb.data.split(":")[2]))
     await cb.answer()
 
-@router.callback_query(F.data == "student:menu:back")
-async def student_menu_back(cb: CallbackQuery):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+@callbacks.exact("student:menu:back")
+async def student_menu_back(cb: CallbackQuery, state: FSMContext):
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     await cb.message.edit_text("Доступные действия:", reply_markup=student_actions_kb(doc))
     await cb.answer()
 
-@router.callback_query(F.data == "student:menu:edit")
+@callbacks.exact("student:menu:edit")
 async def edit_submission(cb: CallbackQuery, state: FSMContext):
     """Загружаем текущую заявку и переходим на экран подтверждения для точечного редактирования."""
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     if not doc:
         await cb.answer("У вас нет заявки.", show_alert=True)
         return
@@ -790,22 +473,8 @@ async def edit_submission(cb: CallbackQuery, state: FSMContext):
         return
 
     preload = {
-        "full_name":         doc.get("full_name",""),
-        "group":             doc.get("group",""),
-        "email":             doc.get("email",""),
-        "birthDate":         doc.get("birthDate",""),
-        "books":             doc.get("books",""),
-        "likedRecentMovie":  doc.get("likedRecentMovie",""),
-        "aboutYou":          doc.get("aboutYou",""),
-        "afterUniversity":   doc.get("afterUniversity",""),
-        "redDiploma":        doc.get("redDiploma",""),
-        "scienceInterest":   doc.get("scienceInterest",""),
-        "thesisTopic":       doc.get("thesisTopic",""),
-        "thesisDescription": doc.get("thesisDescription",""),
-        "analogsProsCons":   doc.get("analogsProsCons",""),
-        "plannedFeatures":   doc.get("plannedFeatures",""),
-        "techStack":         doc.get("techStack",""),
-        "_editing_doc_id":   doc.get("$id"),
+        **{key: doc.get(key, "") for key in FORM.questions},
+        "_editing_doc_id": doc.get("$id"),
     }
     await state.clear()
     await state.update_data(**preload)
@@ -815,24 +484,24 @@ async def edit_submission(cb: CallbackQuery, state: FSMContext):
     await show_summary(cb, preload, editing=True)
     await cb.answer()
 
-@router.callback_query(F.data == "student:menu:cancel")
-async def cancel_submission(cb: CallbackQuery):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+@callbacks.exact("student:menu:cancel")
+async def cancel_submission(cb: CallbackQuery, state: FSMContext):
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     if not doc:
         await cb.answer("У вас нет заявки.", show_alert=True)
         return
 
-    repo.db.delete_document(repo.db_id, repo.sub_col, doc["$id"])
+    await repo.delete_submission(doc["$id"], previous=doc)
     await cb.message.edit_text("❌ Ваша заявка удалена.\n\nВы можете заполнить её заново через /start.")
     await cb.answer("Удалено")
 
 # ====================== ОТВЕТ СТУДЕНТА ======================
 # 1) ТЕКСТОВЫЙ ответ на вопрос преподавателя
-@router.callback_query(F.data == "student:menu:answer")
+@callbacks.exact("student:menu:answer")
 async def student_answer_begin(cb: CallbackQuery, state: FSMContext):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     if not doc:
         await cb.answer("Заявка не найдена.", show_alert=True)
         return
@@ -849,8 +518,8 @@ async def student_answer_begin(cb: CallbackQuery, state: FSMContext):
 
 @router.message(StudentForm.answering_admin)
 async def student_answer_text_save(msg: Message, state: FSMContext):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(msg.from_user.id))
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(msg.from_user.id))
     if not doc:
         await msg.answer("Заявка не найдена.")
         await state.clear()
@@ -858,11 +527,9 @@ async def student_answer_text_save(msg: Message, state: FSMContext):
 
     answer = msg.text.strip()
     try:
-        repo.db.update_document(
-            database_id=repo.db_id,
-            collection_id=repo.sub_col,
-            document_id=doc["$id"],
-            data={
+        await repo.update_submission(
+            doc["$id"],
+            {
                 "student_text_answer": answer,
                 # закрываем «режим ответов» после отправки текста
                 "allow_student_reply": False,
@@ -876,8 +543,8 @@ async def student_answer_text_save(msg: Message, state: FSMContext):
     await notify_admins(
         msg.bot,
         "📨 <b>Текстовый ответ студента по заявке</b>\n"
-        f"👤 {doc.get('full_name','—')} | {doc.get('group','—')}\n"
-        f"📝 Ответ: {answer}\n\n"
+        f"👤 {_who(doc)}\n"
+        f"📝 Ответ: {escape(answer, quote=False)}\n\n"
         f"Открыть панель: /admin"
     )
 
@@ -886,19 +553,17 @@ async def student_answer_text_save(msg: Message, state: FSMContext):
 
 
 # 2) Булев ответ (Принять / Отклонить), включается только через admin:toggle_reply:on
-@router.callback_query(F.data == "student:answer:yes")
-async def student_answer_yes(cb: CallbackQuery):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+@callbacks.exact("student:answer:yes")
+async def student_answer_yes(cb: CallbackQuery, state: FSMContext):
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     if not doc:
         await cb.answer("Заявка не найдена.", show_alert=True)
         return
     try:
-        repo.db.update_document(
-            database_id=repo.db_id,
-            collection_id=repo.sub_col,
-            document_id=doc["$id"],
-            data={
+        await repo.update_submission(
+            doc["$id"],
+            {
                 "student_answer": True,
                 "allow_student_reply": False,
             },
@@ -910,26 +575,24 @@ async def student_answer_yes(cb: CallbackQuery):
     await notify_admins(
         cb.bot,
         "📨 <b>Ответ студента по заявке</b>\n"
-        f"👤 {doc.get('full_name','—')} | {doc.get('group','—')}\n"
+        f"👤 {_who(doc)}\n"
         f"📝 Выбор: принял ✅\n\n"
         f"Открыть панель: /admin"
     )
     await cb.answer("Ответ сохранён")
-    await view_submission(cb)
+    await view_submission(cb, state)
 
-@router.callback_query(F.data == "student:answer:no")
-async def student_answer_no(cb: CallbackQuery):
-    repo = get_repo()
-    doc = repo.get_submission_by_user(str(cb.from_user.id))
+@callbacks.exact("student:answer:no")
+async def student_answer_no(cb: CallbackQuery, state: FSMContext):
+    repo = get_async_repo()
+    doc = await repo.get_submission_by_user(str(cb.from_user.id))
     if not doc:
         await cb.answer("Заявка не найдена.", show_alert=True)
         return
     try:
-        repo.db.update_document(
-            database_id=repo.db_id,
-            collection_id=repo.sub_col,
-            document_id=doc["$id"],
-            data={
+        await repo.update_submission(
+            doc["$id"],
+            {
                 "student_answer": False,
                 "allow_student_reply": False,
             },
@@ -941,9 +604,9 @@ async def student_answer_no(cb: CallbackQuery):
     await notify_admins(
         cb.bot,
         "📨 <b>Ответ студента по заявке</b>\n"
-        f"👤 {doc.get('full_name','—')} | {doc.get('group','—')}\n"
+        f"👤 {_who(doc)}\n"
         f"📝 Выбор: отклонил ❌\n\n"
         f"Открыть панель: /admin"
     )
     await cb.answer("Ответ сохранён")
-    await view_submission(cb)
+    await view_submission(cb, state)
@@ -0,0 +1,246 @@
+"""Многопроцессный режим: супервизор + N воркеров.
+
+Супервизор один забирает апдейты (getUpdates) и раскладывает их по
+воркерам по `from_user.id % N`: все апдейты одного пользователя попадают
+в один процесс, поэтому его FSM и порядок шагов анкеты не разъезжаются.
+
+Записи в Appwrite, сделанные воркером, рассылаются остальным через
+супервизор (канал инвалидации) — кэши заявок и счётчики у всех остаются
+актуальными.
+
+Включается BOT_WORKERS > 1 в режиме polling. У каждого воркера свой
+файл FSM (`FSM_SQLITE_PATH.<i>`) и своя очередь Sheets. При смене N
+между запусками пользователь попадает в другой воркер; для
+FSM_STORAGE=sqlite перед стартом состояния переносятся в нужные файлы
+(reshard_sqlite) — в том числе из общего файла однопроцессного режима и
+обратно в него, с memory незаконченные анкеты теряются при любом
+рестарте, redis общий и не зависит от N.
+
+Упавший воркер супервизор перезапускает с той же очередью апдейтов:
+новый процесс разберёт апдейты, которые ещё ждали в очереди. Те, что
+упавший уже забрал из очереди и обрабатывал, теряются — подтверждения
+обработки нет, как и в однопроцессном режиме при падении процесса.
+Если воркер падает снова и снова (RESPAWN_LIMIT раз за RESPAWN_WINDOW
+секунд), супервизор останавливается целиком, а не молча теряет 1/N
+пользователей.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from .config import Settings
+
+POLL_TIMEOUT = 30
+WATCH_INTERVAL = 1.0
+RESPAWN_LIMIT = 5
+RESPAWN_WINDOW = 60.0
+
+
+# ----------------------------------------------------------------------------- #
+# Маршрутизация
+# ----------------------------------------------------------------------------- #
+def shard_of(raw: Dict[str, Any], workers: int) -> int:
+    """Номер воркера для апдейта: по id автора, иначе по id чата."""
+    for key, obj in raw.items():
+        if key == "update_id" or not isinstance(obj, dict):
+            continue
+        user = obj.get("from") or obj.get("user")
+        if isinstance(user, dict) and "id" in user:
+            return int(user["id"]) % workers
+        chat = obj.get("chat") or (obj.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return abs(int(chat["id"])) % workers
+    return 0
+
+
+# ----------------------------------------------------------------------------- #
+# Воркер
+# ----------------------------------------------------------------------------- #
+async def _worker_loop(index: int, inbox, outbox) -> None:
+    from .bot_main import build_bot, build_dispatcher
+    from .appwrite_client import SubmissionEvent, get_async_repo
+
+    bot = build_bot()
+    dp = build_dispatcher()
+
+    repo = get_async_repo()
+    repo.publisher = lambda event: outbox.put((index, asdict(event)))
+
+    await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                break
+            kind, payload = item
+            if kind == "update":
+                task = asyncio.create_task(dp.feed_raw_update(bot, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            elif kind == "event":
+                repo.apply_remote(SubmissionEvent(**payload))
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await bot.session.close()
+
+
+def _worker_main(index: int, workers: int, inbox, outbox) -> None:
+    # останавливает супервизор (сигнал None в очереди), а не сигналы ОС
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    from .fsm_storage import shard_path
+
+    # общие лимиты и файлы делим между воркерами
+    Settings.NOTIFY_GLOBAL_RATE = Settings.NOTIFY_GLOBAL_RATE / workers
+    Settings.FSM_SQLITE_PATH = shard_path(Settings.FSM_SQLITE_PATH, index, workers)
+    queue_path = os.getenv("GOOGLE_SHEET_QUEUE_PATH", "./sheets_queue.json")
+    os.environ["GOOGLE_SHEET_QUEUE_PATH"] = f"{queue_path}.{index}"
+
+    logging.basicConfig(level=logging.INFO, format=f"[w{index}] %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_worker_loop(index, inbox, outbox))
+
+
+# ----------------------------------------------------------------------------- #
+# Супервизор
+# ----------------------------------------------------------------------------- #
+def _relay(outbox, inboxes: List[Any]) -> None:
+    """Канал инвалидации: событие воркера → все остальные воркеры."""
+    while True:
+        item = outbox.get()
+        if item is None:
+            return
+        origin, event = item
+        for i, q in enumerate(inboxes):
+            if i != origin:
+                q.put(("event", event))
+
+
+class _Workers:
+    """Процессы воркеров: запуск и перезапуск упавших."""
+
+    def __init__(self, ctx, workers: int, inboxes: List[Any], outbox):
+        self.ctx = ctx
+        self.workers = workers
+        self.inboxes = inboxes
+        self.outbox = outbox
+        self.procs: List[Any] = [self._spawn(i) for i in range(workers)]
+        self._deaths: List[float] = []
+
+    def _spawn(self, index: int):
+        p = self.ctx.Process(
+            target=_worker_main,
+            args=(index, self.workers, self.inboxes[index], self.outbox),
+            name=f"bot-worker-{index}",
+        )
+        p.start()
+        return p
+
+    def check(self) -> bool:
+        """Перезапустить упавших; False — падают слишком часто, пора остановиться."""
+        now = time.monotonic()
+        for i, p in enumerate(self.procs):
+            if p.is_alive():
+                continue
+            logging.error("[Supervisor] воркер %d завершился (код %s)", i, p.exitcode)
+            self._deaths = [t for t in self._deaths if now - t < RESPAWN_WINDOW] + [now]
+            if len(self._deaths) > RESPAWN_LIMIT:
+                return False
+            # очередь та же — ждавшие в ней апдейты разберёт новый процесс
+            # (забранные упавшим и не доделанные потеряны)
+            self.procs[i] = self._spawn(i)
+        return True
+
+    def stop(self) -> None:
+        for q in self.inboxes:
+            q.put(None)
+        for p in self.procs:
+            p.join(timeout=Settings.SHUTDOWN_DRAIN_TIMEOUT + 5)
+            if p.is_alive():
+                p.terminate()
+
+
+async def _watch(workers: _Workers, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        await asyncio.sleep(WATCH_INTERVAL)
+        if not workers.check():
+            logging.critical("[Supervisor] воркеры падают раз за разом — останавливаюсь")
+            stop.set()
+
+
+async def _poll(workers: _Workers) -> None:
+    from .bot_main import build_bot, used_update_types
+
+    bot = build_bot()
+    allowed = used_update_types()
+    inboxes = workers.inboxes
+    count = len(inboxes)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    watcher = asyncio.create_task(_watch(workers, stop))
+
+    offset: Optional[int] = None
+    backoff = 1.0
+    print(f"Шифу запущен ({count} воркеров)...")
+    try:
+        while not stop.is_set():
+            poll = asyncio.create_task(
+                bot.get_updates(offset=offset, timeout=POLL_TIMEOUT, allowed_updates=allowed)
+            )
+            stopper = asyncio.create_task(stop.wait())
+            done, _ = await asyncio.wait({poll, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            stopper.cancel()
+            if poll not in done:
+                poll.cancel()
+                break
+            try:
+                updates = poll.result()
+            except Exception as e:
+                logging.warning("[Supervisor] getUpdates: %s — повтор через %.0f с", e, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(30.0, backoff * 2)
+                continue
+            backoff = 1.0
+            for update in updates:
+                offset = update.update_id + 1
+                raw = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+                inboxes[shard_of(raw, count)].put(("update", raw))
+    finally:
+        watcher.cancel()
+        await bot.session.close()
+
+
+def run_supervisor(workers: int) -> None:
+    if Settings.FSM_STORAGE == "sqlite":
+        from .fsm_storage import reshard_sqlite
+        reshard_sqlite(Settings.FSM_SQLITE_PATH, workers)
+
+    ctx = mp.get_context("spawn")
+    outbox = ctx.Queue()
+    inboxes = [ctx.Queue() for _ in range(workers)]
+    pool = _Workers(ctx, workers, inboxes, outbox)
+
+    relay = threading.Thread(target=_relay, args=(outbox, inboxes), name="invalidation-relay", daemon=True)
+    relay.start()
+
+    try:
+        asyncio.run(_poll(pool))
+    finally:
+        pool.stop()
+        outbox.put(None)
+        relay.join(timeout=5)
@@ -0,0 +1,83 @@
+"""Режим webhook: aiohttp-сервер вместо long polling.
+
+Telegram сам присылает апдейты на WEBHOOK_BASE_URL + WEBHOOK_PATH;
+подлинность запроса проверяется по заголовку
+X-Telegram-Bot-Api-Secret-Token (WEBHOOK_SECRET, обязателен).
+
+Экземпляр должен быть ровно один. Состояние процесса не разделяется:
+FSM в памяти, очередь апдейтов пользователя (UserSerialMiddleware), кэш
+заявок AsyncAppwriteRepo.user_cache и таблица коротких id кнопок
+(callbacks.ShortIdTable). За балансировщиком апдейты одного пользователя
+попадали бы в разные процессы: анкета терялась бы на полпути, карточки
+показывали бы устаревшие данные, а кнопки отвечали бы «устарела».
+Второй web-процесс Heroku (DYNO=web.2, …) поэтому не запускается.
+"""
+from __future__ import annotations
+
+import logging
+import os
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from .config import Settings
+
+
+def webhook_url() -> str:
+    return Settings.WEBHOOK_BASE_URL.rstrip("/") + Settings.WEBHOOK_PATH
+
+
+async def _set_webhook(bot: Bot, dispatcher: Dispatcher) -> None:
+    await bot.set_webhook(
+        webhook_url(),
+        secret_token=Settings.WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=min(100, max(1, Settings.UPDATE_CONCURRENCY)),
+    )
+    logging.info("[Webhook] зарегистрирован: %s", webhook_url())
+
+
+async def _healthz(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def _ensure_single_instance() -> None:
+    # Heroku нумерует процессы одного типа: web.1, web.2, …
+    dyno = os.getenv("DYNO", "")
+    if dyno.startswith("web.") and dyno != "web.1":
+        raise RuntimeError(f"webhook обслуживает один экземпляр, а это {dyno}: уменьшите web до 1")
+
+
+def build_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    _ensure_single_instance()
+    if not Settings.WEBHOOK_BASE_URL:
+        raise RuntimeError("Не задан WEBHOOK_BASE_URL")
+    if not Settings.WEBHOOK_SECRET:
+        # без секрета кто угодно, знающий URL, может присылать поддельные апдейты
+        raise RuntimeError("Не задан WEBHOOK_SECRET")
+
+    # вебхук не снимаем при остановке: пока процесс перезапускается,
+    # Telegram копит апдейты и доставит их новому
+    dp.startup.register(_set_webhook)
+
+    app = web.Application()
+    app.router.add_get("/healthz", _healthz)
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=Settings.WEBHOOK_SECRET,
+        handle_in_background=True,
+    ).register(app, path=Settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    app = build_app(dp, bot)
+    web.run_app(
+        app,
+        host=Settings.WEB_HOST,
+        port=Settings.WEB_PORT,
+        shutdown_timeout=Settings.SHUTDOWN_DRAIN_TIMEOUT,
+    )
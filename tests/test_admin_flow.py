@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery, Message
+from appwrite.exception import AppwriteException
+
+from src import admin_flow
+from src.admin_flow import AdminState, admin_callback, admin_comment
+from src.callbacks import A_BDO
+
+ADMIN_ID = 10
+
+
+class FakeDirectory:
+    async def is_admin(self, tg_user_id):
+        return tg_user_id == str(ADMIN_ID)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def bulk_decide(cb, state, **values):
+        calls.append(values)
+
+    monkeypatch.setattr(admin_flow, "get_admin_directory", lambda: FakeDirectory())
+    monkeypatch.setitem(admin_flow._HANDLERS, A_BDO, bulk_decide)
+    return calls
+
+
+def _state(user_id):
+    return FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=user_id, user_id=user_id))
+
+
+def _event(cls, user_id, **fields):
+    event = Mock(spec=cls)
+    event.from_user = SimpleNamespace(id=user_id)
+    event.answer = AsyncMock()
+    for name, value in fields.items():
+        setattr(event, name, value)
+    return event
+
+
+@pytest.mark.parametrize("user_id, allowed", [(ADMIN_ID, True), (11, False)])
+def test_admin_callback_checks_membership(calls, user_id, allowed):
+    cb = _event(CallbackQuery, user_id, data=A_BDO.pack(decision="approved"))
+    asyncio.run(admin_callback(cb, _state(user_id)))
+    assert bool(calls) == allowed
+    if not allowed:
+        cb.answer.assert_awaited_once_with("Доступ запрещён.", show_alert=True)
+
+
+def test_admin_state_message_from_non_admin_is_refused(calls, monkeypatch):
+    msg = _event(Message, 11, text="ok")
+
+    async def scenario():
+        state = _state(11)
+        await state.set_state(AdminState.waiting_comment)
+        await state.update_data(doc_id="tg1", decision="approved")
+        await admin_comment(msg, state, bot=None)
+        return await state.get_state()
+
+    monkeypatch.setattr(admin_flow, "get_async_repo", lambda: pytest.fail("repo must not be touched"))
+    assert asyncio.run(scenario()) is None
+    msg.answer.assert_awaited_once_with("Доступ запрещён.")
+
+
+def test_list_header_escapes_group(monkeypatch):
+    async def fetch(status, group, page, cursor, before):
+        return [], 0, 1, False, False
+
+    monkeypatch.setattr(admin_flow, "_fetch_list_page", fetch)
+    msg = _event(Message, ADMIN_ID)
+    asyncio.run(admin_flow._send_list_by_status(msg, "pending", group="<ВИС> & 41"))
+    header = msg.answer.await_args.args[0]
+    assert "Группа: &lt;ВИС&gt; &amp; 41" in header
+
+
+def test_decision_text_escapes_comment():
+    text = admin_flow._decision_text("rejected", "нет <темы> & стека")
+    assert "нет &lt;темы&gt; &amp; стека" in text
+    assert "<b>отклонена</b>" in text
+
+
+def test_list_restarts_from_first_page_when_cursor_is_gone(monkeypatch):
+    calls = []
+
+    class Repo:
+        async def list_submissions(self, **query):
+            calls.append(query)
+            if query.get("cursor"):
+                raise AppwriteException("Document 'tg5' for the 'cursor' value not found.", 400)
+            return {"documents": [{"$id": "tg1"}, {"$id": "tg2"}], "total": 2}
+
+    monkeypatch.setattr(admin_flow, "get_replica", lambda: SimpleNamespace(ready=False))
+    monkeypatch.setattr(admin_flow, "get_async_repo", lambda: Repo())
+    items, total, page, has_prev, has_next = asyncio.run(
+        admin_flow._fetch_list_page("pending", page=3, cursor="tg5", before=True)
+    )
+    assert [d["$id"] for d in items] == ["tg1", "tg2"]
+    assert (page, has_prev, has_next) == (1, False, False)
+    assert calls[-1].get("cursor") is None
+
+
+def test_list_does_not_swallow_transient_errors(monkeypatch):
+    class Repo:
+        async def list_submissions(self, **query):
+            raise AppwriteException("unavailable", 503)
+
+    monkeypatch.setattr(admin_flow, "get_replica", lambda: SimpleNamespace(ready=False))
+    monkeypatch.setattr(admin_flow, "get_async_repo", lambda: Repo())
+    with pytest.raises(AppwriteException):
+        asyncio.run(admin_flow._fetch_list_page("pending", page=2, cursor="tg5"))
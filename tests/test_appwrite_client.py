@@ -0,0 +1,81 @@
+import pytest
+from appwrite.exception import AppwriteException
+
+from src.appwrite_client import AppwriteRepo
+
+PAYLOAD = {
+    "tg_user_id": "1", "full_name": "Иванов Иван", "group": "ВИС-41",
+    "email": "a@b.ru", "thesisTopic": "Бот",
+}
+
+
+class FakeDb:
+    def __init__(self, docs=None):
+        self.docs = dict(docs or {})
+        self.updates = []
+
+    def create_document(self, database_id, collection_id, document_id, data):
+        if document_id in self.docs:
+            raise AppwriteException("exists", 409)
+        self.docs[document_id] = {"$id": document_id, **data}
+        return self.docs[document_id]
+
+    def get_document(self, database_id, collection_id, document_id):
+        if document_id not in self.docs:
+            raise AppwriteException("not found", 404)
+        return self.docs[document_id]
+
+    def update_document(self, database_id, collection_id, document_id, data):
+        self.updates.append(data)
+        self.docs[document_id] = {**self.docs[document_id], **data}
+        return self.docs[document_id]
+
+
+def _repo(docs=None):
+    repo = AppwriteRepo.__new__(AppwriteRepo)
+    repo.db = FakeDb(docs)
+    repo.db_id, repo.sub_col = "db", "submissions"
+    return repo
+
+
+def test_first_submission_is_created():
+    repo = _repo()
+    doc, kind = repo.upsert_submission(PAYLOAD)
+    assert kind == "create"
+    assert doc["status"] == "pending"
+
+
+@pytest.mark.parametrize("existing", [
+    {"status": "pending"},
+    {"status": "approved", "admin_comment": "Берём"},
+    {"status": "pending", "student_answer": True},
+])
+def test_repeat_keeps_existing_submission(existing):
+    doc = {"$id": "tg1", "tg_user_id": "1", "full_name": "Старое", **existing}
+    repo = _repo({"tg1": doc})
+    got, kind = repo.upsert_submission(PAYLOAD)
+    assert kind is None
+    assert got == doc
+    assert repo.db.updates == []
+
+
+@pytest.mark.parametrize("existing", [
+    {"status": "rejected", "admin_comment": "Нет темы"},
+    {"status": "pending", "student_answer": False},   # студент отказался
+])
+def test_resubmission_resets_admin_fields(existing):
+    repo = _repo({"tg1": {"$id": "tg1", "tg_user_id": "1", **existing}})
+    doc, kind = repo.upsert_submission(PAYLOAD)
+    assert kind == "update"
+    assert doc["status"] == "pending"
+    assert doc["admin_comment"] == ""
+    assert doc["student_answer"] is None
+    assert doc["full_name"] == "Иванов Иван"
+
+
+def test_resubmission_without_required_fields_is_ignored():
+    doc = {"$id": "tg1", "tg_user_id": "1", "status": "rejected", "admin_comment": "Нет темы"}
+    repo = _repo({"tg1": doc})
+    got, kind = repo.upsert_submission({**PAYLOAD, "thesisTopic": None})
+    assert kind is None
+    assert got["admin_comment"] == "Нет темы"
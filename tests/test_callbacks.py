@@ -0,0 +1,95 @@
+import base64
+
+import pytest
+
+from src import callbacks
+from src.callbacks import (
+    ADMIN, A_DECIDE, A_FIND, A_GROUP, A_NOOP, A_PAGE, A_TOGGLE, A_VIEW,
+    MAX_LENGTH, PREFIX, CallbackExpired, ShortIdTable,
+)
+from src.keyboards import admin_find_kb
+
+
+@pytest.mark.parametrize("action, values", [
+    (A_NOOP, {}),
+    (A_VIEW, {"doc_id": "tg123456789", "status": "pending"}),
+    (A_PAGE, {"status": "approved", "before": True, "page": 300, "cursor": "tg999999999999999999"}),
+    (A_DECIDE, {"doc_id": "65f0c1a2b3d4e5f6a7b8", "decision": "rejected", "back_status": "pending"}),
+    (A_TOGGLE, {"doc_id": "tg1", "back_status": "rejected", "allow": False}),
+    (A_GROUP, {"status": "pending", "group": "ВИС-41:б"}),
+    (A_FIND, {"page": 0}),
+])
+def test_round_trip(action, values):
+    data = action.pack(**values)
+    assert data.startswith(PREFIX)
+    assert len(data.encode()) <= MAX_LENGTH
+    assert ADMIN.unpack(data) == (action, values)
+
+
+@pytest.mark.parametrize("n", [0, 1, 127, 128, 16383, 16384, 2**63])
+def test_varint_edges(n):
+    buf = bytearray()
+    callbacks._put_varint(buf, n)
+    assert callbacks._get_varint(bytes(buf), 0) == (n, len(buf))
+
+
+@pytest.mark.parametrize("doc_id", ["tg0", "tg012", "tg", "TG5", "tg1x", "tg1234567890123456789"])
+def test_doc_ids_that_are_not_tg_numbers_stay_strings(doc_id):
+    # ведущий ноль или лишние символы не должны теряться при упаковке в число
+    data = A_VIEW.pack(doc_id=doc_id, status="pending")
+    assert ADMIN.unpack(data)[1]["doc_id"] == doc_id
+
+
+def test_long_text_goes_through_short_id_table():
+    group = "очень длинное название группы " * 3
+    data = A_GROUP.pack(status="pending", group=group)
+    assert len(data.encode()) <= MAX_LENGTH
+    assert ADMIN.unpack(data)[1]["group"] == group
+
+
+def test_evicted_short_id_is_expired():
+    table = ShortIdTable(maxsize=2)
+    first = table.ref("a")
+    table.ref("b")
+    table.ref("c")
+    with pytest.raises(CallbackExpired):
+        table.resolve(first)
+    assert table.resolve(table.ref("c")) == "c"
+
+
+def test_pack_rejects_too_long():
+    long_action = callbacks.CallbackCodec().action("long", **{f"f{i}": callbacks.INT for i in range(40)})
+    with pytest.raises(ValueError):
+        long_action.pack(**{f"f{i}": 2**60 for i in range(40)})
+
+
+def _b64(raw: bytes) -> str:
+    return PREFIX + base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("data", [
+    None,
+    "",
+    "admin:view:tg1:pending",
+    PREFIX,
+    PREFIX + "!!!",
+    _b64(bytes([250])),                      # нет такого действия
+    _b64(bytes([A_VIEW.code])),              # обрезан
+    _b64(bytes([A_VIEW.code, 0, 1, 9])),     # статус вне списка
+    _b64(bytes([A_GROUP.code, 0, 7, 5])),    # неизвестный тег строки
+    _b64(bytes([A_GROUP.code, 0, 1, 2, 0xFF, 0xFE])),  # не UTF-8
+])
+def test_malformed_input_is_expired(data):
+    with pytest.raises(CallbackExpired):
+        ADMIN.unpack(data)
+
+
+def test_find_keyboard_tolerates_unknown_status():
+    docs = [
+        {"$id": "tg1", "full_name": "А", "group": "ВИС-41", "status": "approved"},
+        {"$id": "tg2", "full_name": "Б", "group": "ВИС-41", "status": "archived"},
+        {"$id": "tg3", "full_name": "В", "group": "ВИС-41"},
+    ]
+    rows = admin_find_kb(docs, page=1, pages=1).inline_keyboard
+    statuses = [ADMIN.unpack(row[0].callback_data)[1]["status"] for row in rows[:3]]
+    assert statuses == ["approved", "pending", "pending"]
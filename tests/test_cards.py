@@ -0,0 +1,63 @@
+import re
+
+import pytest
+
+from src.cards import _utf16_len, admin_card, admin_card_pages, split_card
+from src.fields import FIELDS
+
+FOOTER = re.compile(r"\n\n<i>Часть \d+/\d+</i>$")
+ENTITY = re.compile(r"&(?:amp|lt|gt|quot|#x27);")
+
+
+def _answer(size: int, word: str = "слово") -> str:
+    return ((word + " ") * (size // len(word) + 1))[:size].strip()
+
+
+def _doc(size: int, word: str = "слово") -> dict:
+    doc = {"$id": f"d{size}{word}", "$updatedAt": "2024-01-01T00:00:00.000+00:00", "status": "pending"}
+    doc.update({key: _answer(size, word) for key, _, _ in FIELDS})
+    return doc
+
+
+def _bodies(pages):
+    return [FOOTER.sub("", p) for p in pages]
+
+
+def test_short_card_is_one_page():
+    text = admin_card(_doc(50))
+    assert split_card(text) == [text]
+
+
+@pytest.mark.parametrize("size", [300, 1000, 4000])
+def test_pages_fit_limit_and_keep_text(size):
+    text = admin_card(_doc(size))
+    pages = split_card(text, limit=3900)
+    assert len(pages) > 1
+    assert all(_utf16_len(p) <= 4096 for p in pages)
+    assert all(_utf16_len(b) <= 3900 for b in _bodies(pages))
+    # ничего не потерялось: слова те же, в том же порядке
+    assert " ".join(" ".join(_bodies(pages)).split()) == " ".join(text.split())
+
+
+def test_no_title_only_or_fragment_pages():
+    pages = admin_card_pages(_doc(4000))
+    bodies = _bodies(pages)
+    assert bodies[0].strip() != "<b>Заявка</b>"
+    # все части, кроме последней, заполнены хотя бы на четверть
+    assert all(_utf16_len(b) >= 3900 // 4 for b in bodies[:-1])
+    total = sum(_utf16_len(b) for b in bodies)
+    assert len(pages) <= total // 3900 + 2
+
+
+def test_entities_are_not_split():
+    # «&» экранируется в &amp; — разрез не должен попадать внутрь сущности
+    text = admin_card(_doc(4000, word="a&b<c"))
+    for body in _bodies(split_card(text)):
+        assert "&" not in ENTITY.sub("", body)
+
+
+def test_astral_characters_counted_in_utf16():
+    doc = _doc(20)
+    doc["books"] = "😀" * 5000
+    pages = split_card(admin_card(doc))
+    assert all(_utf16_len(p) <= 4096 for p in pages)
@@ -0,0 +1,79 @@
+import pytest
+
+from src.dispatch import CallbackTrie
+
+
+def _h(name):
+    async def handler(cb, state):
+        return name
+    handler.__name__ = name
+    return handler
+
+
+@pytest.fixture
+def trie():
+    t = CallbackTrie()
+    for key in ("student:begin", "student:confirm:back", "student:menu:view"):
+        t.add(key, _h(key), exact=True)
+    for key in ("student:back:", "student:confirm", "student:confirm:editmenu:", "a:", "admin"):
+        t.add(key, _h(key), exact=False)
+    return t
+
+
+@pytest.mark.parametrize("data, expected", [
+    ("student:begin", "student:begin"),
+    ("student:confirm:back", "student:confirm:back"),        # точный ключ важнее префикса
+    ("student:confirm:send", "student:confirm"),
+    ("student:confirm", "student:confirm"),
+    ("student:confirm:editmenu:2", "student:confirm:editmenu:"),  # самый длинный префикс
+    ("student:back:email", "student:back:"),
+    ("a:AbC-_", "a:"),
+    ("admin:decide:tg1:approved:pending:1", "admin"),
+    ("student:begin:extra", None),      # точный ключ не работает как префикс
+    ("student:menu", None),
+    ("student:confirmed", None),        # префикс — по сегментам, не по символам
+    ("noop", None),
+    ("", None),
+    (None, None),
+])
+def test_resolve(trie, data, expected):
+    handler = trie.resolve(data)
+    assert (handler.__name__ if handler else None) == expected
+
+
+def test_duplicate_registration_rejected(trie):
+    with pytest.raises(ValueError):
+        trie.add("student:begin", _h("x"))
+    with pytest.raises(ValueError):
+        trie.add("student:back", _h("x"), exact=False)
+
+
+def test_routes_keep_registration_order(trie):
+    assert trie.routes[0] == ("student:begin", True)
+    assert trie.routes[-1] == ("admin", False)
+
+
+@pytest.mark.parametrize("data, expected", [
+    ("student:begin", "begin_flow"),
+    ("student:pick:redDiploma:yes", "form_pick"),
+    ("student:back:email", "on_back"),
+    ("student:confirm:send", "confirm_handler"),
+    ("student:confirm:editmenu:2", "confirm_edit_menu"),
+    ("student:menu:view", "view_submission"),
+    ("admin:view:tg1:pending", "admin_stale_callback"),
+])
+def test_bot_routes(data, expected):
+    pytest.importorskip("appwrite")
+    from src import admin_flow, student_flow  # noqa: F401 — регистрируют кнопки
+    from src.dispatch import callbacks
+
+    assert callbacks.resolve(data).__name__ == expected
+
+
+def test_packed_admin_buttons_route_to_admin_dispatcher():
+    pytest.importorskip("appwrite")
+    from src import admin_flow  # noqa: F401
+    from src.callbacks import A_VIEW
+    from src.dispatch import callbacks
+
+    assert callbacks.resolve(A_VIEW.pack(doc_id="tg1", status="pending")).__name__ == "admin_callback"
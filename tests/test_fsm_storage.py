@@ -0,0 +1,164 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from src import fsm_storage
+from src.config import Settings
+from src.fsm_storage import SQLiteStorage, build_storage, reshard_sqlite, shard_path
+
+
+def _write(path, *user_ids):
+    with sqlite3.connect(path) as c:
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        c.executemany(
+            "INSERT OR REPLACE INTO fsm VALUES (?, ?, ?, ?)",
+            [(f"1:{u}:{u}:::default", "StudentForm:filling", "{}", 1e12) for u in user_ids],
+        )
+    c.close()
+
+
+def _users(path):
+    if not os.path.exists(path):
+        return set()
+    c = sqlite3.connect(path)
+    try:
+        return {int(k.split(":")[2]) for (k,) in c.execute("SELECT key FROM fsm")}
+    finally:
+        c.close()
+
+
+@pytest.fixture
+def base(tmp_path):
+    return str(tmp_path / "fsm.sqlite3")
+
+
+def test_single_process_file_is_split_between_workers(base):
+    _write(base, 1, 2, 3, 4)
+    assert reshard_sqlite(base, 2) == 4
+    assert not os.path.exists(base)
+    assert _users(shard_path(base, 0, 2)) == {2, 4}
+    assert _users(shard_path(base, 1, 2)) == {1, 3}
+
+
+def test_worker_files_are_merged_back_into_single_file(base):
+    _write(f"{base}.0", 2, 4)
+    _write(f"{base}.1", 1, 3)
+    assert reshard_sqlite(base, 1) == 4
+    assert _users(base) == {1, 2, 3, 4}
+    assert not os.path.exists(f"{base}.0") and not os.path.exists(f"{base}.1")
+
+
+def test_worker_count_change(base):
+    _write(f"{base}.0", 2, 4, 6)
+    _write(f"{base}.1", 1, 3, 5)
+    reshard_sqlite(base, 3)
+    assert [_users(f"{base}.{i}") for i in range(3)] == [{3, 6}, {1, 4}, {2, 5}]
+
+    reshard_sqlite(base, 2)
+    assert [_users(f"{base}.{i}") for i in range(2)] == [{2, 4, 6}, {1, 3, 5}]
+    assert not os.path.exists(f"{base}.2")
+
+
+def test_same_layout_is_left_alone(base):
+    _write(base, 1, 2)
+    assert reshard_sqlite(base, 1) == 0
+    assert _users(base) == {1, 2}
+    assert reshard_sqlite(str(base) + "-missing", 2) == 0
+
+
+# ------------------------------ SQLiteStorage ------------------------------ #
+KEY = StorageKey(bot_id=1, chat_id=5, user_id=5)
+
+
+def _storage(path, ttl=3600.0):
+    return SQLiteStorage(path, ttl=ttl, flush_interval=0.01)
+
+
+def test_state_survives_restart(base):
+    async def first_run():
+        s = _storage(base)
+        await s.set_state(KEY, "StudentForm:filling")
+        await s.update_data(KEY, {"full_name": "Иванов Иван"})
+        await s.close()
+
+    async def second_run():
+        s = _storage(base)
+        try:
+            return await s.get_state(KEY), await s.get_data(KEY)
+        finally:
+            await s.close()
+
+    asyncio.run(first_run())
+    assert asyncio.run(second_run()) == ("StudentForm:filling", {"full_name": "Иванов Иван"})
+    assert _users(base) == {5}
+
+
+def test_changes_are_flushed_in_background(base):
+    async def scenario():
+        s = _storage(base)
+        await s.set_state(KEY, "StudentForm:confirm")
+        await asyncio.sleep(0.05)
+        on_disk = _users(base)
+        await s.set_state(KEY, None)          # состояние и данные пусты — строка удаляется
+        await asyncio.sleep(0.05)
+        after_clear = _users(base)
+        await s.close()
+        return on_disk, after_clear
+
+    assert asyncio.run(scenario()) == ({5}, set())
+
+
+def test_abandoned_state_expires(base, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(fsm_storage.time, "time", lambda: now[0])
+
+    async def scenario():
+        s = _storage(base, ttl=60)
+        await s.set_state(KEY, "StudentForm:filling")
+        await s.flush()
+        now[0] += 61
+        state = await s.get_state(KEY)
+        await s.flush(purge=True)
+        await s.close()
+        return state
+
+    assert asyncio.run(scenario()) is None
+    assert _users(base) == set()
+
+
+def test_expired_rows_are_not_restored(base):
+    _write(base, 7)
+    with sqlite3.connect(base) as c:
+        c.execute("UPDATE fsm SET updated_at = 0")
+    c.close()
+
+    async def scenario():
+        s = _storage(base, ttl=60)
+        try:
+            return await s.get_state(StorageKey(bot_id=1, chat_id=7, user_id=7))
+        finally:
+            await s.close()
+
+    assert asyncio.run(scenario()) is None
+    assert _users(base) == set()
+
+
+def test_fakeredis_backend(monkeypatch):
+    monkeypatch.setattr(Settings, "FSM_STORAGE", "redis")
+    monkeypatch.setattr(Settings, "FSM_REDIS_URL", "fakeredis://")
+
+    async def scenario():
+        s = build_storage()
+        try:
+            await s.set_state(KEY, "AdminState:waiting_note")
+            return await s.get_state(KEY)
+        finally:
+            await s.close()
+
+    assert asyncio.run(scenario()) == "AdminState:waiting_note"
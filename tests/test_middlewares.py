@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+from aiogram.types import CallbackQuery, Update
+
+from src.middlewares import ConcurrencyLimitMiddleware, UserSerialMiddleware
+
+
+def _data(user_id):
+    return {"event_from_user": SimpleNamespace(id=user_id)}
+
+
+def test_updates_of_one_user_run_in_order():
+    mw = UserSerialMiddleware(max_pending=10)
+    log = []
+
+    async def handler(event, data):
+        log.append(("start", event))
+        await asyncio.sleep(0.01 if event == 0 else 0)
+        log.append(("end", event))
+
+    async def scenario():
+        await asyncio.gather(*(mw(handler, i, _data(1)) for i in range(4)))
+
+    asyncio.run(scenario())
+    assert log == [(step, i) for i in range(4) for step in ("start", "end")]
+    assert mw._slots == {}          # очереди пользователей не копятся
+    assert mw.in_flight == 0
+
+
+def test_different_users_run_in_parallel():
+    mw = UserSerialMiddleware(max_pending=10)
+    running = []
+    peak = []
+
+    async def handler(event, data):
+        running.append(event)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(event)
+
+    async def scenario():
+        await asyncio.gather(*(mw(handler, u, _data(u)) for u in range(3)))
+
+    asyncio.run(scenario())
+    assert max(peak) == 3
+
+
+def test_overflow_is_rejected_with_answer():
+    mw = UserSerialMiddleware(max_pending=2)
+    handled = []
+
+    cb = Mock(spec=CallbackQuery)
+    cb.answer = AsyncMock()
+    extra = Mock(spec=Update)
+    extra.callback_query = cb
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def handler(event, data):
+            await gate.wait()
+            handled.append(event)
+
+        first = asyncio.create_task(mw(handler, "a", _data(1)))
+        second = asyncio.create_task(mw(handler, "b", _data(1)))
+        await asyncio.sleep(0)
+        result = await mw(handler, extra, _data(1))     # третий — сверх лимита
+        gate.set()
+        await asyncio.gather(first, second)
+        return result
+
+    assert asyncio.run(scenario()) is None
+    assert handled == ["a", "b"]
+    assert mw.dropped == 1
+    cb.answer.assert_awaited_once()
+
+
+def test_updates_without_user_pass_through():
+    mw = UserSerialMiddleware(max_pending=1)
+    handler = AsyncMock(return_value="ok")
+    assert asyncio.run(mw(handler, "poll", {})) == "ok"
+
+
+def test_concurrency_limit_and_drain():
+    mw = ConcurrencyLimitMiddleware(limit=2)
+    running = []
+    peak = []
+
+    async def handler(event, data):
+        running.append(event)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(event)
+
+    async def scenario():
+        tasks = [asyncio.create_task(mw(handler, i, {})) for i in range(5)]
+        await asyncio.sleep(0)
+        assert mw.in_flight == 5
+        await mw.drain(timeout=1)
+        assert mw.in_flight == 0
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert max(peak) == 2
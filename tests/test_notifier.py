@@ -0,0 +1,27 @@
+import asyncio
+import logging
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendMessage
+
+from src.notifier import Notifier
+
+
+class FailingBot:
+    def __init__(self):
+        self.calls = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        raise TelegramBadRequest(SendMessage(chat_id=chat_id, text=text), "can't parse entities")
+
+
+def test_dropped_send_is_logged_as_warning(caplog):
+    notifier = Notifier(global_rate=100, per_chat_interval=0, max_retries=3)
+    bot = FailingBot()
+    with caplog.at_level(logging.WARNING):
+        ok = asyncio.run(notifier.send(bot, 42, "<b>", parse_mode="HTML"))
+    assert ok is False
+    assert bot.calls == 1                     # не повторяем
+    assert notifier.metrics["failed"] == 1
+    assert any(r.levelno == logging.WARNING and "chat=42" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,66 @@
+import pytest
+
+from src.fields import FIELD_CHOICES, FIELDS
+from src.questionnaire import FORM, Question, Questionnaire
+
+KEYS = [key for key, _, _ in FIELDS]
+
+
+def _buttons(markup):
+    return [(b.text, b.callback_data) for row in markup.inline_keyboard for b in row]
+
+
+def test_order_and_transitions_follow_fields():
+    assert FORM.first == KEYS[0]
+    assert [q.key for q in FORM] == KEYS
+    for prev, key, nxt in zip([None] + KEYS[:-1], KEYS, KEYS[1:] + [None]):
+        assert (FORM[key].prev, FORM[key].next) == (prev, nxt)
+
+
+def test_first_question_has_no_back_button():
+    q = FORM[FORM.first]
+    assert q.keyboard is None and q.back_keyboard is None
+
+
+def test_text_question_keyboard_is_back_only():
+    q = FORM["email"]
+    assert _buttons(q.keyboard) == [("⬅️ Назад", f"student:back:{q.prev}")]
+    assert _buttons(q.back_keyboard) == _buttons(q.keyboard)
+
+
+@pytest.mark.parametrize("key", sorted(FIELD_CHOICES))
+def test_choice_question_keyboard(key):
+    q = FORM[key]
+    assert _buttons(q.keyboard) == [
+        *((text, f"student:pick:{key}:{value}") for value, text in FIELD_CHOICES[key]),
+        ("⬅️ Назад", f"student:back:{q.prev}"),
+    ]
+    assert _buttons(q.back_keyboard) == [("⬅️ Назад", f"student:back:{q.prev}")]
+
+
+def test_email_check():
+    q = FORM["email"]
+    assert q.is_valid("student@example.com")
+    assert not q.is_valid("@example.com")
+    assert not q.is_valid("student")
+    assert q.error
+    assert FORM["full_name"].is_valid("что угодно")
+
+
+def test_reordering_needs_no_code():
+    form = Questionnaire([Question("b", "B", "", "?"), Question("a", "A", "", "?"), Question("c", "C", "", "?")])
+    assert form.first == "b"
+    assert (form["a"].prev, form["a"].next) == ("b", "c")
+    assert form["c"].next is None
+
+
+def test_duplicate_or_empty_form_rejected():
+    with pytest.raises(ValueError):
+        Questionnaire([Question("a", "A", "", "?"), Question("a", "A", "", "?")])
+    with pytest.raises(ValueError):
+        Questionnaire([])
+
+
+def test_get_unknown_key():
+    assert FORM.get("nope") is None
+    assert FORM.get(None) is None
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from src.appwrite_client import SubmissionEvent
+from src.replica import SubmissionReplica
+
+
+def _doc(n, updated, status="pending", **fields):
+    return {
+        "$id": f"tg{n}", "$createdAt": f"2024-01-{n:02d}", "$updatedAt": updated,
+        "status": status, "group": "ВИС-41", **fields,
+    }
+
+
+class FakeRepo:
+    def __init__(self, docs=()):
+        self.docs = {d["$id"]: d for d in docs}
+        self.since = []
+        self.fail = 0
+
+    async def iter_submissions_changed(self, since=None):
+        self.since.append(since)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("appwrite is down")
+        for doc in sorted(self.docs.values(), key=lambda d: d["$updatedAt"]):
+            if since is None or doc["$updatedAt"] >= since:
+                yield dict(doc)
+
+
+def _replica(repo, sync=60.0, reconcile=900.0):
+    return SubmissionReplica(repo, sync_interval=sync, reconcile_interval=reconcile)
+
+
+def test_sync_pulls_changes_since_watermark():
+    repo = FakeRepo([_doc(1, "t1"), _doc(2, "t2")])
+    r = _replica(repo)
+
+    async def scenario():
+        await r.reconcile()
+        repo.docs["tg2"] = _doc(2, "t3", status="approved")
+        repo.docs["tg3"] = _doc(3, "t4")
+        return await r.sync()
+
+    assert asyncio.run(scenario()) == 2
+    assert r.ready
+    assert repo.since == [None, "t2"]
+    assert r.counts() == {"pending": 2, "approved": 1, "rejected": 0}
+
+
+def test_own_newer_write_is_not_overwritten_by_stale_pull():
+    repo = FakeRepo([_doc(1, "t1")])
+    r = _replica(repo)
+
+    async def scenario():
+        await r.reconcile()
+        # своя запись уже применена, а опрос ещё приносит старую версию
+        r.on_event(SubmissionEvent("update", "tg1", doc=_doc(1, "t5", status="approved")))
+        await r.sync()
+
+    asyncio.run(scenario())
+    assert r.get("tg1")["status"] == "approved"
+
+
+def test_reconcile_removes_documents_deleted_elsewhere():
+    repo = FakeRepo([_doc(1, "t1"), _doc(2, "t2")])
+    r = _replica(repo)
+
+    async def scenario():
+        await r.reconcile()
+        del repo.docs["tg1"]                      # удалили в консоли Appwrite
+        # свежая своя запись, которой сервер ещё не вернул, — не трогаем
+        r.on_event(SubmissionEvent("create", "tg9", doc=_doc(9, "t9")))
+        return await r.reconcile()
+
+    assert asyncio.run(scenario()) == 1
+    assert r.get("tg1") is None
+    assert r.get("tg9") is not None
+
+
+def test_failed_first_load_is_retried_on_sync_interval():
+    repo = FakeRepo([_doc(1, "t1")])
+    repo.fail = 1
+    r = _replica(repo, sync=0.01, reconcile=900.0)
+
+    async def scenario():
+        await r.start()
+        assert not r.ready
+        for _ in range(100):
+            if r.ready:
+                break
+            await asyncio.sleep(0.01)
+        await r.stop()
+
+    asyncio.run(scenario())
+    assert r.ready and len(r) == 1
+    assert repo.since[:2] == [None, None]         # повтор — полная загрузка, не дозагрузка
+
+
+def test_delete_event_removes_document():
+    r = _replica(FakeRepo())
+    r.on_event(SubmissionEvent("create", "tg1", doc=_doc(1, "t1")))
+    r.on_event(SubmissionEvent("delete", "tg1"))
+    assert len(r) == 0
+    assert r.counts()["pending"] == 0
+
+
+@pytest.fixture
+def paged():
+    r = _replica(FakeRepo([_doc(n, f"t{n}", status="approved" if n % 3 == 0 else "pending") for n in range(1, 11)]))
+    asyncio.run(r.reconcile())
+    return r
+
+
+def test_list_pages_with_cursor(paged):
+    first = paged.list_submissions(status="pending", page_size=3)
+    assert first["total"] == 7
+    assert [d["$id"] for d in first["documents"]] == ["tg1", "tg2", "tg4"]
+
+    second = paged.list_submissions(status="pending", page_size=3, cursor="tg4")
+    assert [d["$id"] for d in second["documents"]] == ["tg5", "tg7", "tg8"]
+
+    back = paged.list_submissions(status="pending", page_size=3, cursor="tg5", before=True)
+    assert [d["$id"] for d in back["documents"]] == ["tg1", "tg2", "tg4"]
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+
+from src.sheets_writer import MAX_ATTEMPTS, SheetsWriter
+
+
+class FakeSession:
+    enabled = True
+
+    def __init__(self):
+        self.appended = []
+        self.updated = []
+        self.fail_append = []   # исключения для следующих вызовов
+        self.fail_update = []
+        self.on_append = None
+        self.resets = 0
+
+    def append_rows(self, rows):
+        if self.on_append:
+            self.on_append()
+        if self.fail_append:
+            raise self.fail_append.pop(0)
+        self.appended.extend(rows)
+
+    def update_rows(self, updates):
+        if self.fail_update:
+            raise self.fail_update.pop(0)
+        self.updated.append(dict(updates))
+        return []
+
+    def reset(self):
+        self.resets += 1
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "queue.json")
+
+
+def _on_disk(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_queue_survives_restart(session, path):
+    w = SheetsWriter(session, path=path)
+    w.enqueue_append("tg1", ["Иванов"])
+    w.enqueue_update("tg2", {"статус": "approved"})
+    w.enqueue_update("tg2", {"комментарий": "ок"})
+
+    restored = SheetsWriter(session, path=path)
+    assert restored.pending == 2
+    asyncio.run(restored.flush())
+    assert session.appended == [("tg1", ["Иванов"])]
+    assert session.updated == [{"tg2": {"статус": "approved", "комментарий": "ок"}}]
+    assert _on_disk(path) == {"appends": [], "updates": {}}
+
+
+def test_batch_in_flight_stays_on_disk(session, path):
+    w = SheetsWriter(session, path=path)
+    w.enqueue_append("tg1", ["Иванов"])
+    seen = []
+    # процесс может умереть посреди записи — пакет должен остаться в файле
+    session.on_append = lambda: seen.append(_on_disk(path))
+    asyncio.run(w.flush())
+    assert seen == [{"appends": [["tg1", ["Иванов"]]], "updates": {}}]
+
+
+def test_failed_update_does_not_repeat_appended_rows(session, path):
+    w = SheetsWriter(session, path=path)
+    w.enqueue_append("tg1", ["Иванов"])
+    w.enqueue_update("tg1", {"статус": "approved"})
+    session.fail_update = [ConnectionError("reset by peer")]
+
+    asyncio.run(w.flush())
+    assert session.appended == [("tg1", ["Иванов"])]
+    assert w.pending == 1
+    assert _on_disk(path) == {"appends": [], "updates": {"tg1": {"статус": "approved"}}}
+
+    # новое значение, поставленное после ошибки, важнее повторяемого
+    w.enqueue_update("tg1", {"статус": "rejected"})
+    asyncio.run(w.flush())
+    assert session.appended == [("tg1", ["Иванов"])]
+    assert session.updated == [{"tg1": {"статус": "rejected"}}]
+
+
+def test_retryable_failure_keeps_order_and_backs_off(session, path):
+    w = SheetsWriter(session, path=path)
+    w.enqueue_append("tg1", ["первый"])
+    session.fail_append = [TimeoutError()]
+    asyncio.run(w.flush())
+    w.enqueue_append("tg2", ["второй"])
+    assert w._backoff >= 1.0
+
+    asyncio.run(w.flush())
+    assert [i for i, _ in session.appended] == ["tg1", "tg2"]
+    assert w._backoff == 0.0
+
+
+def test_batch_is_dropped_after_max_attempts(session, path):
+    w = SheetsWriter(session, path=path)
+    w.enqueue_append("tg1", ["битая строка"])
+    session.fail_append = [ValueError("bad range")] * MAX_ATTEMPTS
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        asyncio.run(w.flush())
+        assert w.pending == 1
+    # пока идёт последняя попытка, поставили ещё — это не должно пропасть вместе с пакетом
+    session.on_append = lambda: w.enqueue_update("tg2", {"статус": "approved"})
+    asyncio.run(w.flush())
+
+    assert session.appended == []
+    assert session.resets == MAX_ATTEMPTS
+    assert w.pending == 1
+    assert _on_disk(path) == {"appends": [], "updates": {"tg2": {"статус": "approved"}}}
+
+
+def test_disabled_session_queues_nothing(path):
+    session = FakeSession()
+    session.enabled = False
+    w = SheetsWriter(session, path=path)
+    w.enqueue_append("tg1", ["x"])
+    w.enqueue_updates({"tg1": {"статус": "approved"}})
+    assert w.pending == 0
@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src import student_flow
+from src.student_flow import StudentForm, confirm_handler
+
+ANSWERS = {"full_name": "Иванов Иван", "group": "ВИС-41", "email": "a@b.ru", "thesisTopic": "Бот"}
+
+
+class FakeRepo:
+    def __init__(self):
+        self.created = []
+
+    async def upsert_submission(self, payload):
+        self.created.append(payload)
+        return {"$id": "tg1", **payload}, True
+
+
+def _cb(data):
+    async def noop(*args, **kwargs):
+        return None
+    return SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=1),
+        bot=None,
+        message=SimpleNamespace(edit_text=noop),
+        answer=noop,
+    )
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    repo = FakeRepo()
+    sent = []
+
+    async def notify_admins(bot, text):
+        sent.append(text)
+
+    monkeypatch.setattr(student_flow, "get_async_repo", lambda: repo)
+    monkeypatch.setattr(student_flow, "notify_admins", notify_admins)
+    monkeypatch.setattr(student_flow, "append_submission_to_sheet", lambda payload: None)
+    monkeypatch.setattr(student_flow, "student_actions_kb", lambda doc: None)
+    repo.notified = sent
+    return repo
+
+
+def _state():
+    return FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+
+
+def test_double_send_writes_once(repo):
+    async def scenario():
+        state = _state()
+        await state.set_state(StudentForm.confirm)
+        await state.update_data(**ANSWERS)
+        # второе нажатие UserSerialMiddleware выполняет после первого
+        await confirm_handler(_cb("student:confirm:send"), state)
+        await confirm_handler(_cb("student:confirm:send"), state)
+
+    asyncio.run(scenario())
+    assert len(repo.created) == 1
+    assert repo.created[0]["full_name"] == "Иванов Иван"
+    assert len(repo.notified) == 1
+
+
+def test_send_without_required_fields_is_refused(repo):
+    async def scenario():
+        state = _state()
+        await state.set_state(StudentForm.confirm)
+        await state.update_data(**{**ANSWERS, "email": "  "})
+        await confirm_handler(_cb("student:confirm:send"), state)
+        return await state.get_state()
+
+    assert asyncio.run(scenario()) == StudentForm.confirm.state
+    assert repo.created == []
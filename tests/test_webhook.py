@@ -0,0 +1,21 @@
+import pytest
+from aiogram import Dispatcher
+
+from src import webhook
+from src.config import Settings
+
+
+def test_webhook_requires_secret(monkeypatch):
+    monkeypatch.setattr(Settings, "WEBHOOK_BASE_URL", "https://bot.example.org")
+    monkeypatch.setattr(Settings, "WEBHOOK_SECRET", "")
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        webhook.build_app(Dispatcher(), bot=None)
+
+
+@pytest.mark.parametrize("dyno", ["web.2", "web.10"])
+def test_webhook_refuses_second_instance(monkeypatch, dyno):
+    monkeypatch.setattr(Settings, "WEBHOOK_BASE_URL", "https://bot.example.org")
+    monkeypatch.setattr(Settings, "WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setenv("DYNO", dyno)
+    with pytest.raises(RuntimeError, match=dyno):
+        webhook.build_app(Dispatcher(), bot=None)